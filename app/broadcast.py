@@ -0,0 +1,130 @@
+"""app.broadcast.py"""
+import asyncio
+import functools
+import json
+import logging
+
+from .config import get_settings
+from .data import DATA_SOURCES
+
+LOGGER = logging.getLogger(__name__)
+
+SETTINGS = get_settings()
+
+
+class Event:  # pylint: disable=too-few-public-methods
+    """
+    A refresh of a data-source: its new version and totals. The event is encoded once, for
+    all of the subscribers.
+    """
+
+    __slots__ = ("version", "text", "message")
+
+    def __init__(self, source, dataset):
+        self.version = dataset.version
+        self.text = json.dumps(
+            {"source": source, "version": dataset.version, "latest": dataset.latest},
+            separators=(",", ":"),
+        )
+        # Server-sent event.
+        self.message = f"event: refresh\nid: {dataset.version}\ndata: {self.text}\n\n".encode()
+
+
+class Broadcaster:
+    """
+    Fans the refreshes of the data-sources out to the subscribers of the push channels.
+
+    The data-sources are polled (see `poll`) while someone is subscribed; each new version
+    is published as one event, put in the queue of every subscriber to its data-source.
+    Subscribers falling behind lose their oldest events, only the latest state matters.
+    """
+
+    def __init__(self, services, interval, queue_size):
+        self.services = services
+        self.interval = interval
+        self.queue_size = queue_size
+        self.subscribers = {source: set() for source in services}
+        self.events = {}
+        self.task = None
+        for source, service in services.items():
+            service.listeners.append(functools.partial(self.publish, source))
+
+    def event(self, source, dataset):
+        """
+        Gets the event of a version of a data-source.
+
+        :returns: The event.
+        :rtype: Event
+        """
+        event = self.events.get(source)
+        if event is None or event.version != dataset.version:
+            event = self.events[source] = Event(source, dataset)
+        return event
+
+    def publish(self, source, dataset):
+        """
+        Publishes a new version of a data-source to its subscribers.
+        """
+        event = self.event(source, dataset)
+        subscribers = self.subscribers[source]
+        LOGGER.info("%s version %s published to %s", source, event.version, len(subscribers))
+        for queue in subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def subscribe(self, source):
+        """
+        Subscribes to the refreshes of a data-source, starting with its current version.
+        Every subscription must end with `unsubscribe`.
+
+        :returns: The queue receiving the events.
+        :rtype: asyncio.Queue
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[source].add(queue)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.poll())
+        try:
+            dataset = await self.services[source].get_dataset()
+        except BaseException:
+            self.unsubscribe(source, queue)
+            raise
+        if queue.empty():
+            queue.put_nowait(self.event(source, dataset))
+        return queue
+
+    def unsubscribe(self, source, queue):
+        """
+        Ends a subscription. Polling stops with the last subscription.
+        """
+        self.subscribers[source].discard(queue)
+        if self.task is not None and not any(self.subscribers.values()):
+            self.task.cancel()
+            self.task = None
+
+    async def poll(self):
+        """
+        Refreshes the data-sources with subscribers, every `interval` seconds.
+        The services publish their new versions (see `LocationService.get_dataset`).
+        """
+        while True:
+            for source, service in self.services.items():
+                if self.subscribers[source]:
+                    try:
+                        await service.get_dataset()
+                    except Exception:  # pylint: disable=broad-except
+                        LOGGER.exception("%s refresh failed", source)
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        """
+        Stops polling.
+        """
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
+# Broadcaster of the data-sources.
+BROADCASTER = Broadcaster(DATA_SOURCES, SETTINGS.stream_poll_interval, SETTINGS.stream_queue_size)
@@ -1,13 +1,15 @@
 """app.caches.py"""
 import functools
-import logging
 from typing import Union
 
 import aiocache
 
+from . import metrics
 from .config import get_settings
+from .utils import logs
+from .utils.tracing import span
 
-LOGGER = logging.getLogger(name="app.caches")
+LOGGER = logs.get_logger("app.caches")
 
 SETTINGS = get_settings()
 
@@ -38,8 +40,11 @@ def get_cache(namespace) -> Union[aiocache.RedisCache, aiocache.SimpleMemoryCach
 async def check_cache(data_id: str, namespace: str = None):
     """Check the data of a cache given an id."""
     cache = get_cache(namespace)
-    result = await cache.get(data_id, None)
-    LOGGER.info(f"{data_id} cache pulled")
+    with metrics.CACHE_SECONDS.labels("get").time(), span("cache.get", key=data_id) as current:
+        result = await cache.get(data_id, None)
+        current.set(hit=bool(result))
+    metrics.CACHE_REQUESTS.labels("shared", data_id, "hit" if result else "miss").inc()
+    LOGGER.info("cache pulled", data_id=data_id, hit=bool(result))
     await cache.close()
     return result
 
@@ -47,6 +52,7 @@ async def check_cache(data_id: str, namespace: str = None):
 async def load_cache(data_id: str, data, namespace: str = None, cache_life: int = 3600):
     """Load data into the cache."""
     cache = get_cache(namespace)
-    await cache.set(data_id, data, ttl=cache_life)
-    LOGGER.info(f"{data_id} cache loaded")
+    with metrics.CACHE_SECONDS.labels("set").time(), span("cache.set", key=data_id):
+        await cache.set(data_id, data, ttl=cache_life)
+    LOGGER.info("cache loaded", data_id=data_id)
     await cache.close()
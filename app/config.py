@@ -15,6 +15,51 @@ class _Settings(BaseSettings):
     scout_name: str = None
     # Sentry
     sentry_dsn: str = None
+    # Upstream data-sources, e.g. the simulator of `loadtest.upstream`.
+    jhu_base_url: str = (
+        "https://raw.githubusercontent.com/CSSEGISandData/2019-nCoV/master/"
+        "csse_covid_19_data/csse_covid_19_time_series/"
+    )
+    csbs_url: str = "https://facts.csbs.org/covid-19/covid19_county.csv"
+    nyt_url: str = "https://raw.githubusercontent.com/nytimes/covid-19-data/master/us-counties.csv"
+    geonames_url: str = "http://api.geonames.org/countryInfoJSON"
+    # Executor for parsing the data-sources ("thread", "process" or "inline").
+    parse_executor: str = "thread"
+    parse_workers: int = None
+    # Maximum number of upstream files fetched at the same time.
+    fetch_concurrency: int = 3
+    # Upstream HTTP client (timeouts and backoff in seconds).
+    http_connection_limit: int = 100
+    http_connection_limit_per_host: int = 10
+    http_keepalive_timeout: float = 30
+    http_dns_cache_ttl: int = 300
+    http_total_timeout: float = 120
+    http_read_timeout: float = 30
+    http_retries: int = 3
+    http_retry_backoff: float = 0.5
+    # Versions of the locations of each data-source kept for `/v2/changes`.
+    dataset_versions: int = 4
+    # Ids accepted by a request of `/v2/locations/batch`.
+    batch_max_ids: int = 100
+    # Push channels (seconds): refresh polling while subscribed, SSE keep-alive comments,
+    # events queued for a slow subscriber.
+    stream_poll_interval: float = 60
+    stream_keepalive: float = 15
+    stream_queue_size: int = 8
+    # Spans of the stages of the refreshes and requests, logged as JSON with `tracing_log`.
+    tracing: bool = False
+    tracing_log: bool = False
+    # Memory report at `/debug/memory`, and tracemalloc (frames per allocation) compared
+    # between refreshes.
+    memory_profiling: bool = False
+    memory_profiling_frames: int = 5
+    # Logs as JSON lines, fraction of the per-request events logged.
+    log_json: bool = False
+    log_sample: float = 0.01
+    # Responses precompressed once per version of their data (gzip, and brotli when a
+    # brotli package is installed): bytes of the bodies kept, brotli quality (0 to 11).
+    precompressed_bytes: int = 256 * 1024 * 1024
+    brotli_quality: int = 6
 
 
 @functools.lru_cache()
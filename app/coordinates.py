@@ -6,10 +6,23 @@ class Coordinates:
     A position on earth using decimal coordinates (latitude and longitude).
     """
 
+    __slots__ = ("latitude", "longitude")
+
     def __init__(self, latitude, longitude):
         self.latitude = latitude
         self.longitude = longitude
 
+    @classmethod
+    def parse(cls, latitude, longitude):
+        """
+        Creates coordinates from the raw (string) values found in the data-sources.
+        Missing or malformed values are stored as None.
+
+        :returns: The parsed coordinates.
+        :rtype: Coordinates
+        """
+        return cls(parse_degrees(latitude), parse_degrees(longitude))
+
     def serialize(self):
         """
         Serializes the coordinates into a dict.
@@ -21,3 +34,16 @@ class Coordinates:
 
     def __str__(self):
         return "lat: %s, long: %s" % (self.latitude, self.longitude)
+
+
+def parse_degrees(value):
+    """
+    Parses a decimal degree value into a float.
+
+    :returns: The degrees or None if the value is missing or malformed.
+    :rtype: float
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,356 @@
+"""app.dataset.py"""
+import hashlib
+
+from .spatial import GridIndex
+from .timeline import sum_timelines
+from .utils.countries import DEFAULT_COUNTRY_CODE
+from .utils.executors import run_in_executor
+
+# The categories of the amounts.
+CATEGORIES = ("confirmed", "deaths", "recovered")
+
+# The orders of the countries (see `Dataset.ranking`), highest first.
+RANKINGS = ("confirmed", "deaths", "recovered", "confirmed_per_100k", "deaths_per_100k")
+
+# The orders of the locations (see `Dataset.location_ranking`), highest first.
+LOCATION_RANKINGS = ("confirmed", "deaths", "recovered", "growth")
+
+# The days of the growth of the confirmed cases.
+GROWTH_DAYS = 7
+
+
+class Dataset:  # pylint: disable=too-many-instance-attributes
+    """
+    A version of the locations of a data-source.
+
+    The version is a digest of the contents of the locations, a refresh bringing no new
+    data keeps the version. The locations of a version are never modified, their timelines
+    are compared to find the changes between two versions (see `changes`). The countries,
+    the rankings, the spatial index and the changes since each previous version are built
+    once per version.
+    """
+
+    __slots__ = (
+        "locations",
+        "version",
+        "latest",
+        "_countries",
+        "_rankings",
+        "_location_rankings",
+        "_spatial",
+        "_changes",
+    )
+
+    def __init__(self, locations, version=None):
+        self.locations = locations
+        # The digest of the locations, unless already computed (see `fingerprint`).
+        self.version = fingerprint(locations) if version is None else version
+        # The totals of the locations.
+        self.latest = {
+            "confirmed": sum(location.confirmed for location in locations),
+            "deaths": sum(location.deaths for location in locations),
+            "recovered": sum(location.recovered for location in locations),
+        }
+        self._countries = None
+        self._rankings = None
+        self._location_rankings = {}
+        self._spatial = None
+        self._changes = {}
+
+    @property
+    def spatial(self):
+        """
+        Gets the spatial index of the locations.
+
+        :returns: The index.
+        :rtype: GridIndex
+        """
+        if self._spatial is None:
+            self._spatial = GridIndex(self.locations)
+        return self._spatial
+
+    async def changes_since(self, previous):
+        """
+        Gets the changes of the locations since a previous version (see `changes`), computed
+        in the executor once per previous version.
+
+        :param previous: The previous version (None to get all of the locations).
+        :returns: The changed locations and the ids of the removed ones.
+        :rtype: dict
+        """
+        since = previous.version if previous is not None else None
+        diff = self._changes.get(since)
+        if diff is None:
+            diff = self._changes[since] = await run_in_executor(changes, previous, self)
+        return diff
+
+    def location_ranking(self, sort):
+        """
+        Gets the locations ordered by one of the `LOCATION_RANKINGS`, highest first (by id
+        on ties). Each ranking is sorted once per version, a top-N query only slices it.
+        The locations without timelines come last when ordered by growth.
+
+        :returns: The ordered locations.
+        :rtype: List[Location]
+        """
+        ranking = self._location_rankings.get(sort)
+        if ranking is None:
+            if sort == "growth":
+                values = [growth(location) for location in self.locations]
+            else:
+                values = [getattr(location, sort) for location in self.locations]
+            order = sorted(
+                range(len(values)),
+                key=lambda index: (values[index] is not None, values[index] or 0, -index),
+                reverse=True,
+            )
+            ranking = self._location_rankings[sort] = [self.locations[index] for index in order]
+        return ranking
+
+    @property
+    def countries(self):
+        """
+        Gets the aggregates of the locations by country, sorted by country name.
+
+        :returns: The countries.
+        :rtype: List[Country]
+        """
+        if self._countries is None:
+            grouped = {}
+            for location in self.locations:
+                key = location.country_code
+                if key == DEFAULT_COUNTRY_CODE:
+                    # Not a country (e.g. a cruise ship).
+                    key = (key, location.country)
+                grouped.setdefault(key, []).append(location)
+            self._countries = sorted(
+                (Country(locations) for locations in grouped.values()),
+                key=lambda country: country.country,
+            )
+        return self._countries
+
+    def ranking(self, sort):
+        """
+        Gets the countries ordered by one of the `RANKINGS`, highest first. The countries
+        without population come last when ordered by amounts per 100k inhabitants.
+
+        :returns: The ordered countries.
+        :rtype: List[Country]
+        """
+        if self._rankings is None:
+            self._rankings = {
+                key: sorted(
+                    self.countries,
+                    key=lambda country, key=key: (
+                        country.rank(key) is not None,
+                        country.rank(key) or 0,
+                    ),
+                    reverse=True,
+                )
+                for key in RANKINGS
+            }
+        return self._rankings[sort]
+
+
+class Country:  # pylint: disable=too-many-instance-attributes
+    """
+    The aggregate of the locations of a country: its totals and timelines, and the amounts
+    per 100k inhabitants.
+    """
+
+    __slots__ = (
+        "country_code",
+        "country",
+        "country_population",
+        "locations",
+        "latest",
+        "timelines",
+        "confirmed_per_100k",
+        "deaths_per_100k",
+    )
+
+    def __init__(self, locations):
+        self.country_code = locations[0].country_code
+        self.country = locations[0].country
+        self.country_population = locations[0].country_population
+        self.locations = len(locations)
+        self.latest = {
+            category: sum(getattr(location, category) for location in locations)
+            for category in CATEGORIES
+        }
+        timelines = [location.timelines for location in locations if hasattr(location, "timelines")]
+        self.timelines = (
+            {
+                category: sum_timelines(
+                    location_timelines[category] for location_timelines in timelines
+                )
+                for category in CATEGORIES
+            }
+            if timelines
+            else None
+        )
+        self.confirmed_per_100k = self.per_100k("confirmed")
+        self.deaths_per_100k = self.per_100k("deaths")
+
+    def per_100k(self, category):
+        """
+        Gets the latest amount of a category per 100k inhabitants.
+
+        :returns: The amount, None without population.
+        :rtype: float
+        """
+        if not self.country_population:
+            return None
+        return round(self.latest[category] * 100000 / self.country_population, 2)
+
+    def rank(self, key):
+        """
+        Gets the value of the country for one of the `RANKINGS`.
+
+        :returns: The value.
+        :rtype: Union[int, float]
+        """
+        return self.latest[key] if key in self.latest else getattr(self, key)
+
+    def serialize(self, timelines=False):
+        """
+        Serializes the country into a dict.
+
+        :param timelines: Whether to include the timelines, and their amounts per 100k
+                          inhabitants (as the `per_capita` derived series).
+        :returns: The serialized country.
+        :rtype: dict
+        """
+        serialized = {
+            "country_code": self.country_code,
+            "country": self.country,
+            "country_population": self.country_population,
+            "locations": self.locations,
+            "latest": dict(self.latest),
+            "confirmed_per_100k": self.confirmed_per_100k,
+            "deaths_per_100k": self.deaths_per_100k,
+        }
+        if timelines and self.timelines is not None:
+            serialized["timelines"] = {
+                category: timeline.serialize() for category, timeline in self.timelines.items()
+            }
+            serialized["derived"] = {
+                category: {
+                    "per_capita": timeline.derive(
+                        "per_capita", population=self.country_population
+                    ).serialize()
+                }
+                for category, timeline in self.timelines.items()
+            }
+        return serialized
+
+
+def growth(location, days=GROWTH_DAYS):
+    """
+    Gets the confirmed cases of a location over its last days.
+
+    :returns: The new cases, None without timelines.
+    :rtype: int
+    """
+    timelines = getattr(location, "timelines", None)
+    if timelines is None:
+        return None
+    values = timelines["confirmed"].values
+    if not values:
+        return 0
+    return values[-1] - (values[-days - 1] if len(values) > days else 0)
+
+
+def summary(location):
+    """
+    Gets the serialized location, without the time of the last request.
+
+    :returns: The summary of the location.
+    :rtype: dict
+    """
+    serialized = location.serialize()
+    del serialized["last_updated"]
+    return serialized
+
+
+def fingerprint(locations):
+    """
+    Digests the contents of the locations.
+
+    :returns: The digest.
+    :rtype: str
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for location in locations:
+        digest.update(repr(summary(location)).encode())
+        for category, timeline in sorted(getattr(location, "timelines", {}).items()):
+            digest.update(category.encode())
+            digest.update(",".join(timeline.dates).encode())
+            digest.update(timeline.values)
+    return digest.hexdigest()
+
+
+def changed_points(before, after):
+    """
+    Gets the points of a timeline added or changed since its previous version.
+
+    :param before: The previous version of the timeline (None if it is new).
+    :param after: The timeline.
+    :returns: The changed amounts by date.
+    :rtype: dict
+    """
+    if before is None:
+        return after.timeline
+    size = len(before)
+    dates = after.dates
+    if after.values[:size] == before.values and dates[:size] == before.dates:
+        # Unchanged, or new points appended.
+        return dict(zip(dates[size:], after.values[size:]))
+    previous = before.timeline
+    return {
+        date: amount for date, amount in zip(dates, after.values) if previous.get(date) != amount
+    }
+
+
+def changes(previous, dataset):
+    """
+    Gets the changes of the locations since a previous version of the dataset.
+    Changed locations are serialized with the changed points of their timelines only.
+
+    :param previous: The previous version (None to get all of the locations).
+    :param dataset: The current version.
+    :returns: The changed locations and the ids of the removed ones.
+    :rtype: dict
+    """
+    if previous is dataset:
+        return {"locations": [], "removed": []}
+    before = {location.id: location for location in previous.locations} if previous else {}
+
+    locations = []
+    for location in dataset.locations:
+        old = before.pop(location.id, None)
+        serialized = summary(location)
+        old_serialized = summary(old) if old is not None else {}
+        if {**old_serialized, "latest": None} != {**serialized, "latest": None}:
+            old = None  # A new location, or another location took the id.
+
+        timelines = getattr(location, "timelines", None)
+        if timelines is not None:
+            old_timelines = getattr(old, "timelines", {})
+            points = {
+                category: changed_points(old_timelines.get(category), timeline)
+                for category, timeline in timelines.items()
+            }
+            if old is not None and not any(points.values()):
+                continue
+            serialized["timelines"] = {
+                category: {"latest": timelines[category].latest, "timeline": timeline}
+                for category, timeline in points.items()
+            }
+        elif old is not None and old_serialized == serialized:
+            continue
+
+        serialized["last_updated"] = location.last_updated
+        locations.append(serialized)
+
+    return {"locations": locations, "removed": sorted(before)}
@@ -10,12 +10,29 @@ class Location:  # pylint: disable=too-many-instance-attributes
     A location in the world affected by the coronavirus.
     """
 
+    __slots__ = (
+        "id",
+        "country",
+        "_country_info",
+        "province",
+        "coordinates",
+        "last_updated",
+        "confirmed",
+        "deaths",
+        "recovered",
+    )
+
     def __init__(
         self, id, country, province, coordinates, last_updated, confirmed, deaths, recovered,
     ):  # pylint: disable=too-many-arguments
         # General info.
         self.id = id
         self.country = country.strip()
+        # The country code and population are resolved once, at ingest.
+        country_code = (
+            countries.country_code(self.country) or countries.DEFAULT_COUNTRY_CODE
+        ).upper()
+        self._country_info = (country_code, country_population(country_code))
         self.province = province.strip()
         self.coordinates = coordinates
 
@@ -35,7 +52,7 @@ class Location:  # pylint: disable=too-many-instance-attributes
         :returns: The country code.
         :rtype: str
         """
-        return (countries.country_code(self.country) or countries.DEFAULT_COUNTRY_CODE).upper()
+        return self._country_info[0]
 
     @property
     def country_population(self):
@@ -45,7 +62,7 @@ class Location:  # pylint: disable=too-many-instance-attributes
         :returns: The population.
         :rtype: int
         """
-        return country_population(self.country_code)
+        return self._country_info[1]
 
     def serialize(self):
         """
@@ -79,6 +96,8 @@ class TimelinedLocation(Location):
     A location with timelines.
     """
 
+    __slots__ = ("timelines",)
+
     # pylint: disable=too-many-arguments
     def __init__(self, id, country, province, coordinates, last_updated, timelines):
         super().__init__(
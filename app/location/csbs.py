@@ -7,6 +7,8 @@ class CSBSLocation(Location):
     A CSBS (county) location.
     """
 
+    __slots__ = ("state", "county")
+
     # pylint: disable=too-many-arguments,redefined-builtin
     def __init__(self, id, state, county, coordinates, last_updated, confirmed, deaths):
         super().__init__(
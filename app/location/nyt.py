@@ -7,6 +7,8 @@ class NYTLocation(TimelinedLocation):
     A NYT (county) Timelinedlocation.
     """
 
+    __slots__ = ("state", "county")
+
     # pylint: disable=too-many-arguments,redefined-builtin
     def __init__(self, id, state, county, coordinates, last_updated, timelines):
         super().__init__(id, "US", state, coordinates, last_updated, timelines)
@@ -1,30 +1,36 @@
 """
 app.main.py
 """
-import logging
+import functools
 
 import pydantic
 import sentry_sdk
 import uvicorn
-from fastapi import FastAPI, Request, Response
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from scout_apm.async_.starlette import ScoutMiddleware
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 
+from . import metrics
+from .broadcast import BROADCASTER
 from .config import get_settings
-from .data import data_source
-from .routers import V1, V2
+from .data import DATA_SOURCES, data_source
+from .routers import DEBUG, V1, V2
+from .utils import logs, memory
+from .utils.compression import MINIMUM_SIZE, GZipMiddleware
+from .utils.executors import teardown_executor
 from .utils.httputils import setup_client_session, teardown_client_session
 
 # ############
 # FastAPI App
 # ############
-LOGGER = logging.getLogger("api")
+LOGGER = logs.get_logger("api")
 
 SETTINGS = get_settings()
 
+logs.configure(SETTINGS.log_json)
+
 if SETTINGS.sentry_dsn:  # pragma: no cover
     sentry_sdk.init(dsn=SETTINGS.sentry_dsn)
 
@@ -38,16 +44,21 @@ APP = FastAPI(
     docs_url="/",
     redoc_url="/docs",
     on_startup=[setup_client_session],
-    on_shutdown=[teardown_client_session],
+    on_shutdown=[BROADCASTER.close, teardown_client_session, teardown_executor],
+    default_response_class=metrics.TimedJSONResponse,
 )
 
+# Record the sizes of the data-sources, and their allocations when profiled.
+metrics.watch(DATA_SOURCES)
+memory.watch(DATA_SOURCES)
+
 # #####################
 # Middleware
 #######################
 
 # Scout APM
 if SETTINGS.scout_name:  # pragma: no cover
-    LOGGER.info(f"Adding Scout APM middleware for `{SETTINGS.scout_name}`")
+    LOGGER.info("Adding Scout APM middleware", scout_name=SETTINGS.scout_name)
     APP.add_middleware(ScoutMiddleware)
 else:
     LOGGER.debug("No SCOUT_NAME config")
@@ -65,28 +76,48 @@ APP.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-APP.add_middleware(GZipMiddleware, minimum_size=1000)
+APP.add_middleware(GZipMiddleware, minimum_size=MINIMUM_SIZE)
+
+
+@functools.lru_cache()
+def route_path(endpoint):
+    """
+    Gets the path of the route of an endpoint (e.g. `/v2/locations/{id}`), to label the
+    metrics without the values of the path parameters.
+
+    :returns: The path, "unmatched" without route.
+    :rtype: str
+    """
+    for route in APP.routes:
+        if getattr(route, "endpoint", None) is endpoint and endpoint is not None:
+            return route.path
+    return "unmatched"
+
+
+# Record the duration of the requests by route, outermost.
+APP.add_middleware(metrics.MetricsMiddleware, route_path=route_path)
 
 
-@APP.middleware("http")
-async def add_datasource(request: Request, call_next):
+# ################
+# Dependencies
+# ################
+
+
+async def add_datasource(request: Request):
     """
-    Attach the data source to the request.state.
+    Attach the data source to the request.state. A dependency of the routes of the
+    data-sources (v2).
     """
-    # Retrieve the datas ource from query param.
+    # Retrieve the data source from query param.
     source = data_source(request.query_params.get("source", default="jhu"))
 
     # Abort with 404 if source cannot be found.
     if not source:
-        return Response("The provided data-source was not found.", status_code=404)
+        raise HTTPException(404, detail="The provided data-source was not found.")
 
     # Attach source to request.
     request.state.source = source
-
-    # Move on...
-    LOGGER.debug(f"source provided: {source.__class__.__name__}")
-    response = await call_next(request)
-    return response
+    LOGGER.debug("source provided", source=source.__class__.__name__, sample=SETTINGS.log_sample)
 
 
 # ################
@@ -111,7 +142,17 @@ async def handle_validation_error(
 
 # Include routers.
 APP.include_router(V1, prefix="", tags=["v1"])
-APP.include_router(V2, prefix="/v2", tags=["v2"])
+APP.include_router(V2, prefix="/v2", tags=["v2"], dependencies=[Depends(add_datasource)])
+APP.include_router(DEBUG, prefix="/debug", tags=["debug"])
+
+
+@APP.get("/metrics")
+async def get_metrics():
+    """
+    Exposes the metrics, in the Prometheus text format.
+    """
+    content_type, data = metrics.exposition()
+    return Response(data, media_type=content_type)
 
 
 # Running of app.
@@ -0,0 +1,166 @@
+"""app.metrics.py"""
+import functools
+import os
+import time
+
+from cachetools import Cache, TTLCache
+from fastapi.responses import JSONResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Upstream data-sources.
+FETCH_BYTES = Counter(
+    "upstream_fetch_bytes", "Size of the data received from the data-sources.", ["source"]
+)
+FETCH_SECONDS = Histogram(
+    "upstream_fetch_seconds", "Duration of the requests to the data-sources.", ["source"]
+)
+PARSE_SECONDS = Histogram(
+    "parse_seconds", "Duration of the parsing and normalization of the data.", ["source"]
+)
+DATASET_LOCATIONS = Gauge(
+    "dataset_locations",
+    "Locations in the latest version of a data-source.",
+    ["source"],
+    multiprocess_mode="max",
+)
+
+# Caches, local (TTLCache) and shared (Redis).
+CACHE_REQUESTS = Counter("cache_requests", "Lookups in the caches.", ["layer", "cache", "result"])
+CACHE_SECONDS = Histogram("cache_seconds", "Duration of the shared cache calls.", ["operation"])
+
+# Requests.
+REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "Duration of the HTTP requests.", ["method", "route", "status"]
+)
+RENDER_SECONDS = Histogram(
+    "http_render_seconds", "Duration of the JSON encoding of the responses.", ["route"]
+)
+
+
+class CountedTTLCache(TTLCache):  # pylint: disable=too-many-ancestors
+    """
+    A `cachetools.TTLCache` counting its hits and misses (see `CACHE_REQUESTS`).
+    """
+
+    def __init__(self, name, maxsize, ttl, getsizeof=None):
+        super().__init__(maxsize, ttl, getsizeof=getsizeof)
+        self.hits = CACHE_REQUESTS.labels("local", name, "hit")
+        self.misses = CACHE_REQUESTS.labels("local", name, "miss")
+
+    def __getitem__(self, key, cache_getitem=Cache.__getitem__):
+        try:
+            value = super().__getitem__(key, cache_getitem)
+        except KeyError:
+            self.misses.inc()
+            raise
+        self.hits.inc()
+        return value
+
+
+class TimedJSONResponse(JSONResponse):
+    """
+    A JSON response reporting the duration of its encoding to the `MetricsMiddleware`, in
+    the state of the request, recorded by route with the duration of the request.
+    """
+
+    def render(self, content):
+        started = time.perf_counter()
+        body = super().render(content)
+        seconds = time.perf_counter() - started
+        self.render_seconds = seconds  # pylint: disable=attribute-defined-outside-init
+        return body
+
+    async def __call__(self, scope, receive, send):
+        scope.setdefault("state", {})["render_seconds"] = self.render_seconds
+        await super().__call__(scope, receive, send)
+
+
+class MetricsMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    ASGI middleware recording the duration of the requests until their responses start,
+    and of the encoding of the responses, by route. The path of the route of an endpoint is
+    given by `route_path`.
+    """
+
+    def __init__(self, app, route_path):
+        self.app = app
+        self.route_path = route_path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status):
+            nonlocal recorded
+            recorded = True
+            route = self.route_path(scope.get("endpoint"))
+            REQUEST_SECONDS.labels(scope["method"], route, status).observe(
+                time.perf_counter() - started
+            )
+            seconds = render_seconds(scope)
+            if seconds is not None:
+                RENDER_SECONDS.labels(route).observe(seconds)
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not recorded:
+                record(500)
+
+
+def render_seconds(scope):
+    """
+    Gets the encoding duration of the response to a request (see `TimedJSONResponse`).
+
+    :returns: The duration, None when not reported.
+    :rtype: float
+    """
+    return scope.get("state", {}).get("render_seconds")
+
+
+def record_dataset(source, dataset):
+    """
+    Records the size of a new version of a data-source.
+    """
+    DATASET_LOCATIONS.labels(source).set(len(dataset.locations))
+
+
+def watch(services):
+    """
+    Records the new versions of the data-sources (see `LocationService.listeners`).
+    """
+    for source, service in services.items():
+        service.listeners.append(functools.partial(record_dataset, source))
+
+
+def exposition():
+    """
+    Encodes the metrics in the Prometheus text format. Under gunicorn, the metrics of all
+    of the workers are aggregated when `prometheus_multiproc_dir` is set.
+
+    :returns: The content type and the metrics.
+    :rtype: Tuple[str, bytes]
+    """
+    if "prometheus_multiproc_dir" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return CONTENT_TYPE_LATEST, generate_latest(registry)
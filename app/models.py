@@ -1,7 +1,7 @@
 """app.models.py"""
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, StrictInt, validator
 
 
 class Latest(BaseModel):
@@ -58,6 +58,15 @@ class Timelines(BaseModel):
     recovered: Timeline
 
 
+class Derived(BaseModel):
+    """
+    Derived series model.
+    """
+
+    latest: Union[StrictInt, float] = None
+    timeline: Dict[str, Optional[Union[StrictInt, float]]] = None
+
+
 class Location(BaseModel):
     """
     Location model.
@@ -75,6 +84,22 @@ class Location(BaseModel):
     timelines: Timelines = {}
 
 
+class DerivedLocation(Location):
+    """
+    Location model, with its derived series.
+    """
+
+    derived: Dict[str, Dict[str, Derived]] = None
+
+
+class NearbyLocation(DerivedLocation):
+    """
+    Location model, with its distance to the position of a search.
+    """
+
+    distance: float = None
+
+
 class LocationResponse(BaseModel):
     """
     Response for location.
@@ -83,10 +108,70 @@ class LocationResponse(BaseModel):
     location: Location
 
 
+class DerivedLocationResponse(BaseModel):
+    """
+    Response for location, with its derived series.
+    """
+
+    location: DerivedLocation
+
+
+class BatchLocation(DerivedLocation):
+    """
+    Location model, with its data-source.
+    """
+
+    source: str
+
+
+class BatchResponse(BaseModel):
+    """
+    Response for a batch of locations.
+    """
+
+    locations: List[BatchLocation] = []
+    missing: List[str] = []
+
+
 class LocationsResponse(BaseModel):
     """
     Response for locations.
     """
 
     latest: Latest
+    locations: List[NearbyLocation] = []
+
+
+class Country(BaseModel):
+    """
+    Country model, the aggregate of its locations.
+    """
+
+    country_code: str
+    country: str
+    country_population: int = None
+    locations: int
+    latest: Latest
+    confirmed_per_100k: float = None
+    deaths_per_100k: float = None
+    timelines: Timelines = None
+    derived: Dict[str, Dict[str, Derived]] = None
+
+
+class CountriesResponse(BaseModel):
+    """
+    Response for countries.
+    """
+
+    countries: List[Country] = []
+
+
+class ChangesResponse(BaseModel):
+    """
+    Response for the changes since a version.
+    """
+
+    version: str
+    since: str = None
     locations: List[Location] = []
+    removed: List[int] = []
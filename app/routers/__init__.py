@@ -1,3 +1,4 @@
 """app.routers"""
+from .debug import DEBUG
 from .v1 import V1
 from .v2 import V2
@@ -0,0 +1,31 @@
+"""app.routers.debug.py"""
+from fastapi import APIRouter, HTTPException
+
+from ..data import DATA_SOURCES
+from ..utils import memory, tracing
+
+DEBUG = APIRouter()
+
+
+@DEBUG.get("/traces", include_in_schema=False)
+async def get_traces():
+    """
+    Getting the timing breakdown of the last refresh of each data-source (e.g. `jhu.locations`)
+    and of the other traced operations. Requires the tracing to be enabled (`TRACING`).
+    """
+    if not tracing.ENABLED:
+        raise HTTPException(404, detail="Tracing is disabled.")
+    return {"traces": tracing.TRACES}
+
+
+@DEBUG.get("/memory", include_in_schema=False)
+def get_memory():
+    """
+    Getting the memory held by the versions of the locations of each data-source, the live
+    instances of the datasets, locations, timelines and clients, and the allocations grown
+    at the last refresh of each data-source. Requires the memory profiling to be enabled
+    (`MEMORY_PROFILING`).
+    """
+    if not memory.ENABLED:
+        raise HTTPException(404, detail="Memory profiling is disabled.")
+    return memory.report(DATA_SOURCES)
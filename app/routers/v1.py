@@ -1,30 +1,54 @@
 """app.routers.v1.py"""
 from fastapi import APIRouter
 
-from ..services.location.jhu import get_category
+from ..metrics import TimedJSONResponse
+from ..services.location.jhu import CATEGORIES, get_categories, get_category
+from ..utils.compression import PrecompressedResponse, lookup, precompress
 
 V1 = APIRouter()
 
 
+def encode(content):
+    """
+    Encodes content as the JSON responses do.
+
+    :returns: The JSON.
+    :rtype: bytes
+    """
+    return TimedJSONResponse(content).body
+
+
+def category_body(category, data):
+    """
+    Gets the body of a category (`/{category}`), encoded and compressed once per refresh
+    of the category (its `last_updated`). The encoded category is also the one of `/all`.
+
+    :returns: The precompressed body.
+    :rtype: Precompressed
+    """
+    precompressed = lookup(f"/{category}", data["last_updated"])
+    if precompressed is None:
+        precompressed = precompress(f"/{category}", data["last_updated"], encode(data))
+    return precompressed
+
+
 @V1.get("/all")
 async def all_categories():
     """Get all the categories."""
-    confirmed = await get_category("confirmed")
-    deaths = await get_category("deaths")
-    recovered = await get_category("recovered")
-
-    return {
-        # Data.
-        "confirmed": confirmed,
-        "deaths": deaths,
-        "recovered": recovered,
-        # Latest.
-        "latest": {
-            "confirmed": confirmed["latest"],
-            "deaths": deaths["latest"],
-            "recovered": recovered["latest"],
-        },
-    }
+    categories = tuple(await get_categories())
+    version = tuple(data["last_updated"] for data in categories)
+
+    precompressed = lookup("/all", version)
+    if precompressed is None:
+        # The data of the categories, then their latest, from their encoded bodies.
+        members = [
+            encode(category) + b":" + category_body(category, data).body
+            for category, data in zip(CATEGORIES, categories)
+        ]
+        latest = {category: data["latest"] for category, data in zip(CATEGORIES, categories)}
+        members.append(encode("latest") + b":" + encode(latest))
+        precompressed = precompress("/all", version, b"{" + b",".join(members) + b"}")
+    return PrecompressedResponse(precompressed)
 
 
 @V1.get("/confirmed")
@@ -32,7 +56,7 @@ async def get_confirmed():
     """Confirmed cases."""
     confirmed_data = await get_category("confirmed")
 
-    return confirmed_data
+    return PrecompressedResponse(category_body("confirmed", confirmed_data))
 
 
 @V1.get("/deaths")
@@ -40,7 +64,7 @@ async def get_deaths():
     """Total deaths."""
     deaths_data = await get_category("deaths")
 
-    return deaths_data
+    return PrecompressedResponse(category_body("deaths", deaths_data))
 
 
 @V1.get("/recovered")
@@ -48,4 +72,4 @@ async def get_recovered():
     """Recovered cases."""
     recovered_data = await get_category("recovered")
 
-    return recovered_data
+    return PrecompressedResponse(category_body("recovered", recovered_data))
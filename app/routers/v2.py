@@ -1,13 +1,40 @@
 """app.routers.v2"""
+import asyncio
 import enum
+import functools
+from datetime import date
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
 
+from ..broadcast import BROADCASTER
+from ..config import get_settings
 from ..data import DATA_SOURCES
-from ..models import LatestResponse, LocationResponse, LocationsResponse
+from ..dataset import LOCATION_RANKINGS, RANKINGS
+from ..metrics import TimedJSONResponse
+from ..models import (
+    BatchResponse,
+    ChangesResponse,
+    CountriesResponse,
+    DerivedLocationResponse,
+    LatestResponse,
+    LocationResponse,
+    LocationsResponse,
+)
+from ..timeline import DEFAULT_WINDOW, METRICS, WINDOWED_METRICS
+from ..utils.compression import PrecompressedResponse, lookup, precompress
+from ..utils.concurrency import gather
+from ..utils.tracing import span
 
 V2 = APIRouter()
 
+SETTINGS = get_settings()
+
+# The declared filters of `/locations`, by properties of the locations.
+FILTERS = ("country_code", "province", "county")
+
 
 class Sources(str, enum.Enum):
     """
@@ -24,38 +51,79 @@ async def get_latest(request: Request, source: Sources = "jhu"):  # pylint: disa
     """
     Getting latest amount of total confirmed cases, deaths, and recoveries.
     """
-    locations = await request.state.source.get_all()
-    return {
-        "latest": {
-            "confirmed": sum(map(lambda location: location.confirmed, locations)),
-            "deaths": sum(map(lambda location: location.deaths, locations)),
-            "recovered": sum(map(lambda location: location.recovered, locations)),
-        }
-    }
+    dataset = await request.state.source.get_dataset()
+    return {"latest": dataset.latest}
 
 
 # pylint: disable=unused-argument,too-many-arguments,redefined-builtin
 @V2.get("/locations", response_model=LocationsResponse, response_model_exclude_unset=True)
 async def get_locations(
     request: Request,
+    response: Response,
     source: Sources = "jhu",
     country_code: str = None,
     province: str = None,
     county: str = None,
     timelines: bool = False,
+    derived: str = None,
+    window: int = Query(DEFAULT_WINDOW, ge=1, le=365),
+    sort: str = None,
+    limit: int = Query(None, ge=1),
+    bbox: str = None,
+    near: str = None,
+    radius: float = Query(None, gt=0),
 ):
     """
-    Getting the locations.
+    Getting the locations, optionally ordered by `sort` (highest first) and limited to the
+    first `limit` ones. The totals cover all of the matching locations.
+
+    The locations can be selected inside a bounding box (`bbox=south,west,north,east`), or
+    around a position (`near=latitude,longitude`): within `radius` kilometers or, with
+    `limit`, the nearest ones. Around a position, the nearest locations come first.
     """
+    # pylint: disable=too-many-locals
+    metrics = parse_metrics(derived)
+    check_selection(sort, bbox, near, radius)
+
     # All query paramameters.
     params = dict(request.query_params)
 
     # Remove reserved params.
     params.pop("source", None)
     params.pop("timelines", None)
+    params.pop("derived", None)
+    params.pop("window", None)
+    params.pop("sort", None)
+    params.pop("limit", None)
+    params.pop("bbox", None)
+    params.pop("near", None)
+    params.pop("radius", None)
+
+    # Retrieve all the locations, tagged with their version (in the order of the ranking).
+    dataset = await request.state.source.get_dataset()
+    locations = dataset.location_ranking(sort) if sort else dataset.locations
+    response.headers["ETag"] = f'"{dataset.version}"'
+    latest = dataset.latest
 
-    # Retrieve all the locations.
-    locations = await request.state.source.get_all()
+    # Without spatial query, the bodies are encoded and compressed once per version.
+    shape = None
+    if bbox is None and near is None:
+        shape = locations_shape(
+            source, params, timelines, metrics, window, sort, limit, len(locations)
+        )
+    if shape is not None:
+        precompressed = lookup(shape, dataset.version)
+        if precompressed is not None:
+            return PrecompressedResponse(precompressed, headers={"ETag": response.headers["ETag"]})
+
+    # Spatial queries, answered by the index of the dataset.
+    distances = {}
+    if bbox is not None or near is not None:
+        # Other filters could leave fewer than `limit` of the nearest locations.
+        locations, distances = spatial_query(
+            dataset, locations, bbox, near, radius, None if params else limit
+        )
+        latest = None
 
     # Attempt to filter out locations with properties matching the provided query params.
     for key, value in params.items():
@@ -70,6 +138,7 @@ async def get_locations(
                 for location in locations
                 if str(getattr(location, key)).lower() == str(value)
             ]
+            latest = None
         except AttributeError:
             pass
         if not locations:
@@ -77,27 +146,380 @@ async def get_locations(
                 404, detail=f"Source `{source}` does not have the desired location data.",
             )
 
-    # Return final serialized data.
-    return {
-        "latest": {
+    if latest is None:
+        latest = {
             "confirmed": sum(map(lambda location: location.confirmed, locations)),
             "deaths": sum(map(lambda location: location.deaths, locations)),
             "recovered": sum(map(lambda location: location.recovered, locations)),
-        },
-        "locations": [location.serialize(timelines) for location in locations],
-    }
+        }
+
+    with span("v2.serialize", locations=len(locations[:limit]), timelines=timelines):
+        serialized = [
+            serialize(location, timelines, metrics=metrics, window=window)
+            for location in locations[:limit]
+        ]
+    if distances:
+        for location, serialized_location in zip(locations, serialized):
+            serialized_location["distance"] = distances[id(location)]
+
+    # Return final serialized data.
+    content = {"latest": latest, "locations": serialized}
+    if shape is None:
+        return content
+    precompressed = precompress(shape, dataset.version, await encode(LocationsResponse, content))
+    return PrecompressedResponse(precompressed, headers={"ETag": response.headers["ETag"]})
+
+
+@V2.get("/locations/batch", response_model=BatchResponse, response_model_exclude_unset=True)
+async def get_locations_batch(
+    ids: str,
+    source: Sources = "jhu",
+    timelines: bool = False,
+    start: date = None,
+    end: date = None,
+    derived: str = None,
+    window: int = Query(DEFAULT_WINDOW, ge=1, le=365),
+):
+    """
+    Getting several locations at once, by comma separated ids. An id can be prefixed with its
+    own data-source (e.g. `0,2,nyt:5`), the others belong to `source`. The timelines can be
+    sliced from `start` to `end` (both inclusive).
+    """
+    metrics = parse_metrics(derived)
+    requested = parse_ids(ids, Sources(source).value)
+
+    # Retrieve the locations of each data-source once.
+    all_locations = dict.fromkeys(name for name, _ in requested)
+    all_locations.update(
+        zip(all_locations, await gather(*(DATA_SOURCES[name].get_all() for name in all_locations)))
+    )
+
+    locations, missing = [], []
+    for name, loc_id in requested:
+        if loc_id < len(all_locations[name]):
+            serialized = serialize(
+                all_locations[name][loc_id], timelines, start, end, metrics, window
+            )
+            serialized["source"] = name
+            locations.append(serialized)
+        else:
+            missing.append(f"{name}:{loc_id}")
+    return {"locations": locations, "missing": missing}
+
+
+@functools.lru_cache()
+def response_field(model):
+    """
+    Creates the field validating the responses of a model (see `encode`).
+
+    :returns: The field.
+    :rtype: pydantic.fields.ModelField
+    """
+    return create_response_field(name=f"Response_{model.__name__}", type_=model)
+
+
+async def encode(model, content):
+    """
+    Encodes the content of a route the way FastAPI encodes it for its response model:
+    validated, unset fields excluded.
+
+    :returns: The JSON body.
+    :rtype: bytes
+    """
+    serialized = await serialize_response(
+        field=response_field(model), response_content=content, exclude_unset=True
+    )
+    return TimedJSONResponse(serialized).body
+
+
+def locations_shape(source, params, timelines, metrics, window, sort, limit, count):
+    """
+    Gets the shape of a `/locations` response from its validated query parameters, the
+    key of its precompressed body (see `app.utils.compression.precompress`).
+
+    :param params: The filters of the locations, by name.
+    :param count: The number of locations, a `limit` from it on is left out (all of them).
+    :returns: The shape, None with undeclared parameters (not precompressed).
+    :rtype: tuple
+    """
+    if not set(params) <= set(FILTERS):
+        return None
+    filters = tuple(
+        None if params.get(key) is None else params[key].lower().strip("__") for key in FILTERS
+    )
+    windowed = any(metric in WINDOWED_METRICS for metric in metrics)
+    return (
+        "/v2/locations",
+        Sources(source).value,
+        filters,
+        timelines,
+        tuple(metrics),
+        window if windowed else None,
+        sort,
+        limit if limit is not None and limit < count else None,
+    )
+
+
+def check_selection(sort, bbox, near, radius):
+    """
+    Checks the ordering and the spatial query parameters of `/locations`.
+    """
+    if sort is not None and sort not in LOCATION_RANKINGS:
+        raise HTTPException(
+            422, detail=f"Unknown sort `{sort}`, available: {', '.join(LOCATION_RANKINGS)}."
+        )
+    if near is not None and (sort is not None or bbox is not None):
+        raise HTTPException(422, detail="`near` cannot be combined with `sort` or `bbox`.")
+    if radius is not None and near is None:
+        raise HTTPException(422, detail="`radius` requires `near`.")
+
+
+def spatial_query(dataset, locations, bbox, near, radius, limit):
+    """
+    Selects the locations inside a bounding box (`bbox`), or around a position (`near`)
+    within `radius` kilometers or, with `limit`, the nearest ones. The selection uses the
+    spatial index of the dataset.
+
+    :param locations: The locations, in the order kept inside a bounding box (e.g. a ranking).
+    :returns: The selected locations, and their distances by `id` around a position.
+    :rtype: Tuple[List[Location], Dict[int, float]]
+    """
+    if bbox is not None:
+        south, west, north, east = parse_degrees(bbox, "bbox", 4, latitudes=(0, 2))
+        if south > north:
+            raise HTTPException(422, detail="The south of `bbox` is north of its north.")
+        selected = dataset.spatial.bbox(south, west, north, east)
+        if locations is not dataset.locations:
+            selected = set(map(id, selected))
+            selected = [location for location in locations if id(location) in selected]
+        return selected, {}
+    latitude, longitude = parse_degrees(near, "near", 2, latitudes=(0,))
+    if radius is not None:
+        found = dataset.spatial.radius(latitude, longitude, radius)
+    else:
+        found = dataset.spatial.nearest(latitude, longitude, limit or dataset.spatial.size)
+    distances = {id(location): round(distance, 3) for distance, location in found}
+    return [location for _, location in found], distances
+
+
+def parse_ids(ids, source):
+    """
+    Parses comma separated location ids, each optionally prefixed with its data-source
+    (e.g. `0,2,nyt:5`), at most `BATCH_MAX_IDS` of them.
+
+    :param source: The data-source of the ids without prefix.
+    :returns: The data-sources and ids, in the requested order.
+    :rtype: List[Tuple[str, int]]
+    """
+    tokens = ids.split(",")
+    if len(tokens) > SETTINGS.batch_max_ids:
+        raise HTTPException(
+            422, detail=f"Too many location ids, at most {SETTINGS.batch_max_ids} per request."
+        )
+    requested = []
+    for token in tokens:
+        name, _, loc_id = token.strip().rpartition(":")
+        name = name.lower() or source
+        if name not in DATA_SOURCES or not loc_id.isdigit():
+            raise HTTPException(422, detail=f"Invalid location id `{token}`.")
+        requested.append((name, int(loc_id)))
+    return requested
+
+
+def parse_degrees(value, name, count, latitudes):
+    """
+    Parses comma separated decimal degrees (e.g. `near=latitude,longitude`).
+
+    :param value: The degrees.
+    :param name: The name of the query parameter.
+    :param count: The number of degrees.
+    :param latitudes: The positions of the latitudes, the others are longitudes.
+    :returns: The degrees.
+    :rtype: List[float]
+    """
+    try:
+        degrees = [float(part) for part in value.split(",")]
+    except ValueError:
+        degrees = []
+    limits = [90 if position in latitudes else 180 for position in range(count)]
+    if len(degrees) != count or not all(
+        -limit <= degree <= limit for limit, degree in zip(limits, degrees)
+    ):
+        raise HTTPException(422, detail=f"Invalid coordinates `{name}={value}`.")
+    return degrees
+
+
+def parse_metrics(derived):
+    """
+    Parses the comma separated names of derived series (see `app.timeline.METRICS`).
+
+    :returns: The names of the series.
+    :rtype: List[str]
+    """
+    if not derived:
+        return []
+    metrics = [metric.strip().lower() for metric in derived.split(",")]
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise HTTPException(
+            422, detail=f"Unknown derived series `{unknown[0]}`, available: {', '.join(METRICS)}."
+        )
+    return metrics
+
+
+# pylint: disable=too-many-arguments
+def serialize(location, timelines=False, start=None, end=None, metrics=(), window=DEFAULT_WINDOW):
+    """
+    Serializes a location, with its timelines and derived series sliced from `start` to `end`.
+    Without timelines, the derived series only have their latest value.
+
+    :returns: The serialized location.
+    :rtype: dict
+    """
+    serialized = location.serialize()
+    location_timelines = getattr(location, "timelines", None)
+    if location_timelines is None:
+        return serialized
+
+    def sliced(timeline):
+        return timeline.slice(start, end) if start or end else timeline
+
+    if timelines:
+        serialized["timelines"] = {
+            category: sliced(timeline).serialize()
+            for category, timeline in location_timelines.items()
+        }
+    if metrics:
+        population = location.country_population
+        serialized["derived"] = {
+            category: {
+                metric: sliced(timeline.derive(metric, window, population)).serialize(timelines)
+                for metric in metrics
+            }
+            for category, timeline in location_timelines.items()
+        }
+    return serialized
 
 
 # pylint: disable=invalid-name
 @V2.get("/locations/{id}", response_model=LocationResponse)
 async def get_location_by_id(
-    request: Request, id: int, source: Sources = "jhu", timelines: bool = True
+    request: Request,
+    id: int,
+    source: Sources = "jhu",
+    timelines: bool = True,
+    derived: str = None,
+    window: int = Query(DEFAULT_WINDOW, ge=1, le=365),
 ):
     """
-    Getting specific location by id.
+    Getting specific location by id, with its `derived` series when requested.
     """
+    metrics = parse_metrics(derived)
     location = await request.state.source.get(id)
-    return {"location": location.serialize(timelines)}
+    content = {"location": serialize(location, timelines, metrics=metrics, window=window)}
+    if not metrics:
+        return content
+    serialized = await serialize_response(
+        field=response_field(DerivedLocationResponse), response_content=content
+    )
+    return TimedJSONResponse(serialized)
+
+
+@V2.get("/countries", response_model=CountriesResponse, response_model_exclude_unset=True)
+async def get_countries(
+    request: Request,
+    response: Response,
+    source: Sources = "jhu",
+    sort: str = "confirmed",
+    limit: int = Query(None, ge=1),
+    timelines: bool = False,
+):
+    """
+    Getting the locations aggregated by country, with their amounts per 100k inhabitants.
+    The countries are ordered by `sort` (highest first), e.g. `deaths_per_100k`.
+    """
+    if sort not in RANKINGS:
+        raise HTTPException(422, detail=f"Unknown sort `{sort}`, available: {', '.join(RANKINGS)}.")
+    dataset = await request.state.source.get_dataset()
+    response.headers["ETag"] = f'"{dataset.version}"'
+    return {
+        "countries": [country.serialize(timelines) for country in dataset.ranking(sort)[:limit]]
+    }
+
+
+@V2.get("/changes", response_model=ChangesResponse, response_model_exclude_unset=True)
+async def get_changes(
+    request: Request, response: Response, source: Sources = "jhu", since: str = None
+):
+    """
+    Getting the locations and timeline points changed since a version of the locations (the
+    `ETag` of `/locations`, also accepted as `If-None-Match`). All the locations are returned
+    when the version is unknown or expired.
+    """
+    service = request.state.source
+    dataset = await service.get_dataset()
+    response.headers["ETag"] = f'"{dataset.version}"'
+
+    since = (since or request.headers.get("If-None-Match") or "").strip('"')
+    previous = service.get_version(since)
+    return {
+        "version": dataset.version,
+        "since": previous.version if previous else None,
+        **(await dataset.changes_since(previous)),
+    }
+
+
+@V2.get("/stream")
+async def stream(source: Sources = "jhu"):
+    """
+    Streaming the refreshes of a data-source, as server-sent events. Each `refresh` event
+    holds the new version and latest totals, starting with the current ones.
+    """
+    source = Sources(source).value
+    queue = await BROADCASTER.subscribe(source)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SETTINGS.stream_keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                else:
+                    yield event.message
+        finally:
+            BROADCASTER.unsubscribe(source, queue)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+@V2.websocket("/ws")
+async def websocket_stream(websocket: WebSocket, source: Sources = "jhu"):
+    """
+    Streaming the refreshes of a data-source over a WebSocket (see `/stream`).
+    """
+    await websocket.accept()
+    source = Sources(source).value
+    queue = await BROADCASTER.subscribe(source)
+    receive = asyncio.ensure_future(websocket.receive())
+    event = asyncio.ensure_future(queue.get())
+    try:
+        while True:
+            await asyncio.wait({receive, event}, return_when=asyncio.FIRST_COMPLETED)
+            if receive.done():
+                if receive.result()["type"] == "websocket.disconnect":
+                    break
+                # Nothing is expected from the client.
+                receive = asyncio.ensure_future(websocket.receive())
+            if event.done():
+                await websocket.send_text(event.result().text)
+                event = asyncio.ensure_future(queue.get())
+    finally:
+        receive.cancel()
+        event.cancel()
+        BROADCASTER.unsubscribe(source, queue)
 
 
 @V2.get("/sources")
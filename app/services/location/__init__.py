@@ -1,5 +1,12 @@
 """app.services.location"""
 from abc import ABC, abstractmethod
+from collections import deque
+
+from ...config import get_settings
+from ...dataset import Dataset, fingerprint
+from ...utils.executors import run_in_executor
+
+SETTINGS = get_settings()
 
 
 class LocationService(ABC):
@@ -7,6 +14,12 @@ class LocationService(ABC):
     Service for retrieving locations.
     """
 
+    def __init__(self):
+        # The latest versions of the locations, oldest first.
+        self.datasets = deque(maxlen=SETTINGS.dataset_versions)
+        # Callables notified with each new version.
+        self.listeners = []
+
     @abstractmethod
     async def get_all(self):
         """
@@ -26,3 +39,39 @@ class LocationService(ABC):
         :rtype: Location
         """
         raise NotImplementedError
+
+    async def get_dataset(self):
+        """
+        Gets the current version of the locations, recording it in the versions of the
+        service. The listeners are notified of new versions.
+
+        :returns: The dataset.
+        :rtype: Dataset
+        """
+        locations = await self.get_all()
+        datasets = self.datasets
+        if not datasets or datasets[-1].locations is not locations:
+            # Digested off the event loop.
+            version = await run_in_executor(fingerprint, locations)
+            if datasets and datasets[-1].locations is locations:
+                return datasets[-1]  # Recorded by a concurrent request.
+            dataset = Dataset(locations, version)
+            if datasets and datasets[-1].version == dataset.version:
+                datasets[-1] = dataset  # Refreshed, but nothing changed.
+            else:
+                datasets.append(dataset)
+                for listener in self.listeners:
+                    listener(dataset)
+        return datasets[-1]
+
+    def get_version(self, version):
+        """
+        Gets a recorded version of the locations.
+
+        :returns: The dataset, None if the version is unknown or expired.
+        :rtype: Dataset
+        """
+        for dataset in self.datasets:
+            if dataset.version == version:
+                return dataset
+        return None
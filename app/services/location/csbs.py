@@ -1,18 +1,22 @@
 """app.services.location.csbs.py"""
 import csv
-import logging
 from datetime import datetime
 
 from asyncache import cached
-from cachetools import TTLCache
 
+from ... import metrics
 from ...caches import check_cache, load_cache
+from ...config import get_settings
 from ...coordinates import Coordinates
 from ...location.csbs import CSBSLocation
-from ...utils import httputils
+from ...utils import httputils, logs
+from ...utils.concurrency import single_flight
+from ...utils.executors import run_in_executor
+from ...utils.tracing import traced
 from . import LocationService
 
-LOGGER = logging.getLogger("services.location.csbs")
+LOGGER = logs.get_logger("services.location.csbs")
+SETTINGS = get_settings()
 
 
 class CSBSLocationService(LocationService):
@@ -32,10 +36,12 @@ class CSBSLocationService(LocationService):
 
 
 # Base URL for fetching data
-BASE_URL = "https://facts.csbs.org/covid-19/covid19_county.csv"
+BASE_URL = SETTINGS.csbs_url
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=3600))
+@cached(cache=metrics.CountedTTLCache("csbs.locations", maxsize=1, ttl=3600))
+@single_flight
+@traced("csbs.locations")
 async def get_locations():
     """
     Retrieves county locations; locations are cached for 1 hour
@@ -44,59 +50,74 @@ async def get_locations():
     :rtype: dict
     """
     data_id = "csbs.locations"
-    LOGGER.info(f"{data_id} Requesting data...")
+    LOGGER.info("requesting data", data_id=data_id)
     # check shared cache
     cache_results = await check_cache(data_id)
     if cache_results:
-        LOGGER.info(f"{data_id} using shared cache results")
+        LOGGER.info("using shared cache results", data_id=data_id)
         locations = cache_results
     else:
-        LOGGER.info(f"{data_id} shared cache empty")
-        async with httputils.CLIENT_SESSION.get(BASE_URL) as response:
-            text = await response.text()
-
-        LOGGER.debug(f"{data_id} Data received")
-
-        data = list(csv.DictReader(text.splitlines()))
-        LOGGER.debug(f"{data_id} CSV parsed")
-
-        locations = []
-
-        for i, item in enumerate(data):
-            # General info.
-            state = item["State Name"]
-            county = item["County Name"]
-
-            # Ensure country is specified.
-            if county in {"Unassigned", "Unknown"}:
-                continue
-
-            # Date string without "EDT" at end.
-            last_update = " ".join(item["Last Update"].split(" ")[0:2])
-
-            # Append to locations.
-            locations.append(
-                CSBSLocation(
-                    # General info.
-                    i,
-                    state,
-                    county,
-                    # Coordinates.
-                    Coordinates(item["Latitude"], item["Longitude"]),
-                    # Last update (parse as ISO).
-                    datetime.strptime(last_update, "%Y-%m-%d %H:%M").isoformat() + "Z",
-                    # Statistics.
-                    int(item["Confirmed"] or 0),
-                    int(item["Death"] or 0),
-                )
-            )
-        LOGGER.info(f"{data_id} Data normalized")
+        LOGGER.info("shared cache empty", data_id=data_id)
+        with metrics.FETCH_SECONDS.labels("csbs").time():
+            text = await httputils.get_text(BASE_URL)
+        metrics.FETCH_BYTES.labels("csbs").inc(len(text))
+
+        LOGGER.debug("data received", data_id=data_id)
+
+        # Parse and normalize the CSV off the event loop.
+        with metrics.PARSE_SECONDS.labels("csbs").time():
+            locations = await run_in_executor(parse_locations, text)
+        LOGGER.info("data normalized", data_id=data_id, locations=len(locations))
         # save the results to distributed cache
         # TODO: fix json serialization
         try:
             await load_cache(data_id, locations)
         except TypeError as type_err:
-            LOGGER.error(type_err)
+            LOGGER.error("shared cache not loaded", data_id=data_id, error=type_err)
 
     # Return the locations.
     return locations
+
+
+@traced("csbs.parse_locations")
+def parse_locations(text):
+    """
+    Parses and normalizes the CSV of county locations.
+
+    :returns: The locations.
+    :rtype: List[CSBSLocation]
+    """
+    data = csv.DictReader(text.splitlines())
+
+    locations = []
+
+    for i, item in enumerate(data):
+        # General info.
+        state = item["State Name"]
+        county = item["County Name"]
+
+        # Ensure country is specified.
+        if county in {"Unassigned", "Unknown"}:
+            continue
+
+        # Date string without "EDT" at end.
+        last_update = " ".join(item["Last Update"].split(" ")[0:2])
+
+        # Append to locations.
+        locations.append(
+            CSBSLocation(
+                # General info.
+                i,
+                state,
+                county,
+                # Coordinates.
+                Coordinates.parse(item["Latitude"], item["Longitude"]),
+                # Last update (parse as ISO).
+                datetime.strptime(last_update, "%Y-%m-%d %H:%M").isoformat() + "Z",
+                # Statistics.
+                int(item["Confirmed"] or 0),
+                int(item["Death"] or 0),
+            )
+        )
+
+    return locations
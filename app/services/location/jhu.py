@@ -1,24 +1,34 @@
 """app.services.location.jhu.py"""
 import csv
-import logging
 import os
 from datetime import datetime
-from pprint import pformat as pf
+from itertools import chain
+from typing import NamedTuple
 
 from asyncache import cached
-from cachetools import TTLCache
 
+from ... import metrics
 from ...caches import check_cache, load_cache
+from ...config import get_settings
 from ...coordinates import Coordinates
 from ...location import TimelinedLocation
-from ...models import Timeline
+from ...timeline import Timeline, date_axis
 from ...utils import countries
 from ...utils import date as date_util
-from ...utils import httputils
+from ...utils import httputils, logs
+from ...utils.concurrency import gather, single_flight
+from ...utils.executors import run_in_executor
+from ...utils.tracing import span, traced
 from . import LocationService
 
-LOGGER = logging.getLogger("services.location.jhu")
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+LOGGER = logs.get_logger("services.location.jhu")
 PID = os.getpid()
+SETTINGS = get_settings()
 
 
 class JhuLocationService(LocationService):
@@ -40,11 +50,18 @@ class JhuLocationService(LocationService):
 # ---------------------------------------------------------------
 
 
+# Categories of the time series.
+CATEGORIES = ("confirmed", "deaths", "recovered")
+
 # Base URL for fetching category.
-BASE_URL = "https://raw.githubusercontent.com/CSSEGISandData/2019-nCoV/master/csse_covid_19_data/csse_covid_19_time_series/"
+BASE_URL = SETTINGS.jhu_base_url
+
+# The last parsed revision of the CSV of each category.
+REVISIONS = {}
 
 
-@cached(cache=TTLCache(maxsize=4, ttl=3600))
+@cached(cache=metrics.CountedTTLCache("jhu.categories", maxsize=4, ttl=3600))
+@single_flight
 async def get_category(category):
     """
     Retrieves the data for the provided category. The data is cached for 30 minutes locally, 1 hour via shared Redis.
@@ -59,56 +76,27 @@ async def get_category(category):
     # check shared cache
     cache_results = await check_cache(data_id)
     if cache_results:
-        LOGGER.info(f"{data_id} using shared cache results")
+        LOGGER.info("using shared cache results", data_id=data_id)
         results = cache_results
     else:
-        LOGGER.info(f"{data_id} shared cache empty")
+        LOGGER.info("shared cache empty", data_id=data_id)
         # URL to request data from.
         url = BASE_URL + "time_series_covid19_%s_global.csv" % category
 
         # Request the data
-        LOGGER.info(f"{data_id} Requesting data...")
-        async with httputils.CLIENT_SESSION.get(url) as response:
-            text = await response.text()
-
-        LOGGER.debug(f"{data_id} Data received")
-
-        # Parse the CSV.
-        data = list(csv.DictReader(text.splitlines()))
-        LOGGER.debug(f"{data_id} CSV parsed")
-
-        # The normalized locations.
-        locations = []
+        LOGGER.info("requesting data", data_id=data_id)
+        with metrics.FETCH_SECONDS.labels("jhu").time():
+            text = await httputils.get_text(url)
+        metrics.FETCH_BYTES.labels("jhu").inc(len(text))
 
-        for item in data:
-            # Filter out all the dates.
-            dates = dict(filter(lambda element: date_util.is_date(element[0]), item.items()))
+        LOGGER.debug("data received", data_id=data_id, size=len(text))
 
-            # Make location history from dates.
-            history = {date: int(float(amount or 0)) for date, amount in dates.items()}
-
-            # Country for this location.
-            country = item["Country/Region"]
-
-            # Latest data insert value.
-            latest = list(history.values())[-1]
-
-            # Normalize the item and append to locations.
-            locations.append(
-                {
-                    # General info.
-                    "country": country,
-                    "country_code": countries.country_code(country),
-                    "province": item["Province/State"],
-                    # Coordinates.
-                    "coordinates": {"lat": item["Lat"], "long": item["Long"],},
-                    # History.
-                    "history": history,
-                    # Latest statistic.
-                    "latest": int(latest or 0),
-                }
-            )
-        LOGGER.debug(f"{data_id} Data normalized")
+        # Parse the CSV off the event loop, reusing the previous revision.
+        with metrics.PARSE_SECONDS.labels("jhu").time():
+            revision = await run_in_executor(parse_revision, text, REVISIONS.get(category))
+        REVISIONS[category] = revision
+        locations = revision.locations
+        LOGGER.debug("data normalized", data_id=data_id)
 
         # Latest total.
         latest = sum(map(lambda location: location["latest"], locations))
@@ -123,11 +111,266 @@ async def get_category(category):
         # save the results to distributed cache
         await load_cache(data_id, results)
 
-    LOGGER.info(f"{data_id} results:\n{pf(results, depth=1)}")
+    LOGGER.info(
+        "results",
+        data_id=data_id,
+        locations=len(results["locations"]),
+        latest=results["latest"],
+        last_updated=results["last_updated"],
+    )
     return results
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=3600))
+class CategoryRevision(NamedTuple):
+    """
+    A parsed revision of the CSV of a category, kept to parse the next revision of the
+    CSV incrementally (see `parse_revision`).
+    """
+
+    lines: list
+    dates: list
+    short: set  # Indexes of the rows missing cells.
+    locations: list
+
+
+def parse_category(text):
+    """
+    Parses and normalizes the CSV of a category. Every row has the same date columns,
+    so they are detected once from the header and converted to amounts in bulk.
+
+    :returns: The normalized locations.
+    :rtype: List[dict]
+    """
+    return parse_revision(text).locations
+
+
+@traced("jhu.parse_revision")
+def parse_revision(text, previous=None):
+    """
+    Parses the CSV of a category, reusing the previous revision of the CSV.
+
+    The time series grow by one date column a day: the rows starting with their previous
+    line only have the cells of the new columns parsed, the unchanged rows are reused and
+    the rows with retroactive corrections or added at the end are parsed again. The CSV is
+    parsed from scratch when the columns or the location of a row (metadata) changed.
+
+    :param text: The CSV.
+    :param previous: The previous revision of the CSV (CategoryRevision).
+    :returns: The revision.
+    :rtype: CategoryRevision
+    """
+    # Skip blank lines, like `csv.DictReader` does.
+    lines = [line for line in text.splitlines() if line]
+    if previous is None or not lines:
+        return _parse_lines(lines)
+    if lines == previous.lines:
+        return previous
+
+    new_dates = _new_dates(lines[0], previous.lines[0])
+    if new_dates is None or len(lines) < len(previous.lines):
+        return _parse_lines(lines)
+
+    locations = previous.locations[:]
+    grown, reparsed = _classify_rows(lines, previous, bool(new_dates))
+    reparsed += _append_columns(lines, previous, grown, new_dates, locations)
+
+    # Parse the other rows again, unless their location changed.
+    short = set(previous.short) - set(reparsed)
+    if reparsed:
+        reparsed_short = _reparse_rows(lines, previous, sorted(reparsed), locations)
+        if reparsed_short is None:
+            return _parse_lines(lines)
+        short.update(reparsed_short)
+
+    return CategoryRevision(lines, previous.dates + new_dates, short, locations)
+
+
+def _new_dates(header, previous_header):
+    """
+    Gets the date columns added to the header of the previous revision.
+
+    :returns: The new dates, None when the other columns changed.
+    :rtype: List[str]
+    """
+    added = header[len(previous_header) :]
+    if not header.startswith(previous_header) or (added and not added.startswith(",")):
+        return None
+    new_dates = next(csv.reader([added]))[1:] if added else []
+    if not all(date_util.is_date(name) for name in new_dates):
+        return None
+    return new_dates
+
+
+def _classify_rows(lines, previous, new_columns):
+    """
+    Sorts the changed rows: grown by the new columns, or to parse again. The unchanged
+    rows are reused.
+
+    :returns: The indexes of the grown rows and of the rows to parse again.
+    :rtype: Tuple[List[int], List[int]]
+    """
+    previous_rows = previous.lines[1:]
+    grown, reparsed = [], []
+    for index, line in enumerate(lines[1:]):
+        previous_line = previous_rows[index] if index < len(previous_rows) else None
+        if line == previous_line and not new_columns:
+            continue
+        if (
+            new_columns
+            and previous_line is not None
+            and index not in previous.short
+            and line.startswith(previous_line)
+            and line[len(previous_line) : len(previous_line) + 1] == ","
+        ):
+            grown.append(index)
+        else:
+            reparsed.append(index)
+    return grown, reparsed
+
+
+def _append_columns(lines, previous, grown, new_dates, locations):
+    """
+    Parses the cells of the new columns of the grown rows, adding them to the histories of
+    their locations.
+
+    :returns: The indexes of the rows with missing or extra cells, to parse again.
+    :rtype: List[int]
+    """
+    previous_rows = previous.lines[1:]
+    suffixes, reparsed = {}, []
+    for index, cells in zip(
+        grown, csv.reader(lines[row + 1][len(previous_rows[row]) :] for row in grown)
+    ):
+        if len(cells) == len(new_dates) + 1:
+            suffixes[index] = cells[1:]
+        else:
+            reparsed.append(index)
+    amounts = (
+        parse_amounts(list(suffixes.values()), list(range(len(new_dates)))) if suffixes else []
+    )
+    for index, new_amounts in zip(suffixes, amounts):
+        location = dict(locations[index])
+        location["history"] = dict(location["history"])
+        location["history"].update(zip(new_dates, new_amounts))
+        location["latest"] = new_amounts[-1]
+        locations[index] = location
+    return reparsed
+
+
+def _reparse_rows(lines, previous, reparsed, locations):
+    """
+    Parses rows again, replacing or adding their locations.
+
+    :param reparsed: The sorted indexes of the rows.
+    :returns: The indexes of the parsed rows missing cells, None when the location of a
+              row changed.
+    :rtype: List[int]
+    """
+    revision = _parse_lines([lines[0]] + [lines[index + 1] for index in reparsed])
+    for index, location in zip(reparsed, revision.locations):
+        if index < len(previous.lines) - 1 and _metadata(location) != _metadata(locations[index]):
+            return None
+        if index < len(locations):
+            locations[index] = location
+        else:
+            locations.append(location)
+    return [reparsed[position] for position in revision.short]
+
+
+def _metadata(location):
+    return location["country"], location["province"], location["coordinates"]
+
+
+@traced("jhu.parse_lines")
+def _parse_lines(lines):
+    rows = csv.reader(lines)
+    header = next(rows, [])
+    width = len(header)
+    # Pad short rows the way `csv.DictReader` does.
+    rows = list(rows)
+    short = {index for index, row in enumerate(rows) if len(row) < width}
+    rows = [row if len(row) >= width else row + [""] * (width - len(row)) for row in rows]
+
+    # Filter out all the dates.
+    columns = [index for index, name in enumerate(header) if date_util.is_date(name)]
+    dates = [header[index] for index in columns]
+
+    province, country, lat, long = (
+        header.index(name) for name in ("Province/State", "Country/Region", "Lat", "Long")
+    )
+
+    # The normalized locations.
+    locations = []
+
+    for row, amounts in zip(rows, parse_amounts(rows, columns)):
+        # Make location history from dates.
+        history = dict(zip(dates, amounts))
+
+        # Normalize the item and append to locations.
+        locations.append(
+            {
+                # General info.
+                "country": row[country],
+                "country_code": countries.country_code(row[country]),
+                "province": row[province],
+                # Coordinates.
+                "coordinates": {"lat": row[lat], "long": row[long],},
+                # History.
+                "history": history,
+                # Latest statistic.
+                "latest": amounts[-1] if amounts else 0,
+            }
+        )
+
+    return CategoryRevision(lines, dates, short, locations)
+
+
+@traced("jhu.parse_amounts")
+def parse_amounts(rows, columns):
+    """
+    Converts the amounts in the provided columns of the rows into integers, empty cells
+    count as 0. Uses NumPy to convert the whole matrix at once when it is available.
+
+    :returns: The amounts of every row.
+    :rtype: List[List[int]]
+    """
+    if not rows or not columns:
+        return [[] for _ in rows]
+
+    # Consecutive columns can be sliced instead of picked one by one.
+    if columns == list(range(columns[0], columns[-1] + 1)):
+        cells = [row[columns[0] : columns[-1] + 1] for row in rows]
+    else:
+        cells = [[row[index] for index in columns] for row in rows]
+
+    if numpy is None:
+        return [[int(float(amount or 0)) for amount in row] for row in cells]
+
+    try:
+        matrix = numpy.array(cells, dtype=numpy.float64)
+    except ValueError:
+        # Empty cells, count them as 0.
+        matrix = numpy.array(
+            [[amount or 0 for amount in row] for row in cells], dtype=numpy.float64
+        )
+    return matrix.astype(numpy.int64).tolist()
+
+
+async def get_categories(categories=CATEGORIES):
+    """
+    Retrieves the data for the provided categories concurrently.
+
+    :returns: The data for each category.
+    :rtype: List[dict]
+    """
+    return await gather(
+        *(get_category(category) for category in categories), limit=SETTINGS.fetch_concurrency
+    )
+
+
+@cached(cache=metrics.CountedTTLCache("jhu.locations", maxsize=1, ttl=3600))
+@single_flight
+@traced("jhu.locations")
 async def get_locations():
     """
     Retrieves the locations from the categories. The locations are cached for 1 hour.
@@ -136,15 +379,40 @@ async def get_locations():
     :rtype: List[Location]
     """
     data_id = "jhu.locations"
-    LOGGER.info(f"pid:{PID}: {data_id} Requesting data...")
+    LOGGER.info("requesting data", data_id=data_id, pid=PID)
     # Get all of the data categories locations.
-    confirmed = await get_category("confirmed")
-    deaths = await get_category("deaths")
-    recovered = await get_category("recovered")
+    confirmed, deaths, recovered = await get_categories()
+
+    # Merge the categories off the event loop.
+    with metrics.PARSE_SECONDS.labels("jhu").time():
+        locations = await run_in_executor(
+            build_locations, confirmed["locations"], deaths["locations"], recovered["locations"]
+        )
+    LOGGER.info("data normalized", data_id=data_id, locations=len(locations))
 
-    locations_confirmed = confirmed["locations"]
-    locations_deaths = deaths["locations"]
-    locations_recovered = recovered["locations"]
+    # Finally, return the locations.
+    return locations
+
+
+@traced("jhu.build_locations")
+def build_locations(locations_confirmed, locations_deaths, locations_recovered):
+    """
+    Merges the normalized locations of the categories into timelined locations.
+
+    :returns: The locations.
+    :rtype: List[TimelinedLocation]
+    """
+    # Parse the dates once, every row of a category shares the same date columns.
+    with span("jhu.date_axis"):
+        axis, positions = date_axis(
+            chain.from_iterable(
+                location["history"]
+                for category in (locations_confirmed, locations_deaths, locations_recovered)
+                for location in category[:1]
+            ),
+            "%m/%d/%y",
+        )
+    last_updated = datetime.utcnow().isoformat() + "Z"
 
     # Final locations to return.
     locations = []
@@ -178,35 +446,17 @@ async def get_locations():
                 location["country"],
                 location["province"],
                 # Coordinates.
-                Coordinates(latitude=coordinates["lat"], longitude=coordinates["long"]),
+                Coordinates.parse(latitude=coordinates["lat"], longitude=coordinates["long"]),
                 # Last update.
-                datetime.utcnow().isoformat() + "Z",
-                # Timelines (parse dates as ISO).
+                last_updated,
+                # Timelines (on the shared date axis).
                 {
-                    "confirmed": Timeline(
-                        timeline={
-                            datetime.strptime(date, "%m/%d/%y").isoformat() + "Z": amount
-                            for date, amount in timelines["confirmed"].items()
-                        }
-                    ),
-                    "deaths": Timeline(
-                        timeline={
-                            datetime.strptime(date, "%m/%d/%y").isoformat() + "Z": amount
-                            for date, amount in timelines["deaths"].items()
-                        }
-                    ),
-                    "recovered": Timeline(
-                        timeline={
-                            datetime.strptime(date, "%m/%d/%y").isoformat() + "Z": amount
-                            for date, amount in timelines["recovered"].items()
-                        }
-                    ),
+                    category: Timeline.from_history(axis, positions, history)
+                    for category, history in timelines.items()
                 },
             )
         )
-    LOGGER.info(f"{data_id} Data normalized")
 
-    # Finally, return the locations.
     return locations
 
 
@@ -223,6 +473,6 @@ def parse_history(key: tuple, locations: list, index: int):
         if key == (locations[index]["country"], locations[index]["province"]):
             location_history = locations[index]["history"]
     except (IndexError, KeyError):
-        LOGGER.debug(f"iteration data merge error: {index} {key}")
+        LOGGER.debug("iteration data merge error", index=index, key=key)
 
     return location_history
@@ -1,19 +1,26 @@
 """app.services.location.nyt.py"""
 import csv
-import logging
+import time
+import zlib
+from array import array
 from datetime import datetime
 
 from asyncache import cached
-from cachetools import TTLCache
 
+from ... import metrics
 from ...caches import check_cache, load_cache
+from ...config import get_settings
 from ...coordinates import Coordinates
 from ...location.nyt import NYTLocation
-from ...models import Timeline
-from ...utils import httputils
+from ...timeline import Timeline, iso_date
+from ...utils import httputils, logs
+from ...utils.concurrency import single_flight
+from ...utils.executors import run_in_executor
+from ...utils.tracing import span, traced
 from . import LocationService
 
-LOGGER = logging.getLogger("services.location.nyt")
+LOGGER = logs.get_logger("services.location.nyt")
+SETTINGS = get_settings()
 
 
 class NYTLocationService(LocationService):
@@ -36,79 +43,159 @@ class NYTLocationService(LocationService):
 
 
 # Base URL for fetching category.
-BASE_URL = "https://raw.githubusercontent.com/nytimes/covid-19-data/master/us-counties.csv"
+BASE_URL = SETTINGS.nyt_url
 
+# Rebuild the feed from scratch at least once a day, picking up retroactive corrections.
+FULL_REFRESH_INTERVAL = 24 * 60 * 60
 
-def get_grouped_locations_dict(data):
+# The incrementally ingested feed (see `refresh_feed`).
+FEED = None
+
+
+class NYTFeed:  # pylint: disable=too-many-instance-attributes
     """
-    Helper function to group history for locations into one dict.
+    The parsed state of the append-only NYT feed.
 
-    :returns: The complete data for each unique US county
-    :rdata: dict
+    The CSV is ordered by date, so new rows are appended to the histories of the counties
+    and only the bytes after `offset` have to be ingested on a refresh.
     """
-    grouped_locations = {}
 
-    # in increasing order of dates
-    for row in data:
-        county_state = (row["county"], row["state"])
-        date = row["date"]
-        confirmed = row["cases"]
-        deaths = row["deaths"]
+    def __init__(self):
+        self.created = time.monotonic()
+        self.offset = 0  # Bytes of the feed ingested so far.
+        self.checksum = 0  # CRC32 of the ingested bytes.
+        self.last_byte = b""
+        self.columns = None
+        self.axis = []
+        self.positions = {}
+        self.counties = {}
+        self.locations = None
 
-        # initialize if not existing
-        if county_state not in grouped_locations:
-            grouped_locations[county_state] = {"confirmed": [], "deaths": []}
+    @traced("nyt.extend")
+    def extend(self, data):
+        """
+        Ingests the rows of data following the `offset` of the feed. A feed failing to
+        extend is left as it was.
 
-        # append confirmed tuple to county_state (date, # confirmed)
-        grouped_locations[county_state]["confirmed"].append((date, confirmed))
-        # append deaths tuple to county_state (date, # deaths)
-        grouped_locations[county_state]["deaths"].append((date, deaths))
+        :param data: The bytes of the feed following its `offset`.
+        :returns: False if the rows do not append to the histories, True otherwise.
+        :rtype: bool
+        """
+        if not data:
+            return True
 
-    return grouped_locations
+        rows = csv.reader(data.decode("utf-8").splitlines())
+        if self.columns is None:
+            header = next(rows)
+            self.columns = tuple(
+                header.index(column) for column in ("date", "county", "state", "cases", "deaths")
+            )
 
+        axis_length, journal = len(self.axis), {}
+        try:
+            appended = self._ingest(rows, journal)
+        except (ValueError, IndexError):
+            self._rollback(axis_length, journal)
+            raise
+        if not appended:
+            self._rollback(axis_length, journal)
+            return False
 
-@cached(cache=TTLCache(maxsize=1, ttl=3600))
-async def get_locations():
-    """
-    Returns a list containing parsed NYT data by US county. The data is cached for 1 hour.
+        self.offset += len(data)
+        self.checksum = zlib.crc32(data, self.checksum)
+        self.last_byte = data[-1:]
+        self.locations = None
+        return True
 
-    :returns: The complete data for US Counties.
-    :rtype: dict
-    """
-    data_id = "nyt.locations"
-    # Request the data.
-    LOGGER.info(f"{data_id} Requesting data...")
-    # check shared cache
-    cache_results = await check_cache(data_id)
-    if cache_results:
-        LOGGER.info(f"{data_id} using shared cache results")
-        locations = cache_results
-    else:
-        LOGGER.info(f"{data_id} shared cache empty")
-        async with httputils.CLIENT_SESSION.get(BASE_URL) as response:
-            text = await response.text()
+    def _ingest(self, rows, journal):
+        """
+        Appends rows to the histories of the counties. A duplicated row of a county and date
+        replaces the previous one. The previous state of the changed counties is recorded in
+        `journal` (see `_rollback`).
 
-        LOGGER.debug(f"{data_id} Data received")
+        :returns: False if a row does not append to the histories, True otherwise.
+        :rtype: bool
+        """
+        date_column, county_column, state_column, cases_column, deaths_column = self.columns
+        positions, counties = self.positions, self.counties
+        for row in rows:
+            if not row:
+                continue
+            position = positions.get(row[date_column])
+            if position is None:
+                position = self._append_date(row[date_column])
+                if position is None:
+                    return False
 
-        # Parse the CSV.
-        data = list(csv.DictReader(text.splitlines()))
-        LOGGER.debug(f"{data_id} CSV parsed")
+            county_state = (row[county_column], row[state_column])
+            history = counties.get(county_state)
+            if history is None:
+                history = counties[county_state] = (array("l"), array("q"), array("q"))
+                journal[county_state] = None
+            elif county_state not in journal:
+                journal[county_state] = (len(history[0]), history[1][-1], history[2][-1])
+            last = history[0][-1] if history[0] else -1
+            if position < last:
+                return False
+            if position == last:
+                history[1][-1] = int(row[cases_column] or 0)
+                history[2][-1] = int(row[deaths_column] or 0)
+                continue
+            history[0].append(position)
+            history[1].append(int(row[cases_column] or 0))
+            history[2].append(int(row[deaths_column] or 0))
+        return True
 
-        # Group together locations (NYT data ordered by dates not location).
-        grouped_locations = get_grouped_locations_dict(data)
+    def _append_date(self, date):
+        """
+        Appends a date to the axis.
 
-        # The normalized locations.
-        locations = []
+        :returns: The position of the date, None when it precedes the end of the axis.
+        :rtype: int
+        """
+        iso = iso_date(date, "%Y-%m-%d")
+        if self.axis and iso < self.axis[-1]:
+            return None
+        position = self.positions[date] = len(self.axis)
+        self.axis.append(iso)
+        return position
+
+    def _rollback(self, axis_length, journal):
+        """
+        Restores the axis and the histories of the counties changed by an `_ingest`.
+        """
+        for date in [date for date, position in self.positions.items() if position >= axis_length]:
+            del self.positions[date]
+        del self.axis[axis_length:]
+        for county_state, previous in journal.items():
+            if previous is None:
+                del self.counties[county_state]
+                continue
+            length, cases, deaths = previous
+            history = self.counties[county_state]
+            for values in history:
+                del values[length:]
+            history[1][-1], history[2][-1] = cases, deaths
+
+    @traced("nyt.build_locations")
+    def get_locations(self):
+        """
+        Gets the normalized locations of the feed. The locations are only rebuilt after
+        new rows were ingested; their timelines are copies, unaffected by later refreshes.
 
-        for idx, (county_state, histories) in enumerate(grouped_locations.items()):
-            # Make location history for confirmed and deaths from dates.
-            # List is tuples of (date, amount) in order of increasing dates.
-            confirmed_list = histories["confirmed"]
-            confirmed_history = {date: int(amount or 0) for date, amount in confirmed_list}
+        :returns: The locations.
+        :rtype: List[NYTLocation]
+        """
+        if self.locations is not None:
+            return self.locations
 
-            deaths_list = histories["deaths"]
-            deaths_history = {date: int(amount or 0) for date, amount in deaths_list}
+        axis = tuple(self.axis)
+        last_updated = datetime.utcnow().isoformat() + "Z"  # since last request
 
+        # The normalized locations.
+        locations = []
+
+        for idx, (county_state, (positions, confirmed, deaths)) in enumerate(self.counties.items()):
             # Normalize the item and append to locations.
             locations.append(
                 NYTLocation(
@@ -116,30 +203,151 @@ async def get_locations():
                     state=county_state[1],
                     county=county_state[0],
                     coordinates=Coordinates(None, None),  # NYT does not provide coordinates
-                    last_updated=datetime.utcnow().isoformat() + "Z",  # since last request
+                    last_updated=last_updated,
                     timelines={
-                        "confirmed": Timeline(
-                            timeline={
-                                datetime.strptime(date, "%Y-%m-%d").isoformat() + "Z": amount
-                                for date, amount in confirmed_history.items()
-                            }
-                        ),
-                        "deaths": Timeline(
-                            timeline={
-                                datetime.strptime(date, "%Y-%m-%d").isoformat() + "Z": amount
-                                for date, amount in deaths_history.items()
-                            }
-                        ),
+                        "confirmed": make_timeline(axis, positions, confirmed),
+                        "deaths": make_timeline(axis, positions, deaths),
                         "recovered": Timeline(),
                     },
                 )
             )
-        LOGGER.info(f"{data_id} Data normalized")
+
+        self.locations = locations
+        return locations
+
+
+def make_timeline(axis, positions, values):
+    """
+    Creates a timeline from a copy of the amounts of a county.
+
+    :param axis: The ISO 8601 dates of the feed.
+    :param positions: The (increasing) positions of the amounts on the axis.
+    :param values: The amounts.
+    :returns: The timeline.
+    :rtype: Timeline
+    """
+    if positions[-1] - positions[0] + 1 == len(positions):
+        # Consecutive dates, reference the axis.
+        return Timeline(axis, array("q", values), positions[0])
+    return Timeline(tuple(axis[position] for position in positions), array("q", values))
+
+
+@traced("nyt.parse_feed")
+def parse_feed(data):
+    """
+    Parses the complete NYT feed.
+
+    :returns: The feed.
+    :rtype: NYTFeed
+    """
+    feed = NYTFeed()
+    if not feed.extend(data):
+        raise ValueError("The NYT feed is not ordered by date")
+    return feed
+
+
+def parse_locations(text):
+    """
+    Parses and normalizes the CSV of US counties.
+
+    :returns: The locations.
+    :rtype: List[NYTLocation]
+    """
+    return parse_feed(text.encode("utf-8")).get_locations()
+
+
+async def _get_bytes(url, offset=0):
+    headers = {}
+    if offset:
+        # Ranges apply to the encoded body, ask for the identity.
+        headers = {"Range": f"bytes={offset}-", "Accept-Encoding": "identity"}
+    with metrics.FETCH_SECONDS.labels("nyt").time(), span("http.get", url=url) as current:
+        async with httputils.CLIENT_SESSION.get(url, headers=headers) as response:
+            if response.status == 416:
+                # Range Not Satisfiable, the feed shrunk.
+                return response.status, b""
+            response.raise_for_status()
+            data = await response.read()
+        current.set(status=response.status, length=len(data), offset=offset)
+    metrics.FETCH_BYTES.labels("nyt").inc(len(data))
+    return response.status, data
+
+
+@traced("nyt.refresh_feed")
+async def refresh_feed():
+    """
+    Brings the NYT feed up to date. Only the bytes appended since the previous refresh are
+    requested (HTTP Range) and ingested; the feed is rebuilt from scratch when the upstream
+    rewrote its history, or once it is older than `FULL_REFRESH_INTERVAL`.
+    Servers ignoring the Range header send the complete feed, only its unseen tail is
+    ingested when the rest is unchanged. The previous feed is kept until a new one is built,
+    a failed refresh leaves it in place.
+
+    :returns: The feed.
+    :rtype: NYTFeed
+    """
+    global FEED  # pylint: disable=global-statement
+    feed, data = FEED, None
+
+    if feed is not None and feed.offset and time.monotonic() - feed.created < FULL_REFRESH_INTERVAL:
+        # Request the last ingested byte too, as a sanity check that the feed was only appended.
+        status, data = await httputils.retry(_get_bytes, BASE_URL, feed.offset - 1)
+        if status == 206 and data[:1] == feed.last_byte:
+            tail = data[1:]
+        elif status == 200 and zlib.crc32(data[: feed.offset]) == feed.checksum:
+            tail = data[feed.offset :]
+        else:
+            tail = None
+        try:
+            with metrics.PARSE_SECONDS.labels("nyt").time():
+                appended = tail is not None and feed.extend(tail)
+        except (ValueError, IndexError):
+            appended = False  # Not rows of the feed.
+        if appended:
+            LOGGER.debug("ingested new bytes", data_id="nyt.locations", size=len(tail))
+            return feed
+        LOGGER.info("history changed, rebuilding", data_id="nyt.locations")
+        if status != 200:
+            data = None
+
+    if data is None:
+        _, data = await httputils.retry(_get_bytes, BASE_URL)
+    with metrics.PARSE_SECONDS.labels("nyt").time():
+        FEED = await run_in_executor(parse_feed, data)
+    return FEED
+
+
+@cached(cache=metrics.CountedTTLCache("nyt.locations", maxsize=1, ttl=3600))
+@single_flight
+@traced("nyt.locations")
+async def get_locations():
+    """
+    Returns a list containing parsed NYT data by US county. The data is cached for 1 hour.
+
+    :returns: The complete data for US Counties.
+    :rtype: dict
+    """
+    data_id = "nyt.locations"
+    # Request the data.
+    LOGGER.info("requesting data", data_id=data_id)
+    # check shared cache
+    cache_results = await check_cache(data_id)
+    if cache_results:
+        LOGGER.info("using shared cache results", data_id=data_id)
+        locations = cache_results
+    else:
+        LOGGER.info("shared cache empty", data_id=data_id)
+        feed = await refresh_feed()
+
+        LOGGER.debug("data received", data_id=data_id)
+
+        locations = feed.get_locations()
+        LOGGER.info("data normalized", data_id=data_id, locations=len(locations))
         # save the results to distributed cache
         # TODO: fix json serialization
         try:
             await load_cache(data_id, locations)
         except TypeError as type_err:
-            LOGGER.error(type_err)
+            LOGGER.error("shared cache not loaded", data_id=data_id, error=type_err)
 
     return locations
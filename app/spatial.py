@@ -0,0 +1,158 @@
+"""app.spatial.py"""
+import math
+from itertools import chain
+
+# The mean radius of the earth, in kilometers.
+EARTH_RADIUS = 6371.0088
+
+# The longest distance between two positions on earth, in kilometers.
+HALF_CIRCUMFERENCE = math.pi * EARTH_RADIUS
+
+
+def distance(latitude, longitude, other_latitude, other_longitude):
+    """
+    Gets the great-circle distance between two positions (haversine formula).
+
+    :returns: The distance in kilometers.
+    :rtype: float
+    """
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    half_lambda = math.radians(other_longitude - longitude) / 2
+    half_phi = (other_phi - phi) / 2
+    haversine = (
+        math.sin(half_phi) ** 2 + math.cos(phi) * math.cos(other_phi) * math.sin(half_lambda) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(haversine)))
+
+
+class GridIndex:
+    """
+    A spatial index of locations, bucketed in cells of `cell` degrees of latitude and
+    longitude. A query only looks at the locations of the cells it overlaps. Locations
+    without coordinates are not indexed.
+    """
+
+    __slots__ = ("cell", "cells", "size")
+
+    def __init__(self, locations, cell=1.0):
+        self.cell = cell
+        self.cells = {}
+        self.size = 0
+        for location in locations:
+            latitude = location.coordinates.latitude
+            longitude = location.coordinates.longitude
+            if latitude is None or longitude is None:
+                continue
+            self.cells.setdefault(self.key(latitude, longitude), []).append(
+                (latitude, longitude, location)
+            )
+            self.size += 1
+
+    def key(self, latitude, longitude):
+        """
+        Gets the cell of a position.
+
+        :returns: The row and column of the cell.
+        :rtype: Tuple[int, int]
+        """
+        return math.floor(latitude / self.cell), math.floor(longitude / self.cell)
+
+    def bbox(self, south, west, north, east):
+        """
+        Gets the locations inside a bounding box (edges included). The box crosses the
+        antimeridian when `west` is greater than `east`.
+
+        :returns: The locations, ordered by id.
+        :rtype: List[Location]
+        """
+        return sorted(
+            (location for _, _, location in self._points(south, west, north, east)),
+            key=lambda location: location.id,
+        )
+
+    def radius(self, latitude, longitude, kilometers):
+        """
+        Gets the locations within a distance of a position.
+
+        :returns: The distances (km) and locations, nearest first.
+        :rtype: List[Tuple[float, Location]]
+        """
+        if kilometers >= HALF_CIRCUMFERENCE:
+            south, west, north, east = -90.0, -180.0, 90.0, 180.0
+        else:
+            # The bounding box of the circle.
+            angle = kilometers / EARTH_RADIUS
+            south = latitude - math.degrees(angle)
+            north = latitude + math.degrees(angle)
+            if south <= -90 or north >= 90:
+                # Around a pole, all of the longitudes.
+                west, east = -180.0, 180.0
+            else:
+                spread = math.degrees(
+                    math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(latitude))))
+                )
+                west, east = _wrap(longitude - spread), _wrap(longitude + spread)
+        found = []
+        for point_latitude, point_longitude, location in self._points(
+            max(south, -90.0), west, min(north, 90.0), east
+        ):
+            point_distance = distance(latitude, longitude, point_latitude, point_longitude)
+            if point_distance <= kilometers:
+                found.append((point_distance, location))
+        found.sort(key=lambda item: (item[0], item[1].id))
+        return found
+
+    def nearest(self, latitude, longitude, count):
+        """
+        Gets the `count` nearest locations of a position. The search radius doubles, from the
+        size of a cell, until enough locations are found.
+
+        :returns: The distances (km) and locations, nearest first.
+        :rtype: List[Tuple[float, Location]]
+        """
+        if count <= 0 or not self.size:
+            return []
+        kilometers = self.cell * HALF_CIRCUMFERENCE / 180
+        while True:
+            found = self.radius(latitude, longitude, kilometers)
+            # Any other location is farther than the radius, thus than the ones found.
+            if len(found) >= count or kilometers >= HALF_CIRCUMFERENCE:
+                return found[:count]
+            kilometers *= 2
+
+    def _points(self, south, west, north, east):
+        # The indexed points inside a bounding box.
+        rows = range(math.floor(south / self.cell), math.floor(north / self.cell) + 1)
+        if west <= east:
+            columns = range(math.floor(west / self.cell), math.floor(east / self.cell) + 1)
+        else:
+            columns = chain(
+                range(math.floor(west / self.cell), math.floor(180 / self.cell) + 1),
+                range(math.floor(-180 / self.cell), math.floor(east / self.cell) + 1),
+            )
+        columns = set(columns)
+        if len(rows) * len(columns) > len(self.cells):
+            # A large box, fewer cells in the index than in the box.
+            cells = [
+                points
+                for (row, column), points in self.cells.items()
+                if row in rows and column in columns
+            ]
+        else:
+            cells = [self.cells.get((row, column), ()) for row in rows for column in columns]
+        for points in cells:
+            for point in points:
+                point_latitude, point_longitude = point[0], point[1]
+                if south <= point_latitude <= north and (
+                    west <= point_longitude <= east
+                    if west <= east
+                    else point_longitude >= west or point_longitude <= east
+                ):
+                    yield point
+
+
+def _wrap(longitude):
+    # The longitude between -180 and 180.
+    if -180 <= longitude <= 180:
+        return longitude
+    return (longitude + 180) % 360 - 180
@@ -0,0 +1,348 @@
+"""app.timeline.py"""
+import math
+import operator
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate, chain, repeat
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# The series derivable from a timeline (see `Timeline.derive`).
+METRICS = ("daily", "rolling_mean", "doubling_time", "per_capita")
+
+# The series depending on a window of days, and the window kept with the timelines.
+WINDOWED_METRICS = ("rolling_mean", "doubling_time")
+DEFAULT_WINDOW = 7
+
+
+def iso_date(raw_date, date_format):
+    """
+    Parses a date of a data-source into an interned ISO 8601 string.
+
+    :param raw_date: The date as found in the data-source.
+    :param date_format: The `datetime.strptime` format of the raw date.
+    :returns: The ISO 8601 date.
+    :rtype: str
+    """
+    return sys.intern(datetime.strptime(raw_date, date_format).isoformat() + "Z")
+
+
+def date_axis(raw_dates, date_format):
+    """
+    Parses the dates of a data-source into an axis shared by all of its timelines.
+    Every distinct date is parsed, formatted (ISO 8601) and interned only once.
+
+    :param raw_dates: The dates as found in the data-source (duplicates allowed).
+    :param date_format: The `datetime.strptime` format of the raw dates.
+    :returns: The sorted ISO 8601 dates and the position of each raw date on the axis.
+    :rtype: Tuple[tuple, dict]
+    """
+    parsed = {raw: iso_date(raw, date_format) for raw in set(raw_dates)}
+    axis = tuple(sorted(set(parsed.values())))
+    index = {date: position for position, date in enumerate(axis)}
+    return axis, {raw: index[date] for raw, date in parsed.items()}
+
+
+class Timeline:
+    """
+    A history of cumulative amounts, ordered by date.
+
+    The amounts are kept in a compact integer array and reference their dates by
+    position on a (shared) axis of ISO 8601 dates: the amount at index `i` belongs to
+    `axis[start + i]`. The pydantic `app.models.Timeline` is only used to describe
+    the API responses.
+    """
+
+    __slots__ = ("axis", "start", "values", "derived")
+
+    def __init__(self, axis=(), values=(), start=0):
+        self.axis = axis
+        self.start = start
+        self.values = values if isinstance(values, array) else array("q", values)
+        self.derived = None
+
+    @classmethod
+    def from_dict(cls, timeline):
+        """
+        Creates a timeline from a mapping of ISO 8601 dates to amounts.
+
+        :returns: The timeline, sorted by date.
+        :rtype: Timeline
+        """
+        items = sorted(timeline.items())
+        return cls(tuple(date for date, _ in items), (amount for _, amount in items))
+
+    @classmethod
+    def from_history(cls, axis, positions, history):
+        """
+        Creates a timeline on a shared axis (see `date_axis`).
+
+        :param axis: The ISO 8601 dates of the data-source.
+        :param positions: The position of each raw date on the axis.
+        :param history: A mapping of raw dates to amounts.
+        :returns: The timeline.
+        :rtype: Timeline
+        """
+        indexes = [positions[date] for date in history]
+        start = indexes[0] if indexes else 0
+        if indexes == list(range(start, start + len(indexes))):
+            # Consecutive dates in order, reference the axis.
+            return cls(axis, history.values(), start)
+        # Gaps in the history, keep the (shared) date strings of this timeline only.
+        items = sorted(zip(indexes, history.values()))
+        return cls(tuple(axis[index] for index, _ in items), (amount for _, amount in items))
+
+    @property
+    def dates(self):
+        """
+        Gets the dates of the amounts.
+
+        :returns: The ISO 8601 dates.
+        :rtype: tuple
+        """
+        return self.axis[self.start : self.start + len(self.values)]
+
+    @property
+    def latest(self):
+        """
+        Gets the latest available amount.
+
+        :returns: The latest amount.
+        :rtype: int
+        """
+        if not self.values:
+            return 0
+        return _number(self.values[-1]) if self.values.typecode == "d" else self.values[-1]
+
+    @property
+    def timeline(self):
+        """
+        Gets the history as a mapping of dates to amounts.
+
+        :returns: The history.
+        :rtype: dict
+        """
+        if self.values.typecode == "d":
+            return dict(zip(self.dates, map(_number, self.values)))
+        return dict(zip(self.dates, self.values))
+
+    def slice(self, start=None, end=None):
+        """
+        Gets the part of the timeline between two dates (both inclusive).
+
+        :param start: The first date to include (datetime.date).
+        :param end: The last date to include (datetime.date).
+        :returns: The sliced timeline.
+        :rtype: Timeline
+        """
+        first, last = self.start, self.start + len(self.values)
+        lower = bisect_left(self.axis, start.isoformat(), first, last) if start else first
+        upper = (
+            bisect_left(self.axis, (end + timedelta(days=1)).isoformat(), lower, last)
+            if end
+            else last
+        )
+        return Timeline(self.axis, self.values[lower - first : upper - first], lower)
+
+    def deltas(self):
+        """
+        Gets the daily changes of the timeline (e.g. new cases per day).
+
+        :returns: The daily changes.
+        :rtype: Timeline
+        """
+        values = self.values
+        return Timeline(
+            self.axis,
+            (current - previous for previous, current in zip(chain((0,), values), values)),
+            self.start,
+        )
+
+    def lagged(self, lag):
+        """
+        Gets the changes of the amounts over `lag` days (amounts before the timeline count
+        as 0).
+
+        :returns: The changes.
+        :rtype: Iterator[int]
+        """
+        values = self.values
+        return (
+            current - previous for current, previous in zip(values, chain(repeat(0, lag), values))
+        )
+
+    def rolling_mean(self, window=7):
+        """
+        Gets the mean daily change over the trailing `window` days (fewer at the start).
+        As the amounts are cumulative, every mean is a single difference.
+
+        :returns: The rolling means.
+        :rtype: Timeline
+        """
+        if numpy is not None:
+            current, previous = self._shifted(window)
+            days = numpy.minimum(numpy.arange(1, len(current) + 1), window)
+            return self._floats((current - previous) / days)
+        return self._floats(
+            change / min(index + 1, window) for index, change in enumerate(self.lagged(window))
+        )
+
+    def doubling_time(self, window=7):
+        """
+        Gets the days the amounts take to double, at the growth rate of the trailing
+        `window` days. Undefined (NaN) without growth.
+
+        :returns: The doubling times.
+        :rtype: Timeline
+        """
+        ratio = math.log(2) * window
+        if numpy is not None:
+            current, previous = self._shifted(window)
+            growing = (current > previous) & (previous > 0)
+            days = numpy.full(len(current), numpy.nan)
+            days[growing] = ratio / numpy.log(current[growing] / previous[growing])
+            return self._floats(days)
+        values = self.values
+        return self._floats(
+            ratio / math.log(current / previous) if current > previous > 0 else math.nan
+            for current, previous in zip(values, chain(repeat(0, window), values))
+        )
+
+    def per_capita(self, population, per=100000):
+        """
+        Gets the amounts per `per` inhabitants. Undefined (NaN) without population.
+
+        :returns: The amounts per capita.
+        :rtype: Timeline
+        """
+        scale = per / population if population else math.nan
+        if numpy is not None:
+            return self._floats(numpy.frombuffer(self.values, dtype=numpy.int64) * scale)
+        return self._floats(value * scale for value in self.values)
+
+    def _shifted(self, lag):
+        # The amounts and the amounts `lag` days before (0 before the timeline), as NumPy
+        # arrays sharing the memory of the values.
+        current = (
+            numpy.frombuffer(self.values, dtype=numpy.int64) if self.values else numpy.zeros(0)
+        )
+        previous = numpy.zeros(len(current))
+        if lag < len(current):
+            previous[lag:] = current[: len(current) - lag]
+        return current, previous
+
+    def _floats(self, values):
+        # A timeline of floats on the same dates.
+        floats = array("d")
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            floats.frombytes(values.astype(numpy.float64).tobytes())
+        else:
+            floats.extend(values)
+        return Timeline(self.axis, floats, self.start)
+
+    def derive(self, metric, window=DEFAULT_WINDOW, population=None):
+        """
+        Gets a series derived from the timeline (see `METRICS`). The series are computed once
+        and kept with the timeline, the series of other windows than `DEFAULT_WINDOW` are
+        computed for each call.
+
+        :param metric: The name of the series.
+        :param window: The days of the rolling mean and of the doubling time.
+        :param population: The population, for the amounts per 100k inhabitants.
+        :returns: The series.
+        :rtype: Timeline
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric `{metric}`")
+        windowed = metric in WINDOWED_METRICS
+        if windowed and window != DEFAULT_WINDOW:
+            return self._derive(metric, window, population)
+        key = (metric, population) if metric == "per_capita" else metric
+        if self.derived is None:
+            self.derived = {}
+        series = self.derived.get(key)
+        if series is None:
+            series = self.derived[key] = self._derive(metric, window, population)
+        return series
+
+    def _derive(self, metric, window, population):
+        # Computes a derived series.
+        if metric == "daily":
+            return self.deltas()
+        if metric == "rolling_mean":
+            return self.rolling_mean(window)
+        if metric == "doubling_time":
+            return self.doubling_time(window)
+        return self.per_capita(population)
+
+    def serialize(self, timeline=True):
+        """
+        Serializes the timeline into a dict.
+
+        :param timeline: Whether to include the history or only the latest amount.
+        :returns: The serialized timeline.
+        :rtype: dict
+        """
+        if not timeline:
+            return {"latest": self.latest}
+        return {"latest": self.latest, "timeline": self.timeline}
+
+    def __len__(self):
+        return len(self.values)
+
+
+def sum_timelines(timelines):
+    """
+    Sums cumulative timelines date by date. A timeline ending before the others keeps
+    counting with its latest amount, as does a timeline with gaps in its dates.
+
+    :returns: The total timeline.
+    :rtype: Timeline
+    """
+    timelines = [timeline for timeline in timelines if timeline.values]
+    if not timelines:
+        return Timeline()
+    axes = {id(timeline.axis): timeline.axis for timeline in timelines}
+    if len(axes) == 1:
+        # The usual case, all of the timelines reference the axis of the data-source.
+        (axis,) = axes.values()
+        offset = min(timeline.start for timeline in timelines)
+        end = max(timeline.start + len(timeline) for timeline in timelines)
+        index = None
+    else:
+        axis = tuple(sorted(set(chain.from_iterable(timeline.dates for timeline in timelines))))
+        offset, end = 0, len(axis)
+        index = {date: position for position, date in enumerate(axis)}
+
+    totals = [0] * (end - offset)
+    # The latest amounts carried from the end of each timeline.
+    carried = [0] * (end - offset + 1)
+    for timeline in timelines:
+        values = timeline.values
+        if index is None:
+            first = timeline.start - offset
+        else:
+            positions = [index[date] for date in timeline.dates]
+            first = positions[0]
+            values = list(
+                chain.from_iterable(
+                    repeat(amount, following - position)
+                    for position, following, amount in zip(positions, positions[1:], values)
+                )
+            ) + [values[-1]]
+        last = first + len(values)
+        totals[first:last] = map(operator.add, totals[first:last], values)
+        carried[last] += values[-1]
+
+    totals = map(operator.add, totals, accumulate(carried[:-1]))
+    return Timeline(axis, totals, offset)
+
+
+def _number(value):
+    # Rounded float, None for NaN (not valid JSON).
+    return None if math.isnan(value) else round(value, 2)
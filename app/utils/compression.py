@@ -0,0 +1,196 @@
+"""app.utils.compression.py"""
+import asyncio
+import functools
+import gzip
+
+from fastapi import Response
+from starlette.datastructures import Headers
+from starlette.middleware import gzip as gzip_middleware
+
+from .. import metrics
+from ..config import get_settings
+from .executors import run_in_executor
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+SETTINGS = get_settings()
+
+# The smaller bodies are sent uncompressed.
+MINIMUM_SIZE = 1000
+
+# Compression level of the gzip variants, the level of the middleware.
+GZIP_LEVEL = 9
+
+# The content codings of the precompressed variants, preferred first. Brotli only when a
+# brotli package is installed.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# The compressors of the content codings.
+COMPRESSORS = {"gzip": functools.partial(gzip.compress, compresslevel=GZIP_LEVEL)}
+if brotli is not None:
+    COMPRESSORS["br"] = functools.partial(brotli.compress, quality=SETTINGS.brotli_quality)
+
+# The precompressed bodies by response shape, with the version of the data they encode
+# (see `precompress`), bounded by the size of the bodies (their variants are smaller).
+RESPONSES = metrics.CountedTTLCache(
+    "responses",
+    maxsize=SETTINGS.precompressed_bytes,
+    ttl=3600,
+    getsizeof=lambda cached: len(cached[1].body),
+)
+
+
+class GZipResponder(gzip_middleware.GZipResponder):  # pylint: disable=too-few-public-methods
+    """
+    Compresses the responses, except event streams: the compressor would hold the events
+    back until its buffer fills up. Responses already encoded (see `PrecompressedResponse`)
+    are left as they are.
+    """
+
+    passthrough = False
+
+    async def send_with_gzip(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or headers.get(
+                "Content-Type", ""
+            ).startswith("text/event-stream")
+        if self.passthrough:
+            await self.send(message)
+        else:
+            await super().send_with_gzip(message)
+
+
+class GZipMiddleware(gzip_middleware.GZipMiddleware):  # pylint: disable=too-few-public-methods
+    """
+    GZip middleware leaving the event streams uncompressed (see `GZipResponder`).
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            await GZipResponder(self.app, self.minimum_size)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class Precompressed:  # pylint: disable=too-few-public-methods
+    """
+    A response body and its compressed variants, by content coding. Each variant is
+    compressed once, for the first request accepting it (see `variant`).
+    """
+
+    __slots__ = ("body", "encodings", "_variants")
+
+    def __init__(self, body):
+        self.body = body
+        self.encodings = ENCODINGS if len(body) >= MINIMUM_SIZE else ()
+        self._variants = {}
+
+    async def variant(self, encoding):
+        """
+        Gets the variant of the body in a content coding, compressed in the executor. The
+        concurrent requests wait for the same compression.
+
+        :returns: The compressed body.
+        :rtype: bytes
+        """
+        compressed = self._variants.get(encoding)
+        if compressed is None:
+            compressed = self._variants[encoding] = asyncio.ensure_future(
+                run_in_executor(COMPRESSORS[encoding], self.body)
+            )
+        try:
+            # Shielded, the other requests wait for it when this one is cancelled.
+            return await asyncio.shield(compressed)
+        finally:
+            # Compressed again by the next request when failed.
+            if compressed.done() and (compressed.cancelled() or compressed.exception()):
+                self._variants.pop(encoding, None)
+
+
+class PrecompressedResponse(Response):
+    """
+    A response sending the variant of a precompressed body preferred by the client (see
+    `negotiate`), the body as is when no variant is accepted.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, precompressed, status_code=200, headers=None, media_type=None):
+        self.precompressed = precompressed
+        super().__init__(precompressed.body, status_code, headers, media_type)
+        if precompressed.encodings:
+            self.headers.add_vary_header("Accept-Encoding")
+
+    async def __call__(self, scope, receive, send):
+        encoding = negotiate(
+            Headers(scope=scope).get("Accept-Encoding", ""), self.precompressed.encodings
+        )
+        if encoding is not None:
+            self.body = await self.precompressed.variant(encoding)
+            self.headers["Content-Encoding"] = encoding
+            self.headers["Content-Length"] = str(len(self.body))
+        await super().__call__(scope, receive, send)
+
+
+def negotiate(accept_encoding, available):
+    """
+    Picks the content coding of a response among the available ones, by quality value of
+    the `Accept-Encoding` header of the request, then by preference (`ENCODINGS`).
+
+    :returns: The content coding, None for the body as is.
+    :rtype: str
+    """
+    qualities = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, parameter = part.partition(";")
+        name, _, value = parameter.partition("=")
+        try:
+            quality = float(value) if name.strip() == "q" else 1.0
+        except ValueError:
+            quality = 0.0
+        qualities[coding.strip()] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if encoding in available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def lookup(shape, version):
+    """
+    Gets the precompressed body of a response shape, when encoded from the given version of
+    its data (see `precompress`).
+
+    :returns: The precompressed body, None when not precompressed from this version.
+    :rtype: Precompressed
+    """
+    cached = RESPONSES.get(shape)
+    if cached is None or cached[0] != version:
+        return None
+    return cached[1]
+
+
+def precompress(shape, version, body):
+    """
+    Keeps the body of a response shape for a version of its data (e.g. of the dataset of a
+    data-source), until a body is precompressed for another version. Its variants are
+    compressed on demand (see `Precompressed.variant`). A body larger than the size of
+    the kept bodies (`PRECOMPRESSED_BYTES`) is not kept.
+
+    :param shape: The response, e.g. a path and its validated query parameters.
+    :param version: The version of the data encoded in the body, compared by equality.
+    :param body: The encoded body.
+    :returns: The precompressed body.
+    :rtype: Precompressed
+    """
+    precompressed = Precompressed(body)
+    try:
+        RESPONSES[shape] = (version, precompressed)
+    except ValueError:
+        pass  # Larger than all of the kept bodies.
+    return precompressed
@@ -0,0 +1,44 @@
+"""app.utils.concurrency.py"""
+import asyncio
+import functools
+
+from cachetools.keys import hashkey
+
+
+async def gather(*aws, limit=None):
+    """
+    Like `asyncio.gather`, but runs at most `limit` of the awaitables at the same time.
+
+    :returns: The results, in the order of the awaitables.
+    :rtype: list
+    """
+    if not limit:
+        return await asyncio.gather(*aws)
+
+    semaphore = asyncio.Semaphore(limit)
+
+    async def limited(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(limited(awaitable) for awaitable in aws))
+
+
+def single_flight(func):
+    """
+    Decorator for coroutine functions sharing a single in-flight call between concurrent
+    callers with the same arguments, e.g. so that a cold cache triggers only one fetch.
+    """
+    in_flight = {}
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = hashkey(*args, **kwargs)
+        future = in_flight.get(key)
+        if future is None:
+            future = in_flight[key] = asyncio.ensure_future(func(*args, **kwargs))
+            future.add_done_callback(lambda _: in_flight.pop(key, None))
+        # A cancelled caller must not cancel the call for the others.
+        return await asyncio.shield(future)
+
+    return wrapper
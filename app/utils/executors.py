@@ -0,0 +1,65 @@
+"""app.utils.executors.py"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from ..config import get_settings
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    contextvars = None
+
+LOGGER = logging.getLogger(__name__)
+
+SETTINGS = get_settings()
+
+# Application-global executor for the CPU bound parsing of the data-sources.
+EXECUTOR: Executor = None
+
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+
+def get_executor():
+    """
+    Gets the application-global executor, creating it on first use.
+    Configured with `PARSE_EXECUTOR` ("thread", "process" or "inline") and `PARSE_WORKERS`.
+
+    :returns: The executor, None when parsing runs inline on the event loop.
+    :rtype: concurrent.futures.Executor
+    """
+    global EXECUTOR  # pylint: disable=global-statement
+    if EXECUTOR is None and SETTINGS.parse_executor in EXECUTORS:
+        LOGGER.info(
+            f"Setting up {SETTINGS.parse_executor} executor with {SETTINGS.parse_workers} workers."
+        )
+        EXECUTOR = EXECUTORS[SETTINGS.parse_executor](max_workers=SETTINGS.parse_workers)
+    return EXECUTOR
+
+
+async def run_in_executor(func, *args, **kwargs):
+    """
+    Runs a (CPU bound) function in the executor without blocking the event loop.
+    With a process executor the function, its arguments and its result must be picklable.
+
+    :returns: The result of the function.
+    """
+    executor = get_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_event_loop()
+    call = functools.partial(func, *args, **kwargs)
+    if contextvars is not None and isinstance(executor, ThreadPoolExecutor):
+        # Run in the context of the caller, e.g. its tracing span (see `app.utils.tracing`).
+        call = functools.partial(contextvars.copy_context().run, call)
+    return await loop.run_in_executor(executor, call)
+
+
+async def teardown_executor():
+    """Shut down the application-global executor."""
+    global EXECUTOR  # pylint: disable=global-statement
+    if EXECUTOR is not None:
+        LOGGER.info("Shutting down executor.")
+        EXECUTOR.shutdown(wait=False)
+        EXECUTOR = None
@@ -1,7 +1,19 @@
 """app.utils.httputils.py"""
+import asyncio
 import logging
+import random
 
-from aiohttp import ClientSession
+from aiohttp import (
+    ClientError,
+    ClientResponseError,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+    http_parser,
+)
+
+from ..config import get_settings
+from .tracing import span
 
 # Singleton aiohttp.ClientSession instance.
 CLIENT_SESSION: ClientSession
@@ -9,6 +21,25 @@ CLIENT_SESSION: ClientSession
 
 LOGGER = logging.getLogger(__name__)
 
+SETTINGS = get_settings()
+
+# Statuses worth retrying, the upstream may recover.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def accept_encoding():
+    """
+    Gets the content encodings the client can decode. Brotli is only supported by aiohttp
+    when a brotli package is installed.
+
+    :returns: The value of the `Accept-Encoding` header.
+    :rtype: str
+    """
+    encodings = ["gzip", "deflate"]
+    if getattr(http_parser, "brotli", None) is not None:
+        encodings.append("br")
+    return ", ".join(encodings)
+
 
 async def setup_client_session():
     """Set up the application-global aiohttp.ClientSession instance.
@@ -16,10 +47,23 @@ async def setup_client_session():
     aiohttp recommends that only one ClientSession exist for the lifetime of an application.
     See: https://docs.aiohttp.org/en/stable/client_quickstart.html#make-a-request
 
+    The connection pool, timeouts and compression are configured from the settings.
     """
     global CLIENT_SESSION  # pylint: disable=global-statement
     LOGGER.info("Setting up global aiohttp.ClientSession.")
-    CLIENT_SESSION = ClientSession()
+    CLIENT_SESSION = ClientSession(
+        connector=TCPConnector(
+            limit=SETTINGS.http_connection_limit,
+            limit_per_host=SETTINGS.http_connection_limit_per_host,
+            keepalive_timeout=SETTINGS.http_keepalive_timeout,
+            ttl_dns_cache=SETTINGS.http_dns_cache_ttl,
+        ),
+        timeout=ClientTimeout(
+            total=SETTINGS.http_total_timeout, sock_read=SETTINGS.http_read_timeout
+        ),
+        headers={"Accept-Encoding": accept_encoding()},
+        auto_decompress=True,
+    )
 
 
 async def teardown_client_session():
@@ -28,3 +72,51 @@ async def teardown_client_session():
     global CLIENT_SESSION  # pylint: disable=global-statement
     LOGGER.info("Closing global aiohttp.ClientSession.")
     await CLIENT_SESSION.close()
+
+
+async def retry(func, *args, **kwargs):
+    """
+    Awaits a coroutine function, retrying on connection errors, timeouts and retryable
+    statuses with an exponential backoff and full jitter.
+    Configured with `HTTP_RETRIES` and `HTTP_RETRY_BACKOFF` (seconds).
+
+    :returns: The result of the coroutine function.
+    """
+    for attempt in range(SETTINGS.http_retries + 1):
+        try:
+            return await func(*args, **kwargs)
+        except ClientResponseError as err:
+            if err.status not in RETRY_STATUSES or attempt == SETTINGS.http_retries:
+                raise
+            error = err
+        except (ClientError, asyncio.TimeoutError) as err:
+            if attempt == SETTINGS.http_retries:
+                raise
+            error = err
+        delay = random.uniform(0, SETTINGS.http_retry_backoff * 2 ** attempt)
+        LOGGER.warning(
+            f"Attempt {attempt + 1} failed ({error.__class__.__name__}: {error}), "
+            f"retrying in {delay:.2f}s"
+        )
+        await asyncio.sleep(delay)
+    return None  # pragma: no cover
+
+
+async def _get_text(url, **kwargs):
+    with span("http.get", url=url) as current:
+        async with CLIENT_SESSION.get(url, **kwargs) as response:
+            response.raise_for_status()
+            text = await response.text()
+        current.set(status=response.status, length=len(text))
+        return text
+
+
+async def get_text(url, **kwargs):
+    """
+    Requests the url with the application-global session and returns the body as text.
+    Failed requests are retried (see `retry`).
+
+    :returns: The body of the response.
+    :rtype: str
+    """
+    return await retry(_get_text, url, **kwargs)
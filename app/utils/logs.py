@@ -0,0 +1,112 @@
+"""app.utils.logs.py"""
+import inspect
+import json
+import logging
+import random
+import sys
+from datetime import datetime
+
+# The keyword arguments of the logging calls, not fields of the events.
+LOG_KWARGS = frozenset(("exc_info", "stack_info", "stacklevel", "extra"))
+
+# The records locate their caller past the adapter with `stacklevel` (Python 3.8+).
+STACKLEVEL = sys.version_info >= (3, 8)
+
+
+class Event:
+    """
+    The message of a logged event, with its fields. The message is only formatted when a
+    handler emits the record:
+
+        using shared cache results data_id=jhu.confirmed
+    """
+
+    __slots__ = ("msg", "args", "fields")
+
+    def __init__(self, msg, args, fields):
+        self.msg = msg
+        self.args = args
+        self.fields = fields
+
+    def message(self):
+        """
+        Formats the message with its arguments, without the fields.
+
+        :returns: The message.
+        :rtype: str
+        """
+        return self.msg % self.args if self.args else str(self.msg)
+
+    def __str__(self):
+        if not self.fields:
+            return self.message()
+        fields = " ".join(f"{key}={value}" for key, value in self.fields.items())
+        return f"{self.message()} {fields}"
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    A logger taking the fields of its events as keyword arguments:
+
+        LOGGER.info("data received", data_id=data_id, size=len(text))
+
+    Nothing is formatted for a disabled level. A call with `sample` (e.g. 0.01 for the
+    per-request events) only logs that fraction of the events. The records locate the
+    caller of the adapter (`funcName`, `lineno`).
+    """
+
+    def __init__(self, logger):
+        super().__init__(logger, {})
+
+    def log(self, level, msg, *args, sample=None, **kwargs):  # pylint: disable=arguments-differ
+        if not self.isEnabledFor(level):
+            return
+        if sample is not None and random.random() >= sample:
+            return
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in LOG_KWARGS}
+        kwargs["extra"] = dict(kwargs.get("extra") or (), fields=fields)
+        if STACKLEVEL:
+            # Past `log`, and the level method of the adapter (e.g. `info`) calling it.
+            level_method = inspect.currentframe().f_back.f_code.co_filename == logging.__file__
+            kwargs["stacklevel"] = kwargs.get("stacklevel", 1) + (2 if level_method else 1)
+        self.logger.log(level, Event(msg, args, fields), **kwargs)
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats the records as JSON lines, with the fields of their events.
+    """
+
+    def format(self, record):
+        event = record.msg if isinstance(record.msg, Event) else None
+        document = {
+            "time": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": event.message() if event else record.getMessage(),
+        }
+        if event:
+            document.update(event.fields)
+        if record.exc_info:
+            document["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str)
+
+
+def get_logger(name):
+    """
+    Gets a structured logger (see `StructuredLogger`).
+
+    :returns: The logger.
+    :rtype: StructuredLogger
+    """
+    return StructuredLogger(logging.getLogger(name))
+
+
+def configure(json_output):
+    """
+    Formats the records of the root handlers as JSON lines (`LOG_JSON`).
+    """
+    if not json_output:
+        return
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(JSONFormatter())
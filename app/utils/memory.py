@@ -0,0 +1,199 @@
+"""app.utils.memory.py"""
+import functools
+import gc
+import logging
+import sys
+import tracemalloc
+from array import array
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+from ..config import get_settings
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+LOGGER = logging.getLogger(__name__)
+
+SETTINGS = get_settings()
+
+# Whether the memory is profiled (`MEMORY_PROFILING`): tracemalloc traces the allocations,
+# compared between the refreshes of the data-sources.
+ENABLED = SETTINGS.memory_profiling
+
+# The last tracemalloc snapshot of each data-source, and the allocations grown since the
+# previous refresh.
+SNAPSHOTS = {}
+GROWTH = {}
+
+# The allocation sites reported per refresh.
+TOP_ALLOCATIONS = 10
+
+# The classes whose live instances are counted, e.g. old datasets held by a cache.
+WATCHED = (
+    "Dataset",
+    "TimelinedLocation",
+    "CSBSLocation",
+    "NYTLocation",
+    "Timeline",
+    "CategoryRevision",
+    "NYTFeed",
+    "GridIndex",
+    "ClientSession",
+    "RedisCache",
+    "SimpleMemoryCache",
+)
+
+# Not walked by `footprint`: shared by the whole program.
+SHARED = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, type(None), bool)
+
+# Without references to walk.
+ATOMIC = (str, bytes, int, float, complex, array)
+
+
+def footprint(roots):
+    """
+    Gets the deep size of objects: the objects they reference (items of the containers,
+    attributes and slots), recursively, are counted once.
+
+    :returns: The number of objects and their size in bytes.
+    :rtype: dict
+    """
+    seen = set()
+    objects = size = 0
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SHARED):
+            continue
+        seen.add(id(obj))
+        objects += 1
+        size += sys.getsizeof(obj)
+        if isinstance(obj, ATOMIC):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            stack.extend(_attributes(obj))
+    return {"objects": objects, "bytes": size}
+
+
+def _attributes(obj):
+    # The values of the slots and of the __dict__ of an object.
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        for slot in (slots,) if isinstance(slots, str) else slots:
+            if slot not in ("__dict__", "__weakref__") and hasattr(obj, slot):
+                yield getattr(obj, slot)
+    if hasattr(obj, "__dict__"):
+        yield obj.__dict__
+
+
+def dataset_report(service):
+    """
+    Gets the memory of the versions of the locations held by a data-source.
+
+    :returns: The numbers of versions and of locations, and the footprints of the latest
+              version, of its locations and of their timelines, and of all of the versions.
+    :rtype: dict
+    """
+    datasets = list(service.datasets)
+    if not datasets:
+        return {"versions": 0, "locations": 0, "footprint": {}}
+    dataset = datasets[-1]
+    locations = dataset.locations
+    return {
+        "versions": len(datasets),
+        "locations": len(locations),
+        "footprint": {
+            "dataset": footprint([dataset]),
+            "locations": footprint([locations]),
+            "timelines": footprint(
+                location.timelines for location in locations if hasattr(location, "timelines")
+            ),
+            "versions": footprint(datasets),
+        },
+    }
+
+
+def live_objects():
+    """
+    Counts the live instances of the watched classes (`WATCHED`), after a collection.
+
+    :returns: The counts by class name.
+    :rtype: Dict[str, int]
+    """
+    gc.collect()
+    counts = dict.fromkeys(WATCHED, 0)
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in counts:
+            counts[name] += 1
+    return counts
+
+
+def report(services):
+    """
+    Gets the memory of the data-sources, the live instances of the watched classes, the
+    size of the process and the allocations grown at the last refresh of each data-source.
+
+    :returns: The report.
+    :rtype: dict
+    """
+    process = {}
+    if resource is not None:
+        # Kilobytes on Linux.
+        process["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    if tracemalloc.is_tracing():
+        process["traced_bytes"], process["traced_peak_bytes"] = tracemalloc.get_traced_memory()
+    return {
+        "sources": {source: dataset_report(service) for source, service in services.items()},
+        "live_objects": live_objects(),
+        "process": process,
+        "growth": GROWTH,
+    }
+
+
+def record_refresh(source, dataset):  # pylint: disable=unused-argument
+    """
+    Compares the allocations after a new version of a data-source with the allocations
+    after its previous version, keeping the sites that grew the most (`GROWTH`).
+    """
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+    )
+    previous = SNAPSHOTS.get(source)
+    SNAPSHOTS[source] = snapshot
+    if previous is None:
+        return
+    stats = snapshot.compare_to(previous, "lineno")[:TOP_ALLOCATIONS]
+    GROWTH[source] = [
+        {
+            "site": str(stat.traceback),
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+            "size": stat.size,
+        }
+        for stat in stats
+    ]
+    LOGGER.info("%s refresh, allocations grown: %s", source, GROWTH[source][:3])
+
+
+def watch(services):
+    """
+    Starts tracing the allocations, compared at each new version of the data-sources (see
+    `LocationService.listeners`). Only when the memory is profiled.
+    """
+    if not ENABLED:
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(SETTINGS.memory_profiling_frames)
+    for source, service in services.items():
+        service.listeners.append(functools.partial(record_refresh, source))
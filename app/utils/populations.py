@@ -6,8 +6,10 @@ import requests
 
 import app.io
 
+from ..config import get_settings
+
 LOGGER = logging.getLogger(__name__)
-GEONAMES_URL = "http://api.geonames.org/countryInfoJSON"
+GEONAMES_URL = get_settings().geonames_url
 GEONAMES_BACKUP_PATH = "geonames_population_mappings.json"
 
 # Fetching of the populations.
@@ -0,0 +1,188 @@
+"""app.utils.tracing.py"""
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from ..config import get_settings
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    contextvars = None
+
+LOGGER = logging.getLogger(__name__)
+
+SETTINGS = get_settings()
+
+# Whether spans are recorded (`TRACING`), checked by every span.
+ENABLED = SETTINGS.tracing
+
+# The last trace of each root span (e.g. `jhu.locations`, a refresh of the jhu data-source).
+TRACES = {}
+
+# The innermost open span.
+CURRENT = contextvars.ContextVar("span", default=None) if contextvars is not None else None
+
+
+class Span:  # pylint: disable=too-many-instance-attributes
+    """
+    A timed stage of the work, e.g. a download or the parsing of a CSV.
+
+    The spans opened while a span is open (in the same task, or in the tasks and executor
+    threads started from it) are its children. A span without parent is the root of a
+    trace, kept in `TRACES` once finished. Spans are serialized in the JSON format of the
+    OpenTelemetry SDK.
+    """
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "parent",
+        "trace_id",
+        "span_id",
+        "children",
+        "start_time",
+        "started",
+        "duration",
+        "token",
+    )
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.parent = CURRENT.get() if CURRENT is not None else None
+        self.trace_id = self.parent.trace_id if self.parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.children = []
+        self.start_time = time.time()
+        self.started = self.duration = self.token = None
+
+    def set(self, **attributes):
+        """
+        Adds attributes to the span, e.g. the size of the data.
+        """
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        if CURRENT is not None:
+            self.token = CURRENT.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.started
+        if self.token is not None:
+            CURRENT.reset(self.token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        if SETTINGS.tracing_log:
+            LOGGER.info(json.dumps(self.serialize()))
+        if self.parent is None:
+            TRACES[self.name] = self.breakdown()
+        else:
+            self.parent.children.append(self)
+        return False
+
+    def serialize(self):
+        """
+        Serializes the span like the OpenTelemetry SDK (`ReadableSpan.to_json`).
+
+        :returns: The serialized span.
+        :rtype: dict
+        """
+        return {
+            "name": self.name,
+            "context": {"trace_id": f"0x{self.trace_id}", "span_id": f"0x{self.span_id}"},
+            "parent_id": f"0x{self.parent.span_id}" if self.parent else None,
+            "start_time": _timestamp(self.start_time),
+            "end_time": _timestamp(self.start_time + self.duration),
+            "attributes": self.attributes,
+        }
+
+    def breakdown(self):
+        """
+        Gets the durations of the span and of its children.
+
+        :returns: The nested durations.
+        :rtype: dict
+        """
+        return {
+            "name": self.name,
+            "start_time": _timestamp(self.start_time),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "children": [
+                child.breakdown() for child in sorted(self.children, key=lambda c: c.start_time)
+            ],
+        }
+
+
+class NullSpan:
+    """
+    The span of a disabled tracing, doing nothing.
+    """
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        """
+        Ignores the attributes.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name, **attributes):
+    """
+    Opens a span, as a context manager:
+
+        with span("jhu.parse", category=category) as current:
+            ...
+            current.set(rows=len(rows))
+
+    :returns: The span, a shared `NullSpan` when tracing is disabled.
+    :rtype: Span
+    """
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(name, attributes)
+
+
+def traced(name):
+    """
+    Decorator opening a span around each call of a function or coroutine function.
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _timestamp(seconds):
+    return datetime.utcfromtimestamp(seconds).isoformat() + "Z"
@@ -0,0 +1,8 @@
+"""
+benchmarks
+~~~~~~~~~~
+Performance benchmarks for the Coronavirus Tracker API.
+
+Each module can be run on its own, e.g. `python -m benchmarks.memory`.
+`python -m benchmarks.suite` (`invoke bench`) runs the suite, compared with the baseline.
+"""
@@ -0,0 +1,134 @@
+"""
+benchmarks.compression
+~~~~~~~~~~~~~~~~~~~~~~
+CPU time per request of the largest bodies, `/all` and `/v2/locations?timelines=true` of
+the synthetic jhu files, compressed by the GZip middleware on every request or sent from
+their precompressed variants (`app.utils.compression.PrecompressedResponse`). Each variant
+is compressed once per version, by the first request accepting it, also timed.
+
+The requests are sent to the ASGI apps directly, without server nor client, and accept
+gzip and brotli.
+
+Usage:
+    python -m benchmarks.compression --scale realistic --number 20
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Response
+
+from app.routers import v2
+from app.services.location import jhu
+from app.utils import compression
+
+from . import data
+
+
+async def bodies(scale):
+    """The bodies of `/all` and of `/v2/locations?timelines=true`."""
+    categories = {}
+    for category in jhu.CATEGORIES:
+        locations = jhu.parse_category(data.jhu_csv(category, scale))
+        categories[category] = {
+            "locations": locations,
+            "latest": sum(location["latest"] for location in locations),
+            "last_updated": "2020-03-20T13:58:00Z",
+            "source": "https://github.com/ExpDev07/coronavirus-tracker-api",
+        }
+    all_categories = {
+        **categories,
+        "latest": {category: categories[category]["latest"] for category in jhu.CATEGORIES},
+    }
+    locations = jhu.build_locations(
+        *(categories[category]["locations"] for category in jhu.CATEGORIES)
+    )
+    content = {
+        "latest": {
+            category: sum(getattr(location, category) for location in locations)
+            for category in jhu.CATEGORIES
+        },
+        "locations": [v2.serialize(location, timelines=True) for location in locations],
+    }
+    return {
+        "/all": v2.TimedJSONResponse(all_categories).body,
+        "/v2/locations?timelines=true": await v2.encode(v2.LocationsResponse, content),
+    }
+
+
+def build(body, precompressed):
+    """The app of a body: compressed by the middleware, or precompressed."""
+    app = FastAPI()
+    app.add_middleware(compression.GZipMiddleware, minimum_size=compression.MINIMUM_SIZE)
+
+    @app.get("/")
+    async def route():
+        if precompressed is None:
+            return Response(body, media_type="application/json")
+        return compression.PrecompressedResponse(precompressed)
+
+    return app
+
+
+async def requests(app, number, accept_encoding):
+    """Sends `number` GET requests to an ASGI app, returning the size of the last body."""
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"accept-encoding", accept_encoding)],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    sizes = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sizes.append(len(message.get("body", b"")))
+
+    for _ in range(number):
+        await app(dict(scope), receive, send)
+    return sizes[-1]
+
+
+def main():
+    """Print the CPU time per request of each body, with and without precompression."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", choices=list(data.SCALES), default="realistic", help="sizes")
+    parser.add_argument("--number", type=int, default=20, help="requests per measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="measurements per body")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    accept_encoding = b"gzip, deflate, br"
+    print(f"{'body':<30} {'responses':<14} {'bytes':>10} {'cpu ms/request':>15}")
+    for path, body in loop.run_until_complete(bodies(data.SCALES[args.scale])).items():
+        precompressed = compression.Precompressed(body)
+        compressing = {}
+        for encoding in precompressed.encodings:
+            started = time.process_time()
+            loop.run_until_complete(precompressed.variant(encoding))
+            compressing[encoding] = time.process_time() - started
+        print(f"{path:<30} {'identity':<14} {len(body):>10}")
+        for name, variant in (("middleware", None), ("precompressed", precompressed)):
+            app = build(body, variant)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.process_time()
+                size = loop.run_until_complete(requests(app, args.number, accept_encoding))
+                timings.append((time.process_time() - started) / args.number)
+            print(f"{path:<30} {name:<14} {size:>10} {min(timings) * 1e3:>15.3f}")
+        for encoding, seconds in compressing.items():
+            print(f"{path:<30} {'compress ' + encoding:<14} {'':>10} {seconds * 1e3:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+benchmarks.data
+~~~~~~~~~~~~~~~
+Synthetic data-source files, scaled from the example files of `tests/example_data`.
+
+The locations of a file cycle through the locations of the example file (with a numbered
+province or county), so their countries, states and coordinates are real. A scale is a
+multiple of the realistic number of locations of a data-source (`SIZES`).
+"""
+import csv
+import io
+import pathlib
+from datetime import date, timedelta
+
+EXAMPLE_DATA = pathlib.Path(__file__).resolve().parent.parent / "tests" / "example_data"
+
+# The scales of the files, multiples of the realistic sizes.
+SCALES = {"realistic": 1, "10x": 10}
+
+# The realistic sizes of the data-sources: locations (and days of history).
+SIZES = {
+    # The global time series, ~280 locations.
+    "jhu": {"locations": 280, "days": 300},
+    # The US counties, one row per county and day: the last 30 days of history.
+    "nyt": {"locations": 3200, "days": 30},
+    # The US counties, without history.
+    "csbs": {"locations": 3200},
+}
+
+FIRST_DAY = date(2020, 1, 22)
+
+
+def example_rows(filename):
+    """The rows of an example file."""
+    with open(EXAMPLE_DATA / filename) as f_in:
+        return list(csv.DictReader(f_in))
+
+
+def jhu_csv(category="confirmed", scale=1, days=None):
+    """
+    A JHU time series of a category, with `days` date columns.
+
+    :returns: The CSV.
+    :rtype: str
+    """
+    rows = example_rows(f"time_series_covid19_{category}_global.csv")
+    days = days or SIZES["jhu"]["days"]
+    dates = [FIRST_DAY + timedelta(days=day) for day in range(days)]
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(
+        ["Province/State", "Country/Region", "Lat", "Long"]
+        + [f"{day.month}/{day.day}/{day:%y}" for day in dates]
+    )
+    for index in range(SIZES["jhu"]["locations"] * scale):
+        row = rows[index % len(rows)]
+        # Cumulative amounts, a location growing by `index % 7 + 1` per day.
+        growth = index % 7 + 1
+        writer.writerow(
+            [
+                f"{row['Province/State'] or 'Province'} {index}",
+                row["Country/Region"],
+                row["Lat"],
+                row["Long"],
+            ]
+            + [growth * day for day in range(days)]
+        )
+    return out.getvalue()
+
+
+def nyt_csv(scale=1, days=None):
+    """
+    A NYT feed of the US counties, ordered by date.
+
+    :returns: The CSV.
+    :rtype: str
+    """
+    rows = example_rows("counties.csv")
+    counties = [
+        (f"{rows[index % len(rows)]['county']} {index}", rows[index % len(rows)]["state"])
+        for index in range(SIZES["nyt"]["locations"] * scale)
+    ]
+    days = days or SIZES["nyt"]["days"]
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["date", "county", "state", "fips", "cases", "deaths"])
+    for day in range(days):
+        iso = (FIRST_DAY + timedelta(days=day)).isoformat()
+        for index, (county, state) in enumerate(counties):
+            cases = (index % 7 + 1) * day
+            writer.writerow([iso, county, state, 10000 + index, cases, cases // 50])
+    return out.getvalue()
+
+
+def csbs_csv(scale=1):
+    """
+    A CSBS file of the US counties.
+
+    :returns: The CSV.
+    :rtype: str
+    """
+    rows = example_rows("covid19_county.csv")
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]), lineterminator="\n")
+    writer.writeheader()
+    for index in range(SIZES["csbs"]["locations"] * scale):
+        row = dict(rows[index % len(rows)])
+        row["County Name"] = f"{row['County Name']} {index}"
+        writer.writerow(row)
+    return out.getvalue()
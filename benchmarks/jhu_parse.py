@@ -0,0 +1,100 @@
+"""
+benchmarks.jhu_parse
+~~~~~~~~~~~~~~~~~~~~
+Throughput of parsing a wide JHU time-series CSV into normalized locations.
+
+Compares the former `csv.DictReader` based parser with `jhu.parse_category`,
+with and without NumPy, and with the incremental parse of the next day's file
+(`jhu.parse_revision`).
+
+Usage:
+    python -m benchmarks.jhu_parse --rows 280 --days 300
+"""
+import argparse
+import csv
+import time
+from datetime import date, timedelta
+
+from app.services.location import jhu
+from app.utils import countries
+from app.utils import date as date_util
+
+
+def wide_csv(rows, days):
+    """A synthetic JHU category file with `rows` locations and `days` date columns."""
+    first = date(2020, 1, 22)
+    header = ["Province/State", "Country/Region", "Lat", "Long"] + [
+        f"{day.month}/{day.day}/{day:%y}"
+        for day in (first + timedelta(days=n) for n in range(days))
+    ]
+    lines = [",".join(header)]
+    for row in range(rows):
+        amounts = ",".join(str(row * day) for day in range(days))
+        lines.append(
+            f'"Province {row}, X",Country {row % 190},{row % 90}.5,{row % 180}.25,{amounts}'
+        )
+    return "\n".join(lines)
+
+
+def dictreader_parse(text):
+    """The parser `jhu.get_category` used before `jhu.parse_category` (reference)."""
+    locations = []
+    for item in csv.DictReader(text.splitlines()):
+        dates = dict(filter(lambda element: date_util.is_date(element[0]), item.items()))
+        history = {date: int(float(amount or 0)) for date, amount in dates.items()}
+        country = item["Country/Region"]
+        latest = list(history.values())[-1]
+        locations.append(
+            {
+                "country": country,
+                "country_code": countries.country_code(country),
+                "province": item["Province/State"],
+                "coordinates": {"lat": item["Lat"], "long": item["Long"]},
+                "history": history,
+                "latest": int(latest or 0),
+            }
+        )
+    return locations
+
+
+def best_of(func, text, repeat):
+    """Best wall time of `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Print the parse time and throughput of each parser."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=280, help="locations in the file")
+    parser.add_argument("--days", type=int, default=300, help="date columns in the file")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per parser")
+    args = parser.parse_args()
+
+    text = wide_csv(args.rows, args.days)
+    cells = args.rows * args.days
+    numpy = jhu.numpy
+    parsers = [("DictReader (reference)", dictreader_parse, numpy)]
+    if numpy is not None:
+        parsers.append(("parse_category numpy", jhu.parse_category, numpy))
+    parsers.append(("parse_category python", jhu.parse_category, None))
+    # The file of the previous day, parsed once.
+    previous = jhu.parse_revision(wide_csv(args.rows, args.days - 1))
+    parsers.append(
+        ("parse_revision next day", lambda text: jhu.parse_revision(text, previous), numpy)
+    )
+
+    print(f"{args.rows} rows x {args.days} days, {len(text) / 1e6:.1f} MB")
+    for name, func, module in parsers:
+        jhu.numpy = module
+        seconds = best_of(func, text, args.repeat)
+        print(f"{name:<24} {seconds * 1e3:>9.1f} ms {cells / seconds / 1e6:>8.2f} Mcells/s")
+    jhu.numpy = numpy
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+benchmarks.logs
+~~~~~~~~~~~~~~~
+Cost of the results log of `jhu.get_category` (behind `/v1/confirmed`), formerly a
+`pformat` of the results built eagerly in an f-string, compared to the structured
+`app.utils.logs` event, with the level enabled and disabled.
+
+Usage:
+    python -m benchmarks.logs --rows 280 --days 300 --number 200
+"""
+import argparse
+import logging
+import timeit
+from datetime import datetime
+from pprint import pformat as pf
+
+from app.services.location import jhu
+from app.utils import logs
+
+from .jhu_parse import wide_csv
+
+
+def results(rows, days):
+    """The results of `jhu.get_category` for a synthetic category file."""
+    locations = jhu.parse_revision(wide_csv(rows, days)).locations
+    return {
+        "locations": locations,
+        "latest": sum(location["latest"] for location in locations),
+        "last_updated": datetime.utcnow().isoformat() + "Z",
+        "source": "https://github.com/ExpDev07/coronavirus-tracker-api",
+    }
+
+
+def main():
+    """Print the time per call of both results logs."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=280, help="locations in the category")
+    parser.add_argument("--days", type=int, default=300, help="date columns in the category")
+    parser.add_argument("--number", type=int, default=200, help="repetitions per measurement")
+    args = parser.parse_args()
+
+    data = results(args.rows, args.days)
+    data_id = "jhu.confirmed"
+    # Records are created, not written.
+    plain = logging.getLogger("benchmarks.logs")
+    plain.addHandler(logging.NullHandler())
+    plain.propagate = False
+    structured = logs.StructuredLogger(plain)
+
+    def before():
+        plain.info(f"{data_id} results:\n{pf(data, depth=1)}")
+
+    def after():
+        structured.info(
+            "results",
+            data_id=data_id,
+            locations=len(data["locations"]),
+            latest=data["latest"],
+            last_updated=data["last_updated"],
+        )
+
+    for level in (logging.INFO, logging.WARNING):
+        plain.setLevel(level)
+        for name, func in [("pformat", before), ("structured", after)]:
+            seconds = timeit.timeit(func, number=args.number) / args.number
+            print(f"{logging.getLevelName(level):<8} {name:<11} {seconds * 1e6:>10.2f} us")
+
+
+if __name__ == "__main__":
+    main()
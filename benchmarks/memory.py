@@ -0,0 +1,99 @@
+"""
+benchmarks.memory
+~~~~~~~~~~~~~~~~~
+Per-location memory footprint of the location and coordinate classes.
+
+Usage:
+    python -m benchmarks.memory --count 3200
+"""
+import argparse
+import csv
+import pathlib
+import tracemalloc
+
+from app.coordinates import Coordinates
+from app.location import TimelinedLocation
+from app.location.csbs import CSBSLocation
+from app.models import Timeline
+
+EXAMPLE_DATA = pathlib.Path(__file__).resolve().parent.parent / "tests" / "example_data"
+LAST_UPDATED = "2020-03-20T13:58:00Z"
+
+
+def csbs_rows():
+    """Rows of the example CSBS county file."""
+    with open(EXAMPLE_DATA / "covid19_county.csv") as f_in:
+        return list(csv.DictReader(f_in))
+
+
+def build_csbs_locations(rows, count):
+    """Build `count` CSBS locations the way the csbs service does."""
+    return [
+        CSBSLocation(
+            i,
+            rows[i % len(rows)]["State Name"],
+            rows[i % len(rows)]["County Name"],
+            Coordinates.parse(rows[i % len(rows)]["Latitude"], rows[i % len(rows)]["Longitude"]),
+            LAST_UPDATED,
+            int(rows[i % len(rows)]["Confirmed"] or 0),
+            int(rows[i % len(rows)]["Death"] or 0),
+        )
+        for i in range(count)
+    ]
+
+
+def build_timelined_locations(rows, count):
+    """
+    Build `count` timelined locations sharing a single set of timelines,
+    so that only the location and coordinate records are measured.
+    """
+    timelines = {
+        "confirmed": Timeline(timeline={}),
+        "deaths": Timeline(timeline={}),
+        "recovered": Timeline(timeline={}),
+    }
+    return [
+        TimelinedLocation(
+            i,
+            "US",
+            rows[i % len(rows)]["State Name"],
+            Coordinates.parse(rows[i % len(rows)]["Latitude"], rows[i % len(rows)]["Longitude"]),
+            LAST_UPDATED,
+            timelines,
+        )
+        for i in range(count)
+    ]
+
+
+def footprint(builder, rows, count):
+    """
+    Measure the memory allocated per location by `builder`.
+
+    :returns: The number of bytes per location.
+    :rtype: float
+    """
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    locations = builder(rows, count)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(locations) == count
+    return (end - start) / count
+
+
+def main():
+    """Print the per-location footprint for each location class."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=3200, help="locations to build")
+    args = parser.parse_args()
+
+    rows = csbs_rows()
+    for name, builder in [
+        ("CSBSLocation", build_csbs_locations),
+        ("TimelinedLocation", build_timelined_locations),
+    ]:
+        print(f"{name:<20} {footprint(builder, rows, args.count):>8.1f} bytes/location")
+
+
+if __name__ == "__main__":
+    main()
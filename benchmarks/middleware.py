@@ -0,0 +1,162 @@
+"""
+benchmarks.middleware
+~~~~~~~~~~~~~~~~~~~~~
+Per-request overhead of the middleware stack: the former `@APP.middleware("http")`
+functions (`BaseHTTPMiddleware`) resolving the data-source and recording the metrics,
+compared to the `add_datasource` dependency of the data routes and the ASGI
+`metrics.MetricsMiddleware`, and to no middleware. CORS and GZip are in both stacks.
+
+The requests are sent to the ASGI apps directly, without server nor client.
+
+Usage:
+    python -m benchmarks.middleware --number 2000
+"""
+import argparse
+import asyncio
+import functools
+import time
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+
+from app import metrics
+from app.data import data_source
+from app.utils.compression import GZipMiddleware
+
+PATHS = {"data": ("/v2/latest", b"source=jhu"), "other": ("/ping", b"")}
+
+
+async def latest(request: Request):
+    """A data route."""
+    return {"source": request.state.source.__class__.__name__}
+
+
+async def ping():
+    """A route without data-source."""
+    return {"ping": "pong"}
+
+
+async def add_datasource(request: Request):
+    """The dependency resolving the data-source (see `app.main.add_datasource`)."""
+    source = data_source(request.query_params.get("source", default="jhu"))
+    if not source:
+        raise HTTPException(404, detail="The provided data-source was not found.")
+    request.state.source = source
+
+
+def build(stack):
+    """The app of a middleware stack: `none`, `before` or `after`."""
+    app = FastAPI(default_response_class=metrics.TimedJSONResponse)
+    if stack != "none":
+        app.add_middleware(
+            CORSMiddleware,
+            allow_credentials=True,
+            allow_origins=["*"],
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+        app.add_middleware(GZipMiddleware, minimum_size=1000)
+    router = APIRouter()
+    router.add_api_route("/latest", latest)
+    app.add_api_route("/ping", ping)
+
+    @functools.lru_cache()
+    def route_path(endpoint):
+        for route in app.routes:
+            if getattr(route, "endpoint", None) is endpoint and endpoint is not None:
+                return route.path
+        return "unmatched"
+
+    if stack == "before":
+
+        @app.middleware("http")
+        async def add_datasource_middleware(request: Request, call_next):
+            source = data_source(request.query_params.get("source", default="jhu"))
+            if not source:
+                return Response("The provided data-source was not found.", status_code=404)
+            request.state.source = source
+            return await call_next(request)
+
+        @app.middleware("http")
+        async def record_metrics(request: Request, call_next):
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = await call_next(request)
+                status = response.status_code
+            finally:
+                route = route_path(request.scope.get("endpoint"))
+                metrics.REQUEST_SECONDS.labels(request.method, route, status).observe(
+                    time.perf_counter() - started
+                )
+            render_seconds = metrics.render_seconds(request.scope)
+            if render_seconds is not None:
+                metrics.RENDER_SECONDS.labels(route).observe(render_seconds)
+            return response
+
+        app.include_router(router, prefix="/v2")
+    elif stack == "after":
+        app.add_middleware(metrics.MetricsMiddleware, route_path=route_path)
+        app.include_router(router, prefix="/v2", dependencies=[Depends(add_datasource)])
+    else:
+        app.include_router(router, prefix="/v2", dependencies=[Depends(add_datasource)])
+    return app
+
+
+async def requests(app, path, query_string, number):
+    """Sends `number` GET requests to an ASGI app."""
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(b"host", b"localhost"), (b"accept-encoding", b"gzip")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    statuses = set()
+    received = False
+
+    async def receive():
+        # The request, then nothing until the client disconnects, like a server.
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.add(message["status"])
+
+    for _ in range(number):
+        received = False
+        await app(dict(scope), receive, send)
+    assert statuses == {200}, statuses
+
+
+def main():
+    """Print the time per request of each stack."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000, help="requests per measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="measurements per stack")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    for stack in ("none", "before", "after"):
+        app = build(stack)
+        for name, (path, query_string) in PATHS.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                loop.run_until_complete(requests(app, path, query_string, args.number))
+                timings.append((time.perf_counter() - started) / args.number)
+            print(f"{stack:<8} {name:<6} {min(timings) * 1e6:>10.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+benchmarks.spatial
+~~~~~~~~~~~~~~~~~~
+Throughput of the bounding box, radius and k-nearest queries of `app.spatial.GridIndex`
+compared to a scan of all of the locations, on a county-sized set of CSBS locations.
+
+The performance of the 1 degree grid depends on the occupancy of its cells, so the
+counties are placed at the coordinates of the CSBS rows: the rows of a CSBS county file
+(`--csv`, e.g. the file of the csbs service), as is. Without file, the example rows only
+hold 32 counties: each county is placed around the coordinates of an example row (within
+about a degree), dense where the example counties are and leaving the rest of the country
+empty, rather than spread uniformly. The queries are around the counties as well.
+
+Usage:
+    python -m benchmarks.spatial --count 3200 --queries 2000
+    python -m benchmarks.spatial --csv covid19_county.csv
+"""
+import argparse
+import csv
+import random
+import time
+
+from app.coordinates import Coordinates
+from app.location.csbs import CSBSLocation
+from app.spatial import GridIndex, distance
+
+from .memory import LAST_UPDATED, csbs_rows
+
+# The spread (degrees) of the counties around an example row.
+SPREAD = 0.5
+
+
+def position(row, randomized):
+    """The position of a county around the coordinates of a CSBS row, within the bounds."""
+    latitude = float(row["Latitude"]) + randomized.gauss(0, SPREAD)
+    longitude = float(row["Longitude"]) + randomized.gauss(0, SPREAD)
+    return max(-90.0, min(90.0, latitude)), max(-180.0, min(180.0, longitude))
+
+
+def build_counties(rows, count, randomized):
+    """
+    Build `count` CSBS locations around the coordinates of the rows, the rows as is when
+    there are enough of them.
+    """
+    locations = []
+    for i in range(count):
+        row = rows[i % len(rows)]
+        if count <= len(rows):
+            latitude, longitude = float(row["Latitude"]), float(row["Longitude"])
+        else:
+            latitude, longitude = position(row, randomized)
+        locations.append(
+            CSBSLocation(
+                i,
+                row["State Name"],
+                row["County Name"],
+                Coordinates(latitude, longitude),
+                LAST_UPDATED,
+                int(row["Confirmed"] or 0),
+                int(row["Death"] or 0),
+            )
+        )
+    return locations
+
+
+def scan_bbox(locations, south, west, north, east):
+    """The locations inside a bounding box, without index."""
+    return [
+        location
+        for location in locations
+        if south <= location.coordinates.latitude <= north
+        and west <= location.coordinates.longitude <= east
+    ]
+
+
+def scan_radius(locations, latitude, longitude, kilometers):
+    """The locations within a distance of a position, without index."""
+    found = [
+        (
+            distance(
+                latitude, longitude, location.coordinates.latitude, location.coordinates.longitude
+            ),
+            location,
+        )
+        for location in locations
+    ]
+    return sorted((item for item in found if item[0] <= kilometers), key=lambda item: item[0])
+
+
+def scan_nearest(locations, latitude, longitude, count):
+    """The nearest locations of a position, without index."""
+    return scan_radius(locations, latitude, longitude, float("inf"))[:count]
+
+
+def main():
+    """Print the queries per second, with and without the index."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=3200, help="locations to index")
+    parser.add_argument("--queries", type=int, default=2000, help="queries per measurement")
+    parser.add_argument("--csv", help="CSBS county file (default: the example rows)")
+    args = parser.parse_args()
+
+    randomized = random.Random(0)
+    if args.csv:
+        with open(args.csv) as f_in:
+            rows = [row for row in csv.DictReader(f_in) if row["Latitude"] and row["Longitude"]]
+        count = len(rows)
+    else:
+        rows, count = csbs_rows(), args.count
+    locations = build_counties(rows, count, randomized)
+    positions = [
+        position(rows[randomized.randrange(len(rows))], randomized) for _ in range(args.queries)
+    ]
+    print(f"{'counties':<22} {len(locations):>10}")
+
+    started = time.perf_counter()
+    index = GridIndex(locations)
+    print(f"{'index build':<22} {(time.perf_counter() - started) * 1e3:>10.2f} ms")
+
+    for name, indexed, scanned in [
+        (
+            "bbox 2x2 degrees",
+            lambda lat, lon: index.bbox(lat - 1, lon - 1, lat + 1, lon + 1),
+            lambda lat, lon: scan_bbox(locations, lat - 1, lon - 1, lat + 1, lon + 1),
+        ),
+        (
+            "radius 100 km",
+            lambda lat, lon: index.radius(lat, lon, 100),
+            lambda lat, lon: scan_radius(locations, lat, lon, 100),
+        ),
+        (
+            "nearest 10",
+            lambda lat, lon: index.nearest(lat, lon, 10),
+            lambda lat, lon: scan_nearest(locations, lat, lon, 10),
+        ),
+    ]:
+        for implementation, query in [("index", indexed), ("scan", scanned)]:
+            started = time.perf_counter()
+            for latitude, longitude in positions:
+                query(latitude, longitude)
+            per_second = len(positions) / (time.perf_counter() - started)
+            print(f"{name:<17} {implementation:<5} {per_second:>10.0f} queries/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+benchmarks.suite
+~~~~~~~~~~~~~~~~
+The benchmark suite: parsing and normalization of each data-source, serialization of the
+locations, the v2 routes end-to-end (through the ASGI app) and shared cache round-trips,
+on the synthetic files of `benchmarks.data` at each scale.
+
+The best time per call of each benchmark is compared with the stored baseline
+(`benchmarks/baseline.json`), the run failing when a benchmark is slower than its
+baseline by more than the threshold. Baselines depend on the machine: save them again
+(`--save`) before comparing on another one.
+
+Usage:
+    python -m benchmarks.suite --scale realistic 10x
+    python -m benchmarks.suite --filter jhu --save
+"""
+import argparse
+import asyncio
+import json
+import logging
+import pathlib
+import sys
+import timeit
+
+from async_asgi_testclient import TestClient
+
+from app import caches
+from app.data import DATA_SOURCES
+from app.main import APP
+from app.services.location import csbs, jhu, nyt
+from app.utils import compression
+
+from . import data
+
+BASELINE = pathlib.Path(__file__).resolve().parent / "baseline.json"
+
+# The benchmarks: name and setup, a function of the scale returning the function timed.
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register the setup of a benchmark."""
+
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+def jhu_categories(scale):
+    """The parsed locations of the jhu categories."""
+    return [jhu.parse_category(data.jhu_csv(category, scale)) for category in jhu.CATEGORIES]
+
+
+def run(coroutine_function):
+    """A function running a coroutine function in an event loop."""
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(coroutine_function())
+
+
+@benchmark("jhu.parse")
+def jhu_parse(scale):
+    text = data.jhu_csv("confirmed", scale)
+    return lambda: jhu.parse_revision(text)
+
+
+@benchmark("jhu.parse_next_day")
+def jhu_parse_next_day(scale):
+    previous = jhu.parse_revision(data.jhu_csv("confirmed", scale))
+    text = data.jhu_csv("confirmed", scale, days=data.SIZES["jhu"]["days"] + 1)
+    return lambda: jhu.parse_revision(text, previous)
+
+
+@benchmark("jhu.build_locations")
+def jhu_build_locations(scale):
+    categories = jhu_categories(scale)
+    return lambda: jhu.build_locations(*categories)
+
+
+@benchmark("nyt.parse")
+def nyt_parse(scale):
+    feed = data.nyt_csv(scale).encode("utf-8")
+    return lambda: nyt.parse_feed(feed).get_locations()
+
+
+@benchmark("csbs.parse")
+def csbs_parse(scale):
+    text = data.csbs_csv(scale)
+    return lambda: csbs.parse_locations(text)
+
+
+@benchmark("location.serialize")
+def location_serialize(scale):
+    locations = jhu.build_locations(*jhu_categories(scale))
+    return lambda: [location.serialize() for location in locations]
+
+
+@benchmark("location.serialize_timelines")
+def location_serialize_timelines(scale):
+    locations = jhu.build_locations(*jhu_categories(scale))
+    return lambda: [location.serialize(timelines=True) for location in locations]
+
+
+def serve(source, locations, path, precompressed=False):
+    """
+    A function requesting a path of the app, the data-source serving the locations. The
+    service is left serving them. Unless `precompressed`, the precompressed responses are
+    dropped before each request: the route encodes its response every time.
+    """
+
+    async def get_all():
+        return locations
+
+    DATA_SOURCES[source].get_all = get_all
+    client = TestClient(APP)
+
+    async def request():
+        if not precompressed:
+            compression.RESPONSES.clear()
+        response = await client.get(path)
+        assert response.status_code == 200, response.text
+
+    return run(request)
+
+
+@benchmark("v2.locations")
+def v2_locations(scale):
+    locations = jhu.build_locations(*jhu_categories(scale))
+    return serve("jhu", locations, "/v2/locations?source=jhu")
+
+
+@benchmark("v2.locations_timelines")
+def v2_locations_timelines(scale):
+    locations = jhu.build_locations(*jhu_categories(scale))
+    return serve("jhu", locations, "/v2/locations?source=jhu&timelines=true")
+
+
+@benchmark("v2.locations_precompressed")
+def v2_locations_precompressed(scale):
+    locations = jhu.build_locations(*jhu_categories(scale))
+    return serve("jhu", locations, "/v2/locations?source=jhu&timelines=true", precompressed=True)
+
+
+@benchmark("v2.location")
+def v2_location(scale):
+    locations = jhu.build_locations(*jhu_categories(scale))
+    return serve("jhu", locations, "/v2/locations/1?source=jhu")
+
+
+@benchmark("v2.countries")
+def v2_countries(scale):
+    locations = jhu.build_locations(*jhu_categories(scale))
+    return serve("jhu", locations, "/v2/countries?source=jhu")
+
+
+@benchmark("v2.locations_nyt")
+def v2_locations_nyt(scale):
+    locations = nyt.parse_locations(data.nyt_csv(scale))
+    return serve("nyt", locations, "/v2/locations?source=nyt")
+
+
+@benchmark("cache.roundtrip")
+def cache_roundtrip(scale):
+    results = {"locations": jhu.parse_category(data.jhu_csv("confirmed", scale)), "latest": 0}
+
+    async def roundtrip():
+        await caches.load_cache("benchmarks.jhu", results)
+        assert await caches.check_cache("benchmarks.jhu")
+
+    return run(roundtrip)
+
+
+def measure(func, repeat):
+    """
+    The best time per call of a function, over `repeat` runs of enough calls to last
+    0.2 seconds.
+
+    :returns: The seconds per call.
+    :rtype: float
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    """Run the benchmarks, print their times and compare them with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scale", nargs="+", choices=list(data.SCALES), default=["realistic"], help="scales"
+    )
+    parser.add_argument("--filter", default="", help="only the benchmarks containing this")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark")
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE, help="baseline file")
+    parser.add_argument("--save", action="store_true", help="save the times as the baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25, help="slowdown failing the comparison"
+    )
+    args = parser.parse_args()
+
+    # Time the work, not the logs of the services.
+    logging.getLogger().setLevel(logging.WARNING)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    times = {}
+    regressions = []
+    for scale in args.scale:
+        for name, setup in BENCHMARKS.items():
+            if args.filter not in name:
+                continue
+            key = f"{name}[{scale}]"
+            seconds = times[key] = measure(setup(data.SCALES[scale]), args.repeat)
+            line = f"{key:<40} {seconds * 1e3:>12.3f} ms"
+            if key in baseline:
+                ratio = seconds / baseline[key]
+                line += f" {ratio:>8.2f}x"
+                if ratio > args.threshold:
+                    regressions.append(key)
+                    line += "  REGRESSION"
+            print(line, flush=True)
+
+    if args.save:
+        baseline.update(times)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Saved {len(times)} times to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regressions (slower than {args.threshold}x the baseline)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+benchmarks.timeline
+~~~~~~~~~~~~~~~~~~~
+Construction, `latest` and serialization cost of the pydantic `app.models.Timeline`
+compared to the internal `app.timeline.Timeline`.
+
+Usage:
+    python -m benchmarks.timeline --days 300 --number 200
+"""
+import argparse
+import timeit
+from datetime import date, timedelta
+
+from app import models, timeline
+
+
+def history(days):
+    """A cumulative history of `days` ISO 8601 dates."""
+    first = date(2020, 1, 22)
+    return {
+        (first + timedelta(days=day)).isoformat() + "T00:00:00Z": day * day for day in range(days)
+    }
+
+
+def main():
+    """Print the time per operation for both timeline implementations."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=300, help="dates per timeline")
+    parser.add_argument("--number", type=int, default=200, help="repetitions per measurement")
+    args = parser.parse_args()
+
+    data = history(args.days)
+    implementations = {
+        "models.Timeline": lambda: models.Timeline(timeline=data),
+        "timeline.Timeline": lambda: timeline.Timeline.from_dict(data),
+    }
+    for name, construct in implementations.items():
+        instance = construct()
+        for operation, func in [
+            ("construct", construct),
+            ("latest", lambda: instance.latest),
+            ("serialize", instance.serialize),
+        ]:
+            seconds = timeit.timeit(func, number=args.number) / args.number
+            print(f"{name:<18} {operation:<10} {seconds * 1e6:>10.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+gunicorn.conf.py
+~~~~~~~~~~~~~~~~
+Loaded by gunicorn from the working directory (see the Procfile).
+
+The metrics of the workers are aggregated (see `app.metrics`) when the
+`prometheus_multiproc_dir` environment variable names a directory for them.
+"""
+import os
+import pathlib
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    """Discard the metrics of a previous run."""
+    if "prometheus_multiproc_dir" in os.environ:
+        directory = pathlib.Path(os.environ["prometheus_multiproc_dir"])
+        directory.mkdir(parents=True, exist_ok=True)
+        for path in directory.glob("*.db"):
+            path.unlink()
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    """Discard the live gauges of a dead worker."""
+    if "prometheus_multiproc_dir" in os.environ:
+        from prometheus_client import multiprocess  # pylint: disable=import-outside-toplevel
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,10 @@
+"""
+loadtest
+~~~~~~~~
+Load tests of the Coronavirus Tracker API, offline: the app is served against a local
+simulator of the upstream data-sources (`loadtest.upstream`) and a scripted client
+(`loadtest.client`) replays a mix of requests.
+
+`python -m loadtest.run` (`invoke loadtest`) starts the simulator and the app, then runs
+the client.
+"""
@@ -0,0 +1,134 @@
+"""
+loadtest.client
+~~~~~~~~~~~~~~~
+A scripted client replaying a mix of requests against the API (`MIX`), from `users`
+concurrent users for `duration` seconds, reporting the throughput and the latency
+percentiles of each request.
+
+Usage:
+    python -m loadtest.client --url http://127.0.0.1:8000 --users 20 --duration 30
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+# The requests and their weights (the v1 routes are at the root). `{id}` is replaced by a
+# random location id of the jhu data-source.
+MIX = (
+    ("/confirmed", 8),
+    ("/deaths", 4),
+    ("/recovered", 4),
+    ("/all", 2),
+    ("/v2/latest", 16),
+    ("/v2/latest?source=csbs", 4),
+    ("/v2/latest?source=nyt", 4),
+    ("/v2/locations", 8),
+    ("/v2/locations?timelines=true", 1),
+    ("/v2/locations/{id}", 12),
+    ("/v2/locations/{id}?timelines=true", 6),
+    ("/v2/locations?country_code=AU", 6),
+    ("/v2/locations?source=csbs&province=New York", 4),
+    ("/v2/locations?source=nyt&province=Washington", 2),
+    ("/v2/locations?sort=confirmed&limit=10", 6),
+    ("/v2/locations?near=40.7,-74.0&limit=5&source=csbs", 3),
+    ("/v2/countries?limit=10", 4),
+)
+
+# The reported percentiles.
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(durations, rank):
+    """
+    Gets a percentile of sorted durations (nearest rank).
+
+    :returns: The duration.
+    :rtype: float
+    """
+    index = max(0, min(len(durations) - 1, round(rank / 100 * len(durations)) - 1))
+    return durations[index]
+
+
+async def user(session, url, deadline, locations, results):
+    """Sends requests of the mix, one at a time, until the deadline."""
+    paths = [path for path, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    while time.monotonic() < deadline:
+        path = random.choices(paths, weights)[0]
+        started = time.perf_counter()
+        try:
+            async with session.get(url + path.format(id=random.randrange(locations))) as response:
+                await response.read()
+                status = response.status
+        except (ClientError, asyncio.TimeoutError) as err:
+            status = err.__class__.__name__
+        results.setdefault(path, []).append((time.perf_counter() - started, status))
+
+
+async def load(url, users, duration, timeout=60):
+    """
+    Runs the users against the API.
+
+    :returns: The durations (seconds) and statuses of the requests, by request of the mix,
+              and the elapsed seconds.
+    :rtype: Tuple[Dict[str, List[Tuple[float, Union[int, str]]]], float]
+    """
+    results = {}
+    async with ClientSession(timeout=ClientTimeout(total=timeout)) as session:
+        # Warm the caches of the app, and find the ids of the locations.
+        async with session.get(f"{url}/v2/latest?source=jhu") as response:
+            response.raise_for_status()
+        async with session.get(f"{url}/v2/locations?source=jhu") as response:
+            locations = len((await response.json())["locations"])
+        started = time.monotonic()
+        await asyncio.gather(
+            *(user(session, url, started + duration, locations, results) for _ in range(users))
+        )
+    return results, time.monotonic() - started
+
+
+def report(results, elapsed):
+    """
+    Formats the throughput and latencies of the requests.
+
+    :returns: The lines of the report.
+    :rtype: List[str]
+    """
+    header = f"{'request':<52} {'count':>6} {'errors':>6} {'req/s':>8}" + "".join(
+        f" {f'p{rank}':>8}" for rank in PERCENTILES
+    )
+    lines = [header + f" {'max':>8}  (ms)"]
+    everything = []
+    for path, _ in MIX + (("total", None),):
+        requests = everything if path == "total" else results.get(path, [])
+        if path != "total":
+            everything.extend(requests)
+        if not requests:
+            continue
+        durations = sorted(duration for duration, _ in requests)
+        errors = sum(1 for _, status in requests if status != 200)
+        line = f"{path:<52} {len(requests):>6} {errors:>6} {len(requests) / elapsed:>8.1f}"
+        line += "".join(f" {percentile(durations, rank) * 1000:>8.1f}" for rank in PERCENTILES)
+        lines.append(line + f" {durations[-1] * 1000:>8.1f}")
+    return lines
+
+
+def main():
+    """Load the API and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of the API")
+    parser.add_argument("--users", type=int, default=20, help="concurrent users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    args = parser.parse_args()
+
+    results, elapsed = asyncio.get_event_loop().run_until_complete(
+        load(args.url, args.users, args.duration)
+    )
+    print("\n".join(report(results, elapsed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+loadtest.run
+~~~~~~~~~~~~
+Starts the upstream simulator and the app (under gunicorn with uvicorn workers, or
+uvicorn alone), pointed at the simulator, then loads the app with the scripted client.
+
+Usage:
+    python -m loadtest.run --server gunicorn --workers 2 --users 20 --duration 30
+    python -m loadtest.run --latency 0.5 --failure-rate 0.1
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks import data
+
+from . import client, upstream
+
+
+def wait_until_up(url, timeout):
+    """Waits until the URL answers."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except OSError:  # Refused, or accepted by gunicorn before its workers started.
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{url} did not start in {timeout} seconds")
+            time.sleep(0.2)
+
+
+def app_command(server, host, port, workers):
+    """
+    The command serving the app.
+
+    :returns: The arguments of the command.
+    :rtype: List[str]
+    """
+    if server == "gunicorn":
+        return [
+            "gunicorn",
+            "app.main:APP",
+            "-w",
+            str(workers),
+            "-k",
+            "uvicorn.workers.UvicornWorker",
+            "-b",
+            f"{host}:{port}",
+        ]
+    return [sys.executable, "-m", "uvicorn", "app.main:APP", "--host", host, "--port", str(port)]
+
+
+def main():
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--host", default="127.0.0.1", help="interface of the servers")
+    parser.add_argument("--port", type=int, default=8000, help="port of the app")
+    parser.add_argument("--upstream-port", type=int, default=8001, help="port of the simulator")
+    parser.add_argument("--scale", choices=list(data.SCALES), default="realistic", help="sizes")
+    parser.add_argument("--latency", type=float, default=0.0, help="upstream delay (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra upstream delay")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="upstream failures")
+    parser.add_argument("--users", type=int, default=20, help="concurrent users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--startup-timeout", type=float, default=120, help="seconds")
+    args = parser.parse_args()
+
+    upstream_url = f"http://{args.host}:{args.upstream_port}"
+    app_url = f"http://{args.host}:{args.port}"
+    environment = dict(os.environ, **upstream.environment(upstream_url))
+    processes = []
+    try:
+        processes.append(
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "loadtest.upstream",
+                    "--host",
+                    args.host,
+                    "--port",
+                    str(args.upstream_port),
+                    "--scale",
+                    args.scale,
+                    "--latency",
+                    str(args.latency),
+                    "--jitter",
+                    str(args.jitter),
+                    "--failure-rate",
+                    str(args.failure_rate),
+                ]
+            )
+        )
+        wait_until_up(f"{upstream_url}/csbs/covid19_county.csv", args.startup_timeout)
+        processes.append(
+            subprocess.Popen(
+                app_command(args.server, args.host, args.port, args.workers), env=environment
+            )
+        )
+        wait_until_up(f"{app_url}/v2/sources", args.startup_timeout)
+
+        results, elapsed = asyncio.get_event_loop().run_until_complete(
+            client.load(app_url, args.users, args.duration)
+        )
+        print("\n".join(client.report(results, elapsed)))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+loadtest.upstream
+~~~~~~~~~~~~~~~~~
+A local simulator of the upstream data-sources, serving the synthetic files of
+`benchmarks.data` at the paths the services request:
+
+    /jhu/time_series_covid19_{category}_global.csv
+    /nyt/us-counties.csv  (with HTTP Range support)
+    /csbs/covid19_county.csv
+    /geonames/countryInfoJSON
+
+The responses are delayed by `latency` seconds (plus a uniform `jitter`), and a fraction
+`failure_rate` of them fail with `failure_status`. The app is pointed at the simulator
+with the settings of `environment`.
+
+Usage:
+    python -m loadtest.upstream --port 8001 --scale realistic --latency 0.2 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+from app import io
+from benchmarks import data
+
+# The categories of the jhu time series, and the backup of the populations. Not imported
+# from the app: importing the services fetches the populations.
+CATEGORIES = ("confirmed", "deaths", "recovered")
+GEONAMES_BACKUP_PATH = "geonames_population_mappings.json"
+
+
+def files(scale):
+    """
+    The files of the data-sources, by path.
+
+    :returns: The bodies of the files.
+    :rtype: Dict[str, bytes]
+    """
+    served = {
+        f"/jhu/time_series_covid19_{category}_global.csv": data.jhu_csv(category, scale)
+        for category in CATEGORIES
+    }
+    served["/nyt/us-counties.csv"] = data.nyt_csv(scale)
+    served["/csbs/covid19_county.csv"] = data.csbs_csv(scale)
+    return {path: body.encode("utf-8") for path, body in served.items()}
+
+
+def environment(url):
+    """
+    The settings pointing the app at a simulator.
+
+    :returns: The environment variables.
+    :rtype: Dict[str, str]
+    """
+    return {
+        "JHU_BASE_URL": f"{url}/jhu/",
+        "NYT_URL": f"{url}/nyt/us-counties.csv",
+        "CSBS_URL": f"{url}/csbs/covid19_county.csv",
+        "GEONAMES_URL": f"{url}/geonames/countryInfoJSON",
+    }
+
+
+def create_app(scale=1, latency=0.0, jitter=0.0, failure_rate=0.0, failure_status=503):
+    """
+    Creates the simulator.
+
+    :returns: The aiohttp application.
+    :rtype: aiohttp.web.Application
+    """
+    bodies = files(scale)
+    populations = {
+        "geonames": [
+            {"countryCode": code, "population": population or 0}
+            for code, population in io.load(GEONAMES_BACKUP_PATH).items()
+        ]
+    }
+
+    async def delay():
+        # Whether the response fails.
+        await asyncio.sleep(latency + random.uniform(0, jitter))
+        return random.random() < failure_rate
+
+    async def get_file(request):
+        body = bodies.get(request.path)
+        if body is None:
+            raise web.HTTPNotFound()
+        if await delay():
+            return web.Response(status=failure_status, text="Injected failure")
+        header = request.headers.get("Range", "")
+        if header.startswith("bytes=") and header.endswith("-"):
+            offset = int(header[len("bytes=") : -1])
+            if offset >= len(body):
+                return web.Response(status=416)
+            return web.Response(
+                status=206,
+                body=body[offset:],
+                content_type="text/csv",
+                headers={"Content-Range": f"bytes {offset}-{len(body) - 1}/{len(body)}"},
+            )
+        return web.Response(body=body, content_type="text/csv")
+
+    async def get_populations(request):  # pylint: disable=unused-argument
+        if await delay():
+            return web.Response(status=failure_status, text="Injected failure")
+        return web.json_response(populations)
+
+    app = web.Application()
+    app.router.add_get("/geonames/countryInfoJSON", get_populations)
+    app.router.add_get("/{source}/{filename}", get_file)
+    return app
+
+
+def main():
+    """Serve the simulator."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=8001, help="port to listen on")
+    parser.add_argument("--scale", choices=list(data.SCALES), default="realistic", help="sizes")
+    parser.add_argument("--latency", type=float, default=0.0, help="delay (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay (seconds)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction failed")
+    parser.add_argument("--failure-status", type=int, default=503, help="status of the failures")
+    args = parser.parse_args()
+
+    app = create_app(
+        data.SCALES[args.scale], args.latency, args.jitter, args.failure_rate, args.failure_status
+    )
+    web.run_app(app, host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,13 @@ Available commands
   invoke fmt
   invoke sort
   invoke check
+  invoke bench
+  invoke loadtest
+  invoke memory
 """
+import json
 import random
+import urllib.request
 
 import invoke
 
@@ -69,6 +74,79 @@ def test(ctx):
     ctx.run(" ".join(["pytest", "-v"]))
 
 
+@invoke.task(
+    help={
+        "scale": "Scales of the data, 'realistic' and/or '10x'. [default: realistic ]",
+        "filter": "Only the benchmarks containing this.",
+        "save": "Save the times as the baseline.",
+    }
+)
+def bench(ctx, scale="realistic", filter="", save=False):  # pylint: disable=redefined-builtin
+    """Run the benchmarks and compare them with the baseline."""
+    args = ["python", "-m", "benchmarks.suite", "--scale", *scale.split(",")]
+    if filter:
+        args.extend(["--filter", filter])
+    if save:
+        args.append("--save")
+    ctx.run(" ".join(args))
+
+
+@invoke.task(
+    help={
+        "server": "Server of the app, 'gunicorn' or 'uvicorn'. [default: gunicorn ]",
+        "workers": "Gunicorn workers. [default: 2 ]",
+        "users": "Concurrent users. [default: 20 ]",
+        "duration": "Seconds of load. [default: 30 ]",
+        "scale": "Sizes of the upstream data, 'realistic' or '10x'. [default: realistic ]",
+        "latency": "Delay of the upstream responses, in seconds. [default: 0 ]",
+        "failure_rate": "Fraction of the upstream responses failing. [default: 0 ]",
+    }
+)
+def loadtest(
+    ctx,
+    server="gunicorn",
+    workers=2,
+    users=20,
+    duration=30,
+    scale="realistic",
+    latency=0.0,
+    failure_rate=0.0,
+):  # pylint: disable=too-many-arguments
+    """Load the app, served against a local simulator of the data-sources."""
+    args = [
+        "python",
+        "-m",
+        "loadtest.run",
+        f"--server {server}",
+        f"--workers {workers}",
+        f"--users {users}",
+        f"--duration {duration}",
+        f"--scale {scale}",
+        f"--latency {latency}",
+        f"--failure-rate {failure_rate}",
+    ]
+    ctx.run(" ".join(args))
+
+
+@invoke.task(help={"url": "Base URL of the app. [default: http://localhost:8000 ]"})
+def memory(ctx, url="http://localhost:8000"):  # pylint: disable=unused-argument
+    """Report the memory of the datasets of a running app (requires MEMORY_PROFILING)."""
+    with urllib.request.urlopen(f"{url}/debug/memory") as response:
+        report = json.load(response)
+    for source, sizes in report["sources"].items():
+        print(f"{source}: {sizes['versions']} versions, {sizes['locations']} locations")
+        for name, footprint in sizes["footprint"].items():
+            print(f"  {name:<10} {footprint['objects']:>10} objects {footprint['bytes']:>14} bytes")
+    print("live objects:", json.dumps(report["live_objects"]))
+    print("process:", json.dumps(report["process"]))
+    for source, sites in report["growth"].items():
+        print(f"{source}: allocations grown at the last refresh")
+        for site in sites:
+            print(
+                f"  {site['size_diff']:>+12} bytes {site['count_diff']:>+8} blocks  {site['site']}"
+            )
+
+
 @invoke.task
 def generate_reqs(ctx):
     """Generate requirements.txt"""
@@ -60,14 +60,23 @@ class FakeRequestsGetResponse:
     """Fake instance of a response from `aiohttp.ClientSession.get`.
     """
 
+    status = 200
+
     def __init__(self, url, filename, state):
         self.url = url
         self.filename = filename
         self.state = state
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
 
     async def text(self):
         return self.read_file(self.state)
 
+    async def read(self):
+        return self.read_file(self.state).encode("utf-8")
+
     def read_file(self, state):
         """
         Mock HTTP GET-method and return text from file
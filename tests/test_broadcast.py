@@ -0,0 +1,146 @@
+import asyncio
+import json
+
+import pytest
+
+from app.broadcast import BROADCASTER, Broadcaster
+from app.dataset import Dataset
+from app.services.location import LocationService
+from tests.test_dataset import locations
+
+
+class FakeLocationService(LocationService):
+    def __init__(self):
+        super().__init__()
+        self.locations = locations()
+
+    async def get_all(self):
+        return self.locations
+
+    async def get(self, id):
+        return self.locations[id]
+
+    def refresh(self, amount):
+        self.locations = locations()
+        self.locations[0].timelines["confirmed"].values.append(amount)
+
+
+@pytest.fixture
+async def broadcaster():
+    broadcaster = Broadcaster({"fake": FakeLocationService()}, interval=0.01, queue_size=2)
+    yield broadcaster
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_subscribe_starts_with_current_version(broadcaster):
+    service = broadcaster.services["fake"]
+    queue = await broadcaster.subscribe("fake")
+
+    event = queue.get_nowait()
+    dataset = await service.get_dataset()
+    assert event.version == dataset.version
+    assert json.loads(event.text) == {
+        "source": "fake",
+        "version": dataset.version,
+        "latest": {"confirmed": 12, "deaths": 0, "recovered": 0},
+    }
+    assert (
+        event.message == f"event: refresh\nid: {dataset.version}\ndata: {event.text}\n\n".encode()
+    )
+
+
+@pytest.mark.asyncio
+async def test_publish_fans_out_one_event(broadcaster):
+    service = broadcaster.services["fake"]
+    queues = [await broadcaster.subscribe("fake") for _ in range(1000)]
+    for queue in queues:
+        queue.get_nowait()
+
+    service.refresh(10)
+    dataset = await service.get_dataset()
+
+    events = [queue.get_nowait() for queue in queues]
+    assert events[0].version == dataset.version
+    assert all(event is events[0] for event in events)
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_keeps_latest_events(broadcaster):
+    service = broadcaster.services["fake"]
+    queue = await broadcaster.subscribe("fake")
+
+    versions = []
+    for amount in range(10, 14):
+        service.refresh(amount)
+        versions.append((await service.get_dataset()).version)
+
+    assert [queue.get_nowait().version for _ in range(queue.qsize())] == versions[-2:]
+
+
+@pytest.mark.asyncio
+async def test_poll_while_subscribed(broadcaster):
+    service = broadcaster.services["fake"]
+    queue = await broadcaster.subscribe("fake")
+    queue.get_nowait()
+
+    # The poll picks up the refresh.
+    service.refresh(10)
+    event = await asyncio.wait_for(queue.get(), 1)
+    assert event.version == service.datasets[-1].version
+
+    task = broadcaster.task
+    broadcaster.unsubscribe("fake", queue)
+    await asyncio.sleep(0)
+    assert broadcaster.task is None
+    assert task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_websocket(async_api_client, mock_client_session):
+    latest = (await async_api_client.get("/v2/latest")).json()
+
+    async with async_api_client.websocket_connect("/v2/ws") as websocket:
+        event = await websocket.receive_json()
+        assert event["source"] == "jhu"
+        assert event["latest"] == latest["latest"]
+
+        dataset = Dataset(locations())
+        BROADCASTER.publish("jhu", dataset)
+        event = await websocket.receive_json()
+        assert event["version"] == dataset.version
+
+    await asyncio.sleep(0.01)
+    assert not BROADCASTER.subscribers["jhu"]
+    assert BROADCASTER.task is None
+
+
+@pytest.mark.asyncio
+async def test_server_sent_events(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/stream",
+        query_string={"source": "jhu"},
+        headers={"Accept-Encoding": "gzip"},
+        stream=True,
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/event-stream")
+    assert "Content-Encoding" not in response.headers
+
+    chunks = response.iter_content(4096)
+    first = await chunks.__anext__()
+    assert first.startswith(b"event: refresh\n")
+
+    dataset = Dataset(locations())
+    BROADCASTER.publish("jhu", dataset)
+    second = await chunks.__anext__()
+    assert second.startswith(b"event: refresh\nid: " + dataset.version.encode())
+
+    # The client disconnects, ending the stream and its subscription.
+    response.send({"type": "http.disconnect"})
+    for _ in range(100):
+        if not BROADCASTER.subscribers["jhu"]:
+            break
+        await asyncio.sleep(0.01)
+    assert not BROADCASTER.subscribers["jhu"]
+    assert BROADCASTER.task is None
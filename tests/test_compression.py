@@ -0,0 +1,168 @@
+import asyncio
+import gzip
+
+import pytest
+
+from app import metrics
+from app.routers import v2
+from app.services.location import jhu
+from app.utils import compression
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br" if compression.brotli else "gzip"),
+        ("deflate", None),
+        ("", None),
+        ("gzip;q=0", None),
+        ("*", compression.ENCODINGS[0]),
+        ("*;q=0.5, gzip;q=0", "br" if compression.brotli else None),
+        ("br;q=0.5, GZIP", "gzip"),
+        ("gzip;q=invalid", None),
+    ],
+)
+def test_negotiate(accept_encoding, expected):
+    body = compression.Precompressed(b"{}" * compression.MINIMUM_SIZE)
+
+    assert compression.negotiate(accept_encoding, body.encodings) == expected
+
+
+@pytest.mark.asyncio
+async def test_precompressed():
+    body = b'{"locations":[]}' * 100
+
+    precompressed = compression.Precompressed(body)
+
+    assert gzip.decompress(await precompressed.variant("gzip")) == body
+    assert compression.Precompressed(b"{}").encodings == ()
+
+
+@pytest.mark.asyncio
+async def test_precompressed_once(monkeypatch):
+    precompressed = compression.Precompressed(b"{}" * compression.MINIMUM_SIZE)
+    calls = []
+
+    def compress(body):
+        calls.append(body)
+        return b"compressed"
+
+    monkeypatch.setitem(compression.COMPRESSORS, "gzip", compress)
+    variants = await asyncio.gather(*(precompressed.variant("gzip") for _ in range(3)))
+
+    assert variants == [b"compressed"] * 3
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_precompressed_failure(monkeypatch):
+    precompressed = compression.Precompressed(b"{}" * compression.MINIMUM_SIZE)
+
+    def compress(body):
+        raise MemoryError
+
+    monkeypatch.setitem(compression.COMPRESSORS, "gzip", compress)
+    with pytest.raises(MemoryError):
+        await precompressed.variant("gzip")
+    # Compressed again.
+    monkeypatch.setitem(compression.COMPRESSORS, "gzip", lambda body: b"compressed")
+    assert await precompressed.variant("gzip") == b"compressed"
+
+
+def test_precompress_bounded_by_size(monkeypatch):
+    responses = metrics.CountedTTLCache(
+        "test.responses", maxsize=100, ttl=60, getsizeof=lambda cached: len(cached[1].body)
+    )
+    monkeypatch.setattr(compression, "RESPONSES", responses)
+
+    compression.precompress("/first", "version", b"1" * 60)
+    compression.precompress("/second", "version", b"2" * 60)
+    compression.precompress("/large", "version", b"3" * 200)
+
+    assert compression.lookup("/first", "version") is None
+    assert compression.lookup("/second", "version") is not None
+    assert compression.lookup("/large", "version") is None
+
+
+def test_precompress(monkeypatch):
+    monkeypatch.setattr(compression, "RESPONSES", {})
+
+    precompressed = compression.precompress("/shape", "version", b"{}")
+
+    assert compression.lookup("/shape", "version") is precompressed
+    assert compression.lookup("/shape", "other") is None
+    assert compression.lookup("/other", "version") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path", ["/v2/locations?timelines=true", "/v2/locations?source=csbs", "/all", "/confirmed"]
+)
+async def test_precompressed_routes(async_api_client, path, mock_client_session, monkeypatch):
+    monkeypatch.setattr(compression, "RESPONSES", {})
+
+    response = await async_api_client.get(path, headers={"Accept-Encoding": "identity"})
+    compressed = await async_api_client.get(path, headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == compressed.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(compressed.content) == response.content
+    # Precompressed once, `/all` with the categories it is assembled from.
+    assert len(compression.RESPONSES) == (1 + len(jhu.CATEGORIES) if path == "/all" else 1)
+
+
+@pytest.mark.asyncio
+async def test_precompressed_once_per_version(async_api_client, mock_client_session, monkeypatch):
+    monkeypatch.setattr(compression, "RESPONSES", {})
+    path = "/v2/locations?source=csbs&timelines=true"
+    first = await async_api_client.get(path)
+
+    def precompress(*args):
+        raise AssertionError("Compressed again.")
+
+    monkeypatch.setattr(v2, "precompress", precompress)
+    second = await async_api_client.get(path)
+
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "query_string",
+    [
+        {"source": "csbs", "timelines": True, "_": 1},
+        {"source": "csbs", "timelines": True, "state": "new york"},
+        {"source": "csbs", "timelines": True, "near": "40.7,-74.0", "limit": 5},
+    ],
+)
+async def test_not_precompressed(async_api_client, mock_client_session, monkeypatch, query_string):
+    # Neither the undeclared parameters nor the spatial queries are cached.
+    monkeypatch.setattr(compression, "RESPONSES", {})
+
+    response = await async_api_client.get("/v2/locations", query_string=query_string)
+
+    assert response.status_code == 200
+    assert compression.RESPONSES == {}
+
+
+@pytest.mark.asyncio
+async def test_precompressed_by_parameters(async_api_client, mock_client_session, monkeypatch):
+    # The parameters are keyed by value, the unused window and a limit over the number of
+    # locations are left out.
+    monkeypatch.setattr(compression, "RESPONSES", {})
+
+    for query_string in [
+        {"source": "csbs", "province": "New York"},
+        {"province": "NEW YORK", "source": "csbs", "window": 3},
+        {"source": "csbs", "province": "New York", "derived": "daily"},
+        {"source": "csbs", "province": "New York", "limit": 1000},
+        {"source": "csbs", "province": "New York", "limit": 2000},
+    ]:
+        response = await async_api_client.get("/v2/locations", query_string=query_string)
+        assert response.status_code == 200
+
+    assert len(compression.RESPONSES) == 2
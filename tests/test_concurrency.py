@@ -0,0 +1,65 @@
+"""tests.test_concurrency.py"""
+import asyncio
+
+import pytest
+
+from app.utils import concurrency
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit, expected_peak", [(None, 5), (0, 5), (2, 2), (1, 1)])
+async def test_gather_limit(limit, expected_peak):
+    running = 0
+    peak = 0
+
+    async def task(value):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return value
+
+    results = await concurrency.gather(*(task(value) for value in range(5)), limit=limit)
+
+    assert results == [0, 1, 2, 3, 4]
+    assert peak == expected_peak
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    calls = []
+
+    @concurrency.single_flight
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    results = await asyncio.gather(fetch("a"), fetch("a"), fetch("b"), fetch("a"))
+
+    assert results == ["A", "A", "B", "A"]
+    assert calls == ["a", "b"]
+
+    # Completed calls are not cached.
+    assert await fetch("a") == "A"
+    assert calls == ["a", "b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_single_flight_exception_and_cancellation():
+    @concurrency.single_flight
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream error")
+
+    first = asyncio.ensure_future(fail())
+    second = asyncio.ensure_future(fail())
+    await asyncio.sleep(0)
+    # Cancelling one caller does not cancel the shared call.
+    first.cancel()
+
+    with pytest.raises(ValueError):
+        await second
+    with pytest.raises(asyncio.CancelledError):
+        await first
@@ -13,3 +13,27 @@ def test_coordinates_class(latitude, longitude):
     check_obj = {"latitude": latitude, "longitude": longitude}
 
     assert coord_obj.serialize() == check_obj
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude, expected",
+    [
+        ("15", "101", {"latitude": 15.0, "longitude": 101.0}),
+        ("1.2833", "-74.00714", {"latitude": 1.2833, "longitude": -74.00714}),
+        (40, -74.5, {"latitude": 40.0, "longitude": -74.5}),
+        ("", None, {"latitude": None, "longitude": None}),
+        ("N/A", "2", {"latitude": None, "longitude": 2.0}),
+    ],
+)
+def test_coordinates_parse(latitude, longitude, expected):
+    coord_obj = coordinates.Coordinates.parse(latitude, longitude)
+
+    assert coord_obj.serialize() == expected
+
+
+def test_coordinates_slots():
+    coord_obj = coordinates.Coordinates(latitude=1.0, longitude=2.0)
+
+    assert not hasattr(coord_obj, "__dict__")
+    with pytest.raises(AttributeError):
+        coord_obj.altitude = 3.0
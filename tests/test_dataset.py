@@ -0,0 +1,203 @@
+import pytest
+
+from app import dataset as dataset_module
+from app.coordinates import Coordinates
+from app.dataset import Dataset, changes, growth
+from app.location import TimelinedLocation
+from app.location.csbs import CSBSLocation
+from app.services.location import LocationService
+from app.timeline import Timeline
+
+AXIS = ("2020-03-01T00:00:00Z", "2020-03-02T00:00:00Z", "2020-03-03T00:00:00Z")
+
+
+def timelined_location(id, country, confirmed, deaths=(0, 0)):
+    return TimelinedLocation(
+        id,
+        country,
+        "",
+        Coordinates(1, 2),
+        "2020-03-03T12:00:00Z",
+        {
+            "confirmed": Timeline(AXIS, confirmed),
+            "deaths": Timeline(AXIS, deaths),
+            "recovered": Timeline(),
+        },
+    )
+
+
+def locations():
+    return [
+        timelined_location(0, "Thailand", [1, 2]),
+        timelined_location(1, "Japan", [3, 4]),
+        timelined_location(2, "Italy", [5, 6]),
+    ]
+
+
+def test_version_follows_contents():
+    assert Dataset(locations()).version == Dataset(locations()).version
+
+    changed = locations()
+    changed[1].timelines["confirmed"].values[0] = 2
+    assert Dataset(changed).version != Dataset(locations()).version
+
+
+def test_changes_since_version():
+    previous = Dataset(locations())
+    current = locations()
+    # A new date, a correction, a moved location and a new location.
+    current[0] = timelined_location(0, "Thailand", [1, 2, 3])
+    current[1] = timelined_location(1, "Japan", [3, 4], [1, 0])
+    current[2] = timelined_location(2, "Spain", [5, 6])
+    current.append(timelined_location(3, "Italy", [5, 6]))
+
+    diff = changes(previous, Dataset(current))
+
+    assert diff["removed"] == []
+    assert [location["id"] for location in diff["locations"]] == [0, 1, 2, 3]
+    thailand, japan, spain, italy = (location["timelines"] for location in diff["locations"])
+    assert thailand["confirmed"] == {"latest": 3, "timeline": {AXIS[2]: 3}}
+    assert thailand["deaths"]["timeline"] == {}
+    assert japan["confirmed"]["timeline"] == {}
+    assert japan["deaths"]["timeline"] == {AXIS[0]: 1}
+    assert spain["confirmed"]["timeline"] == {AXIS[0]: 5, AXIS[1]: 6}
+    assert italy["confirmed"]["timeline"] == {AXIS[0]: 5, AXIS[1]: 6}
+
+
+def test_changes_unchanged_and_removed():
+    previous = Dataset(locations())
+
+    assert changes(previous, previous) == {"locations": [], "removed": []}
+    assert changes(previous, Dataset(locations())) == {"locations": [], "removed": []}
+    assert changes(previous, Dataset(locations()[:1])) == {"locations": [], "removed": [1, 2]}
+
+
+@pytest.mark.asyncio
+async def test_changes_since_memoized(monkeypatch):
+    previous, dataset = Dataset(locations()), Dataset(locations()[:1])
+    diff = await dataset.changes_since(previous)
+
+    def recompute(*args):
+        raise AssertionError("Computed again.")
+
+    monkeypatch.setattr(dataset_module, "changes", recompute)
+    assert await dataset.changes_since(previous) is diff
+    assert diff == {"locations": [], "removed": [1, 2]}
+
+
+def test_changes_without_previous_version():
+    diff = changes(None, Dataset(locations()))
+
+    assert len(diff["locations"]) == 3
+    assert diff["locations"][0]["timelines"]["confirmed"]["timeline"] == {AXIS[0]: 1, AXIS[1]: 2}
+
+
+def test_changes_without_timelines():
+    def csbs_location(confirmed):
+        return CSBSLocation(0, "Alabama", "Autauga", Coordinates(1, 2), "", confirmed, 0)
+
+    previous = Dataset([csbs_location(10)])
+
+    assert changes(previous, Dataset([csbs_location(10)]))["locations"] == []
+    (location,) = changes(previous, Dataset([csbs_location(12)]))["locations"]
+    assert location["latest"]["confirmed"] == 12
+    assert "timelines" not in location
+
+
+def test_location_rankings():
+    current = locations() + [
+        timelined_location(3, "Spain", [3, 4]),
+        CSBSLocation(4, "Alabama", "Autauga", Coordinates(1, 2), "", 10, 0),
+    ]
+    dataset = Dataset(current)
+
+    assert [location.id for location in dataset.location_ranking("confirmed")] == [4, 2, 1, 3, 0]
+    assert dataset.location_ranking("confirmed") is dataset.location_ranking("confirmed")
+    # Without timelines, no growth.
+    assert [location.id for location in dataset.location_ranking("growth")] == [2, 1, 3, 0, 4]
+
+
+def test_growth():
+    assert growth(timelined_location(0, "Japan", [1, 2, 4]), days=1) == 2
+    assert growth(timelined_location(0, "Japan", [1, 2, 4]), days=3) == 4
+    assert growth(timelined_location(0, "Japan", [])) == 0
+
+
+def test_countries():
+    current = locations() + [timelined_location(3, "Italy", [1, 3], [1, 2])]
+    dataset = Dataset(current)
+
+    assert [country.country_code for country in dataset.countries] == ["IT", "JP", "TH"]
+    italy = dataset.countries[0]
+    assert italy.locations == 2
+    assert italy.latest == {"confirmed": 9, "deaths": 2, "recovered": 0}
+    assert italy.timelines["confirmed"].timeline == {AXIS[0]: 6, AXIS[1]: 9}
+    assert italy.deaths_per_100k == round(2 * 100000 / italy.country_population, 2)
+
+    serialized = italy.serialize(timelines=True)
+    assert serialized["timelines"]["deaths"] == {"latest": 2, "timeline": {AXIS[0]: 1, AXIS[1]: 2}}
+    assert serialized["derived"]["deaths"]["per_capita"]["latest"] == italy.deaths_per_100k
+    assert "timelines" not in italy.serialize()
+
+
+def test_country_rankings(monkeypatch):
+    dataset = Dataset(locations())
+    # A country without population.
+    monkeypatch.setattr(dataset.countries[1], "confirmed_per_100k", None)
+
+    assert [country.country for country in dataset.ranking("confirmed")] == [
+        "Italy",
+        "Japan",
+        "Thailand",
+    ]
+    assert dataset.ranking("confirmed") is dataset.ranking("confirmed")
+    assert dataset.ranking("confirmed_per_100k")[-1] is dataset.countries[1]
+
+
+def test_countries_not_countries():
+    dataset = Dataset(
+        [
+            timelined_location(0, "Diamond Princess", [1, 2]),
+            timelined_location(1, "MS Zaandam", [1]),
+        ]
+    )
+
+    assert [country.country for country in dataset.countries] == ["Diamond Princess", "MS Zaandam"]
+    assert dataset.countries[0].country_code == "XX"
+
+
+class FakeLocationService(LocationService):
+    def __init__(self):
+        super().__init__()
+        self.locations = locations()
+
+    async def get_all(self):
+        return self.locations
+
+    async def get(self, id):
+        return self.locations[id]
+
+
+@pytest.mark.asyncio
+async def test_service_versions(monkeypatch):
+    service = FakeLocationService()
+    first = await service.get_dataset()
+
+    assert await service.get_dataset() is first
+
+    # Refreshed without changes.
+    service.locations = locations()
+    refreshed = await service.get_dataset()
+    assert refreshed.locations is service.locations
+    assert refreshed.version == first.version
+    assert len(service.datasets) == 1
+
+    versions = [first.version]
+    for amount in range(10, 10 + service.datasets.maxlen):
+        service.locations = locations()
+        service.locations[0].timelines["confirmed"].values.append(amount)
+        versions.append((await service.get_dataset()).version)
+
+    assert len(service.datasets) == service.datasets.maxlen
+    assert service.get_version(versions[0]) is None
+    assert service.get_version(versions[-1]).locations is service.locations
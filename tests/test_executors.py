@@ -0,0 +1,113 @@
+"""tests.test_executors.py"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.location import csbs
+from app.utils import executors
+
+from .conftest import AsyncMock
+
+
+def current_thread_name():
+    return threading.current_thread().name
+
+
+def read_example_counties():
+    with open("tests/example_data/covid19_county.csv") as file:
+        return file.read()
+
+
+@pytest.fixture
+def executor_kind(request, monkeypatch):
+    """Configure the executor kind for the duration of a test."""
+    monkeypatch.setattr(executors.SETTINGS, "parse_executor", request.param)
+    yield request.param
+    if executors.EXECUTOR is not None:
+        executors.EXECUTOR.shutdown()
+        executors.EXECUTOR = None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor_kind", ["thread"], indirect=True)
+async def test_run_in_thread_executor(executor_kind):
+    thread_name = await executors.run_in_executor(current_thread_name)
+
+    assert thread_name != threading.current_thread().name
+    assert isinstance(executors.EXECUTOR, executors.ThreadPoolExecutor)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor_kind", ["inline"], indirect=True)
+async def test_run_inline(executor_kind):
+    thread_name = await executors.run_in_executor(current_thread_name)
+
+    assert thread_name == threading.current_thread().name
+    assert executors.EXECUTOR is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor_kind", ["process"], indirect=True)
+async def test_run_in_process_executor(executor_kind):
+    text = read_example_counties()
+
+    locations = await executors.run_in_executor(csbs.parse_locations, text)
+
+    assert isinstance(executors.EXECUTOR, executors.ProcessPoolExecutor)
+    assert [location.serialize() for location in locations] == [
+        location.serialize() for location in csbs.parse_locations(text)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_teardown_executor(monkeypatch):
+    monkeypatch.setattr(executors.SETTINGS, "parse_executor", "thread")
+    executor = executors.get_executor()
+
+    await executors.teardown_executor()
+
+    assert executors.EXECUTOR is None
+    with pytest.raises(RuntimeError):
+        executor.submit(current_thread_name)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "executor_kind, parse_seconds, max_lag",
+    [("thread", 0.5, 0.1), ("inline", 0.5, None)],
+    indirect=["executor_kind"],
+)
+async def test_event_loop_lag_during_refresh(
+    executor_kind, parse_seconds, max_lag, mock_client_session, monkeypatch
+):
+    """Measure how long the event loop is blocked while the csbs locations are refreshed."""
+    parse_locations = csbs.parse_locations
+
+    def slow_parse_locations(text):
+        # Stand-in for the parsing of a large upstream file.
+        time.sleep(parse_seconds)
+        return parse_locations(text)
+
+    monkeypatch.setattr(csbs, "parse_locations", slow_parse_locations)
+    monkeypatch.setattr(csbs, "check_cache", AsyncMock(return_value=None))
+    monkeypatch.setattr(csbs, "load_cache", AsyncMock())
+
+    loop = asyncio.get_event_loop()
+    interval = 0.01
+    lag = 0.0
+    # Bypass the TTL cache to force a refresh.
+    refresh = asyncio.ensure_future(csbs.get_locations.__wrapped__())
+    while not refresh.done():
+        before = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(lag, loop.time() - before - interval)
+    locations = await refresh
+
+    assert locations
+    if max_lag is None:
+        # Parsing on the event loop blocks it for the whole parse.
+        assert lag >= parse_seconds * 0.9
+    else:
+        assert lag < max_lag
@@ -1,4 +1,10 @@
+import asyncio
+import collections
+
+import aiohttp
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
 from app.utils import httputils
 
@@ -17,3 +23,133 @@ async def test_setup_teardown_client_session():
     assert httputils.CLIENT_SESSION.closed
 
     del httputils.CLIENT_SESSION
+
+
+@pytest.fixture
+async def stub_server():
+    """Local aiohttp server simulating a slow and failing upstream."""
+    hits = collections.Counter()
+    headers = {}
+
+    async def ok(request):
+        hits[request.path] += 1
+        headers.update(request.headers)
+        response = web.Response(text="date,cases\n" * 1000)
+        response.enable_compression()
+        return response
+
+    async def flaky(request):
+        hits[request.path] += 1
+        if hits[request.path] <= 2:
+            return web.Response(status=503)
+        return web.Response(text="recovered")
+
+    async def broken(request):
+        hits[request.path] += 1
+        return web.Response(status=500)
+
+    async def missing(request):
+        hits[request.path] += 1
+        return web.Response(status=404)
+
+    async def slow(request):
+        hits[request.path] += 1
+        await asyncio.sleep(1)
+        return web.Response(text="too late")
+
+    app = web.Application()
+    app.add_routes(
+        [
+            web.get("/ok", ok),
+            web.get("/flaky", flaky),
+            web.get("/broken", broken),
+            web.get("/missing", missing),
+            web.get("/slow", slow),
+        ]
+    )
+    server = TestServer(app)
+    await server.start_server()
+    server.hits = hits
+    server.request_headers = headers
+    try:
+        yield server
+    finally:
+        await server.close()
+
+
+@pytest.fixture
+async def client_session(monkeypatch):
+    """The application-global client session with fast timeouts and backoff."""
+    monkeypatch.setattr(httputils.SETTINGS, "http_read_timeout", 0.2)
+    monkeypatch.setattr(httputils.SETTINGS, "http_retries", 2)
+    monkeypatch.setattr(httputils.SETTINGS, "http_retry_backoff", 0.01)
+    await httputils.setup_client_session()
+    try:
+        yield httputils.CLIENT_SESSION
+    finally:
+        await httputils.teardown_client_session()
+        del httputils.CLIENT_SESSION
+
+
+@pytest.mark.asyncio
+async def test_client_session_settings(client_session):
+    connector = client_session.connector
+
+    assert connector.limit == httputils.SETTINGS.http_connection_limit
+    assert connector.limit_per_host == httputils.SETTINGS.http_connection_limit_per_host
+    assert "gzip" in httputils.accept_encoding()
+
+
+@pytest.mark.asyncio
+async def test_get_text_compressed(stub_server, client_session):
+    text = await httputils.get_text(stub_server.make_url("/ok"))
+
+    assert text == "date,cases\n" * 1000
+    assert "gzip" in stub_server.request_headers["Accept-Encoding"]
+    assert stub_server.hits["/ok"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_text_retries(stub_server, client_session):
+    text = await httputils.get_text(stub_server.make_url("/flaky"))
+
+    assert text == "recovered"
+    assert stub_server.hits["/flaky"] == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path, exception, expected_hits",
+    [
+        ("/broken", aiohttp.ClientResponseError, 3),
+        ("/missing", aiohttp.ClientResponseError, 1),
+        ("/slow", asyncio.TimeoutError, 3),
+    ],
+)
+async def test_get_text_failures(stub_server, client_session, path, exception, expected_hits):
+    with pytest.raises(exception):
+        await httputils.get_text(stub_server.make_url(path))
+
+    assert stub_server.hits[path] == expected_hits
+
+
+@pytest.mark.asyncio
+async def test_retry_backoff(monkeypatch):
+    monkeypatch.setattr(httputils.SETTINGS, "http_retries", 3)
+    monkeypatch.setattr(httputils.SETTINGS, "http_retry_backoff", 0.5)
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    async def unreachable():
+        raise aiohttp.ClientConnectionError("connection refused")
+
+    monkeypatch.setattr(httputils.asyncio, "sleep", sleep)
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await httputils.retry(unreachable)
+
+    # Exponential backoff with full jitter.
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        assert 0 <= delay <= 0.5 * 2 ** attempt
@@ -1,10 +1,12 @@
+import asyncio
+import json
 from unittest import mock
 
 import pytest
 
 from app import location
 from app.services.location import jhu
-from tests.conftest import mocked_strptime_isoformat
+from tests.conftest import AsyncMock, asynccontextmanager, mocked_strptime_isoformat
 
 DATETIME_STRING = "2020-03-17T10:23:22.505550"
 
@@ -19,6 +21,12 @@ async def test_get_locations(mock_client_session):
     assert isinstance(output, list)
     assert isinstance(output[0], location.Location)
 
+    # All timelines share a single date axis.
+    axis = output[0].timelines["confirmed"].axis
+    for loc in output:
+        for timeline in loc.timelines.values():
+            assert timeline.axis is axis or not timeline
+
     # `jhu.get_locations()` creates id based on confirmed list
     location_confirmed = await jhu.get_category("confirmed")
     assert len(output) == len(location_confirmed["locations"])
@@ -61,3 +69,242 @@ def test_parse_history(key, locations, index, expected):
     locations data based on index.
     """
     assert jhu.parse_history(key, locations, index) == expected
+
+
+def read_example_category(category):
+    with open(f"tests/example_data/time_series_covid19_{category}_global.csv") as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("category", ["confirmed", "deaths", "recovered"])
+def test_parse_category(category, monkeypatch):
+    """The normalized locations match the v1 output."""
+    monkeypatch.setattr(jhu, "numpy", None)
+    with open(f"tests/expected_output/v1_{category}.json") as file:
+        expected = json.load(file)
+
+    locations = jhu.parse_category(read_example_category(category))
+
+    assert locations == expected["locations"]
+    assert sum(location["latest"] for location in locations) == expected["latest"]
+
+
+@pytest.mark.parametrize("category", ["confirmed", "deaths", "recovered"])
+def test_parse_category_numpy_parity(category, monkeypatch):
+    """The NumPy and the pure-Python parsers produce identical locations."""
+    numpy = pytest.importorskip("numpy")
+    text = read_example_category(category)
+
+    vectorized = jhu.parse_category(text)
+    monkeypatch.setattr(jhu, "numpy", None)
+    pure_python = jhu.parse_category(text)
+
+    assert jhu.numpy is None
+    assert vectorized == pure_python
+    assert all(type(amount) is int for amount in vectorized[0]["history"].values())
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_parse_amounts(use_numpy, monkeypatch):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(jhu, "numpy", None)
+    rows = [
+        ["", "Thailand", "15", "101", "1", "2.0", ""],
+        ["Hubei", "China", "30.97", "112.27", "", "10", "12"],
+    ]
+
+    assert jhu.parse_amounts(rows, [4, 5, 6]) == [[1, 2, 0], [0, 10, 12]]
+    assert jhu.parse_amounts(rows, [6, 4]) == [[0, 1], [12, 0]]
+    assert jhu.parse_amounts(rows, []) == [[], []]
+    assert jhu.parse_amounts([], [4, 5, 6]) == []
+
+
+def test_parse_category_blank_and_short_rows():
+    text = "Province/State,Country/Region,Lat,Long,1/22/20,1/23/20\n,Thailand,15,101,2\n\n"
+
+    locations = jhu.parse_category(text)
+
+    assert len(locations) == 1
+    assert locations[0]["history"] == {"1/22/20": 2, "1/23/20": 0}
+    assert locations[0]["latest"] == 0
+
+
+REVISION = (
+    "Province/State,Country/Region,Lat,Long,1/22/20,1/23/20\n"
+    ",Thailand,15,101,2,3\n"
+    "Hubei,China,30.9756,112.2707,444,444\n"
+    ",Japan,36,138,2,1\n"
+)
+
+
+@pytest.fixture
+def parsed_rows(monkeypatch):
+    """Records the number of rows and columns converted by each `parse_amounts` call."""
+    calls = []
+    parse_amounts = jhu.parse_amounts
+
+    def recording_parse_amounts(rows, columns):
+        calls.append((len(rows), len(columns)))
+        return parse_amounts(rows, columns)
+
+    monkeypatch.setattr(jhu, "parse_amounts", recording_parse_amounts)
+    return calls
+
+
+def assert_parsed(revision, text):
+    """The revision matches the CSV parsed from scratch."""
+    expected = jhu.parse_revision(text)
+    assert revision.locations == expected.locations
+    assert revision.dates == expected.dates
+    assert revision.short == expected.short
+
+
+def test_parse_revision_unchanged(parsed_rows):
+    previous = jhu.parse_revision(REVISION)
+
+    assert jhu.parse_revision(REVISION, previous) is previous
+    assert parsed_rows == [(3, 2)]
+
+
+def test_parse_revision_added_columns(parsed_rows):
+    previous = jhu.parse_revision(REVISION)
+    text = (
+        REVISION.replace("1/23/20\n", "1/23/20,1/24/20,1/25/20\n")
+        .replace("2,3\n", "2,3,5,8\n")
+        .replace("444,444\n", "444,444,549,761\n")
+        .replace("2,1\n", "2,1,2,\n")
+    )
+
+    revision = jhu.parse_revision(text, previous)
+
+    assert parsed_rows[1:] == [(3, 2)]
+    assert_parsed(revision, text)
+    # Only the cells of the new columns were converted.
+    # The previous revision is left untouched.
+    assert_parsed(previous, REVISION)
+
+
+def test_parse_revision_added_rows(parsed_rows):
+    previous = jhu.parse_revision(REVISION)
+    text = REVISION + ",Italy,43,12,0,0\n,Spain,40,-4,0\n"
+
+    revision = jhu.parse_revision(text, previous)
+
+    assert parsed_rows[1:] == [(2, 2)]
+    assert_parsed(revision, text)
+    assert revision.short == {4}
+    assert all(a is b for a, b in zip(revision.locations, previous.locations))
+
+
+def test_parse_revision_retroactive_correction(parsed_rows):
+    previous = jhu.parse_revision(REVISION)
+    text = REVISION.replace("444,444\n", "444,500\n")
+
+    revision = jhu.parse_revision(text, previous)
+
+    assert parsed_rows[1:] == [(1, 2)]
+    assert_parsed(revision, text)
+    assert revision.locations[0] is previous.locations[0]
+    assert revision.locations[2] is previous.locations[2]
+
+
+def test_parse_revision_correction_with_added_column(parsed_rows):
+    previous = jhu.parse_revision(REVISION)
+    text = (
+        REVISION.replace("1/23/20\n", "1/23/20,1/24/20\n")
+        .replace("2,3\n", "2,4,5\n")
+        .replace("444,444\n", "444,444,549\n")
+        .replace("2,1\n", "2,1,2\n")
+    )
+
+    revision = jhu.parse_revision(text, previous)
+
+    assert parsed_rows[1:] == [(2, 1), (1, 3)]
+    assert_parsed(revision, text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # A location moved.
+        REVISION.replace("15,101", "15.87,100.99"),
+        # A location removed.
+        REVISION.replace(",Japan,36,138,2,1\n", ""),
+        # A column inserted.
+        REVISION.replace("Long,", "Long,Population,").replace("2,3\n", "70,2,3\n"),
+        # A location inserted.
+        REVISION.replace("Hubei", ",Italy,43,12,0,0\nHubei"),
+    ],
+)
+def test_parse_revision_rebuilds_changed_metadata(text, parsed_rows):
+    previous = jhu.parse_revision(REVISION)
+
+    revision = jhu.parse_revision(text, previous)
+
+    assert parsed_rows[-1] == (len(revision.locations), len(revision.dates))
+    assert_parsed(revision, text)
+
+
+@pytest.fixture
+def delayed_client_session(mock_client_session):
+    """Client session mock answering each request after a delay, counting the requests."""
+    delay = 0.2
+    requests = []
+    mocked_get = mock_client_session.get
+
+    @asynccontextmanager
+    async def delayed_get(url, *args, **kwargs):
+        requests.append(url)
+        await asyncio.sleep(delay)
+        async with mocked_get(url, *args, **kwargs) as response:
+            yield response
+
+    mock_client_session.get = delayed_get
+    mock_client_session.delay = delay
+    mock_client_session.requests = requests
+    return mock_client_session
+
+
+@pytest.fixture
+def uncached_categories(monkeypatch):
+    """Bypass the local and shared caches of the categories."""
+    monkeypatch.setattr(jhu, "get_category", jhu.get_category.__wrapped__)
+    monkeypatch.setattr(jhu, "check_cache", AsyncMock(return_value=None))
+    monkeypatch.setattr(jhu, "load_cache", AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_get_locations_fetches_categories_concurrently(
+    delayed_client_session, uncached_categories
+):
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    locations = await jhu.get_locations.__wrapped__()
+    elapsed = loop.time() - start
+
+    assert locations
+    assert len(delayed_client_session.requests) == 3
+    # Wall time is about the slowest fetch, not the sum of the three.
+    assert elapsed < 2 * delayed_client_session.delay
+
+
+@pytest.mark.asyncio
+async def test_get_categories_fetch_limit(delayed_client_session, uncached_categories, monkeypatch):
+    monkeypatch.setattr(jhu.SETTINGS, "fetch_concurrency", 1)
+
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    await jhu.get_categories()
+    elapsed = loop.time() - start
+
+    assert elapsed >= 3 * delayed_client_session.delay
+
+
+@pytest.mark.asyncio
+async def test_get_category_single_fetch(delayed_client_session, uncached_categories):
+    results = await asyncio.gather(*(jhu.get_category("confirmed") for _ in range(5)))
+
+    assert all(result is results[0] for result in results)
+    assert len(delayed_client_session.requests) == 1
@@ -4,6 +4,7 @@ from unittest import mock
 import pytest
 
 from app import coordinates, location, models
+from app.location import csbs
 
 
 def mocked_timeline(*args, **kwargs):
@@ -58,3 +59,30 @@ def test_location_class(
 
     assert location_obj.country_code == country_code
     assert location_obj.serialize() is not None
+
+
+@pytest.mark.parametrize(
+    "location_obj",
+    [
+        location.TimelinedLocation(
+            0,
+            "Thailand",
+            "",
+            coordinates.Coordinates(15.0, 101.0),
+            "",
+            {
+                "confirmed": models.Timeline(timeline={}),
+                "deaths": models.Timeline(timeline={}),
+                "recovered": models.Timeline(timeline={}),
+            },
+        ),
+        csbs.CSBSLocation(
+            0, "New York", "New York", coordinates.Coordinates(40.7, -74.0), "", 1, 0
+        ),
+    ],
+)
+def test_location_slots(location_obj):
+    # Locations are slotted to keep per-location memory down.
+    assert not hasattr(location_obj, "__dict__")
+    with pytest.raises(AttributeError):
+        location_obj.unknown_attribute = True
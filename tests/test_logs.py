@@ -0,0 +1,86 @@
+import json
+import logging
+
+import pytest
+
+from app.utils import logs
+
+
+class Counted:
+    """A value counting its formatting."""
+
+    formatted = 0
+
+    def __str__(self):
+        Counted.formatted += 1
+        return "counted"
+
+
+@pytest.fixture
+def logger():
+    return logs.get_logger("tests.logs")
+
+
+def test_event_fields(logger, caplog):
+    with caplog.at_level(logging.INFO, logger="tests.logs"):
+        logger.info("results of %s", "jhu", data_id="jhu.confirmed", locations=3)
+
+    (record,) = caplog.records
+    assert record.getMessage() == "results of jhu data_id=jhu.confirmed locations=3"
+    assert record.fields == {"data_id": "jhu.confirmed", "locations": 3}
+
+
+@pytest.mark.parametrize("method", ["info", "log"])
+def test_caller(logger, caplog, method):
+    with caplog.at_level(logging.INFO, logger="tests.logs"):
+        if method == "info":
+            logger.info("results", data_id="jhu.confirmed")
+        else:
+            logger.log(logging.INFO, "results", data_id="jhu.confirmed")
+
+    (record,) = caplog.records
+    assert record.funcName == "test_caller"
+    assert record.pathname == __file__
+
+
+def test_disabled_level_not_formatted(logger, caplog):
+    Counted.formatted = 0
+    with caplog.at_level(logging.INFO, logger="tests.logs"):
+        logger.debug("results", value=Counted())
+        assert Counted.formatted == 0
+        logger.info("results", value=Counted())
+
+    assert len(caplog.records) == 1
+    assert Counted.formatted > 0
+    assert caplog.records[0].getMessage() == "results value=counted"
+
+
+@pytest.mark.parametrize("sample, expected", [(0, 0), (1, 10), (None, 10)])
+def test_sampled(logger, caplog, sample, expected):
+    with caplog.at_level(logging.INFO, logger="tests.logs"):
+        for _ in range(10):
+            logger.info("source provided", source="jhu", sample=sample)
+
+    assert len(caplog.records) == expected
+
+
+def test_json_formatter(logger, caplog):
+    with caplog.at_level(logging.INFO, logger="tests.logs"):
+        logger.info("cache pulled", data_id="jhu.confirmed", hit=True)
+        try:
+            raise TypeError("not serializable")
+        except TypeError as type_err:
+            logger.exception("shared cache not loaded", error=type_err)
+        logging.getLogger("tests.logs").warning("plain %s", "message")
+
+    pulled, failed, plain = (
+        json.loads(logs.JSONFormatter().format(record)) for record in caplog.records
+    )
+    assert pulled["message"] == "cache pulled"
+    assert pulled["level"] == "INFO"
+    assert pulled["logger"] == "tests.logs"
+    assert pulled["data_id"] == "jhu.confirmed"
+    assert pulled["hit"] is True
+    assert failed["error"] == "not serializable"
+    assert "TypeError" in failed["exc_info"]
+    assert plain["message"] == "plain message"
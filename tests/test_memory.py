@@ -0,0 +1,99 @@
+import sys
+import tracemalloc
+from collections import deque
+
+import pytest
+
+from app.data import DATA_SOURCES
+from app.dataset import Dataset
+from app.timeline import Timeline
+from app.utils import memory
+
+from .test_dataset import locations
+
+
+class Service:
+    def __init__(self, *datasets):
+        self.datasets = deque(datasets)
+
+
+def test_footprint_counts_shared_objects_once():
+    shared = "x" * 1000
+    single = memory.footprint([[shared]])
+    double = memory.footprint([[shared], [shared]])
+
+    assert single["objects"] == 2
+    assert double["objects"] == 3
+    assert double["bytes"] - single["bytes"] == sys.getsizeof([shared])
+
+
+def test_footprint_walks_slots():
+    timeline = Timeline(("2020-03-01T00:00:00Z",), [1])
+
+    assert memory.footprint([timeline])["bytes"] > sys.getsizeof(timeline) + sys.getsizeof(
+        timeline.values
+    )
+
+
+def test_dataset_report():
+    previous, current = Dataset(locations()), Dataset(locations())
+
+    report = memory.dataset_report(Service(previous, current))
+
+    assert report["versions"] == 2
+    assert report["locations"] == 3
+    footprint = report["footprint"]
+    assert 0 < footprint["timelines"]["bytes"] < footprint["locations"]["bytes"]
+    assert footprint["locations"]["bytes"] <= footprint["dataset"]["bytes"]
+    assert footprint["versions"]["bytes"] > footprint["dataset"]["bytes"]
+    assert memory.dataset_report(Service()) == {"versions": 0, "locations": 0, "footprint": {}}
+
+
+def test_live_objects():
+    datasets = [Dataset(locations()) for _ in range(3)]
+
+    counts = memory.live_objects()
+
+    assert counts["Dataset"] >= len(datasets)
+    assert counts["TimelinedLocation"] >= 3 * len(datasets)
+
+
+def test_record_refresh(monkeypatch):
+    monkeypatch.setattr(memory, "SNAPSHOTS", {})
+    monkeypatch.setattr(memory, "GROWTH", {})
+    tracemalloc.start()
+    try:
+        memory.record_refresh("jhu", None)
+        assert memory.GROWTH == {}
+        held = [bytearray(1024) for _ in range(100)]
+        memory.record_refresh("jhu", None)
+    finally:
+        tracemalloc.stop()
+
+    (grown, *_) = memory.GROWTH["jhu"]
+    assert grown["size_diff"] >= 100 * 1024
+    assert grown["count_diff"] >= len(held)
+    assert __file__ in grown["site"]
+
+
+@pytest.mark.asyncio
+async def test_memory_endpoint(async_api_client, monkeypatch):
+    monkeypatch.setattr(memory, "ENABLED", True)
+    monkeypatch.setattr(DATA_SOURCES["jhu"], "datasets", deque([Dataset(locations())]))
+
+    response = await async_api_client.get("/debug/memory")
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["sources"]["jhu"]["locations"] == 3
+    assert report["live_objects"]["Dataset"] >= 1
+    assert set(report) == {"sources", "live_objects", "process", "growth"}
+
+
+@pytest.mark.asyncio
+async def test_memory_endpoint_disabled(async_api_client, monkeypatch):
+    monkeypatch.setattr(memory, "ENABLED", False)
+
+    response = await async_api_client.get("/debug/memory")
+
+    assert response.status_code == 404
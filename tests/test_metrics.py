@@ -0,0 +1,71 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from app import metrics
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_counted_ttl_cache():
+    cache = metrics.CountedTTLCache("test.cache", maxsize=1, ttl=60)
+    hits = sample("cache_requests_total", layer="local", cache="test.cache", result="hit")
+    misses = sample("cache_requests_total", layer="local", cache="test.cache", result="miss")
+
+    with pytest.raises(KeyError):
+        cache["key"]
+    cache["key"] = "value"
+    assert cache["key"] == "value"
+
+    assert sample("cache_requests_total", layer="local", cache="test.cache", result="hit") == (
+        hits + 1
+    )
+    assert sample("cache_requests_total", layer="local", cache="test.cache", result="miss") == (
+        misses + 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_render_seconds():
+    response = metrics.TimedJSONResponse({"latest": 1})
+    scope = {"type": "http"}
+
+    async def send(message):
+        pass
+
+    assert metrics.render_seconds(scope) is None
+    await response(scope, None, send)
+    assert response.body == b'{"latest":1}'
+    assert 0 <= metrics.render_seconds(scope) < 1
+    assert b"server-timing" not in dict(response.raw_headers)
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_api_client, mock_client_session):
+    route = {"method": "GET", "route": "/v2/locations/{id}", "status": "200"}
+    requests = sample("http_request_seconds_count", **route)
+
+    response = await async_api_client.get("/v2/locations/1", query_string={"source": "csbs"})
+    assert "server-timing" not in response.headers
+    await async_api_client.get("/v2/locations/2", query_string={"source": "csbs"})
+    await async_api_client.get("/v2/locations", query_string={"source": "csbs"})
+
+    assert sample("http_request_seconds_count", **route) == requests + 2
+    assert sample("http_render_seconds_count", route="/v2/locations/{id}") >= 2
+    assert sample("dataset_locations", source="csbs") > 0
+
+    response = await async_api_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_seconds_count{method="GET",route="/v2/locations/{id}"' in response.text
+    assert "upstream_fetch_bytes_total" in response.text
+
+
+def test_exposition_multiprocess(tmp_path, monkeypatch):
+    monkeypatch.setenv("prometheus_multiproc_dir", str(tmp_path))
+
+    content_type, data = metrics.exposition()
+
+    assert content_type.startswith("text/plain")
+    assert isinstance(data, bytes)
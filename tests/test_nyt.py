@@ -2,11 +2,13 @@ import json
 from unittest import mock
 
 import pytest
+from aiohttp import ClientError
 
 from app.location import TimelinedLocation
 from app.location.nyt import NYTLocation
 from app.services.location import nyt
-from tests.conftest import mocked_strptime_isoformat
+from app.utils import httputils
+from tests.conftest import AsyncMock, asynccontextmanager, mocked_strptime_isoformat
 
 DATETIME_STRING = "2020-04-12T19:14:59.638001"
 
@@ -40,3 +42,179 @@ async def test_get_locations(mock_client_session):
 
     # translate them into python lists for ordering
     assert json.loads(expected_json_output) == json.loads(produced_json_output)
+
+
+class FakeUpstream:
+    """Serves the NYT feed from memory, honouring Range requests unless told otherwise."""
+
+    def __init__(self, data, ranges=True):
+        self.data = data
+        self.ranges = ranges
+        self.requests = []
+
+    @asynccontextmanager
+    async def get(self, url, headers=None, **kwargs):
+        byte_range = (headers or {}).get("Range")
+        self.requests.append(byte_range)
+        response = mock.Mock(status=200)
+        body = self.data
+        if byte_range and self.ranges:
+            offset = int(byte_range[len("bytes=") : -1])
+            response.status = 206 if offset < len(self.data) else 416
+            body = self.data[offset:]
+        response.read = AsyncMock(return_value=body)
+        yield response
+
+
+with open("tests/example_data/counties.csv", "rb") as _file:
+    FEED = _file.read()
+HEAD, TAIL = FEED[: FEED.index(b"\n", 600) + 1], FEED[FEED.index(b"\n", 600) + 1 :]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """A fresh feed state and an upstream serving the first rows of the feed."""
+    fake_upstream = FakeUpstream(HEAD)
+    monkeypatch.setattr(nyt, "FEED", None)
+    monkeypatch.setattr(httputils, "CLIENT_SESSION", fake_upstream, raising=False)
+    return fake_upstream
+
+
+def serialize(locations):
+    serialized = []
+    for location in locations:
+        serialized_location = location.serialize(timelines=True)
+        del serialized_location["last_updated"]
+        serialized.append(serialized_location)
+    return serialized
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ranges", [True, False])
+async def test_refresh_feed_ingests_new_rows(upstream, ranges):
+    upstream.ranges = ranges
+    feed = await nyt.refresh_feed()
+    offset = feed.offset
+    locations = feed.get_locations()
+    previous = serialize(locations)
+
+    upstream.data = FEED
+    assert await nyt.refresh_feed() is feed
+    assert upstream.requests[-1] == f"bytes={offset - 1}-"
+    assert feed.offset == len(FEED)
+
+    expected = serialize(nyt.parse_locations(FEED.decode("utf-8")))
+    assert serialize(feed.get_locations()) == expected
+    # Locations handed out before the refresh are left untouched.
+    assert serialize(locations) == previous
+
+
+@pytest.mark.asyncio
+async def test_refresh_feed_unchanged(upstream):
+    feed = await nyt.refresh_feed()
+    locations = feed.get_locations()
+
+    assert await nyt.refresh_feed() is feed
+    assert feed.get_locations() is locations
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "rewrite",
+    [
+        # A row inserted in the history, the appended bytes repeat known dates.
+        lambda data: data.replace(
+            b"2020-01-21,", b"2020-01-20,Snohomish,Washington,53061,1,0\n2020-01-21,", 1
+        ),
+        # The feed shrunk.
+        lambda data: data[: data.index(b"\n", 100) + 1],
+    ],
+)
+async def test_refresh_feed_rebuilds_on_rewrite(upstream, rewrite):
+    feed = await nyt.refresh_feed()
+    upstream.data = rewrite(upstream.data)
+
+    rebuilt = await nyt.refresh_feed()
+
+    assert rebuilt is not feed
+    assert upstream.requests[-1] is None
+    assert serialize(rebuilt.get_locations()) == serialize(
+        nyt.parse_locations(upstream.data.decode("utf-8"))
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_feed_rebuilds_rewritten_history_without_ranges(upstream):
+    upstream.ranges = False
+    feed = await nyt.refresh_feed()
+    upstream.data = upstream.data.replace(b",1,0\n", b",2,0\n", 1) + TAIL
+
+    rebuilt = await nyt.refresh_feed()
+
+    assert rebuilt is not feed
+    # The complete feed received is parsed, not requested again.
+    assert len(upstream.requests) == 2
+    assert rebuilt.get_locations()[0].timelines["confirmed"].values[0] == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_feed_rebuilds_daily(upstream, monkeypatch):
+    feed = await nyt.refresh_feed()
+    monkeypatch.setattr(nyt, "FULL_REFRESH_INTERVAL", 0)
+
+    assert await nyt.refresh_feed() is not feed
+    assert upstream.requests == [None, None]
+
+
+# The last row of the first rows of the feed, with other amounts.
+LAST_ROW = HEAD[HEAD.rindex(b"\n", 0, -1) + 1 :]
+DUPLICATED_ROW = b",".join(LAST_ROW.split(b",")[:4] + [b"99", b"9\n"])
+
+
+@pytest.mark.asyncio
+async def test_refresh_feed_keeps_feed_on_failure(upstream, monkeypatch):
+    feed = await nyt.refresh_feed()
+    get_bytes = nyt._get_bytes
+
+    async def unreachable(*args, **kwargs):
+        raise ClientError("unreachable")
+
+    monkeypatch.setattr(httputils.SETTINGS, "http_retries", 0)
+    monkeypatch.setattr(nyt, "_get_bytes", unreachable)
+    with pytest.raises(ClientError):
+        await nyt.refresh_feed()
+
+    monkeypatch.setattr(nyt, "_get_bytes", get_bytes)
+    upstream.data = FEED
+    assert await nyt.refresh_feed() is feed
+    assert upstream.requests[-1] == f"bytes={len(HEAD) - 1}-"
+
+
+@pytest.mark.asyncio
+async def test_refresh_feed_replaces_duplicated_rows(upstream):
+    feed = await nyt.refresh_feed()
+    upstream.data = HEAD + DUPLICATED_ROW
+
+    assert await nyt.refresh_feed() is feed
+    expected = serialize(nyt.parse_locations(upstream.data.decode("utf-8")))
+    assert serialize(feed.get_locations()) == expected
+    assert 99 in [location.timelines["confirmed"].values[-1] for location in feed.get_locations()]
+
+
+def test_failed_extend_leaves_feed_unchanged():
+    feed = nyt.parse_feed(HEAD)
+
+    def state():
+        counties = {key: tuple(map(list, history)) for key, history in feed.counties.items()}
+        return list(feed.axis), dict(feed.positions), counties, feed.offset
+
+    before = state()
+    # A new date and county, a replaced row, then a row preceding the history of its county.
+    rows = (
+        b"2020-03-20,Nowhere,Washington,1,5,0\n"
+        + DUPLICATED_ROW
+        + b"2020-01-21,Snohomish,Washington,53061,1,0\n"
+    )
+
+    assert not feed.extend(rows)
+    assert state() == before
@@ -5,8 +5,12 @@ from unittest import mock
 
 import pytest
 from async_asgi_testclient import TestClient
+from fastapi.responses import JSONResponse
 
 from app.main import APP
+from app.routers import v2
+from app.services.location import jhu
+from app.utils import compression
 
 from .conftest import mocked_strptime_isoformat
 from .test_jhu import DATETIME_STRING
@@ -186,3 +190,344 @@ async def test_latest(async_api_client, query_params, mock_client_session):
     assert response.status_code == 200
     assert response_json["latest"]["confirmed"]
     assert response_json["latest"]["deaths"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("source", ["csbs", "jhu", "nyt"])
+async def test_changes(async_api_client, source, mock_client_session):
+    response = await async_api_client.get("/v2/locations", query_string={"source": source})
+    etag = response.headers["ETag"]
+    version = etag.strip('"')
+
+    all_changes = await async_api_client.get("/v2/changes", query_string={"source": source})
+    since_version = await async_api_client.get(
+        "/v2/changes", query_string={"source": source, "since": version}
+    )
+    if_none_match = await async_api_client.get(
+        "/v2/changes", query_string={"source": source}, headers={"If-None-Match": etag}
+    )
+
+    assert all_changes.status_code == 200
+    assert all_changes.headers["ETag"] == etag
+    assert all_changes.json()["version"] == version
+    assert all_changes.json()["since"] is None
+    assert len(all_changes.json()["locations"]) == len(response.json()["locations"])
+    for response in (since_version, if_none_match):
+        assert response.json() == {
+            "version": version,
+            "since": version,
+            "locations": [],
+            "removed": [],
+        }
+
+
+@pytest.mark.asyncio
+async def test_locations_batch(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/locations/batch", query_string={"ids": "1, 0,nyt:2,csbs:1,5000"}
+    )
+
+    assert response.status_code == 200
+    batch = response.json()
+    assert [(location["source"], location["id"]) for location in batch["locations"]] == [
+        ("jhu", 1),
+        ("jhu", 0),
+        ("nyt", 2),
+        ("csbs", 1),
+    ]
+    assert batch["missing"] == ["jhu:5000"]
+    assert all("timelines" not in location for location in batch["locations"])
+
+    single = await async_api_client.get("/v2/locations/1", query_string={"timelines": False})
+    first = dict(batch["locations"][0])
+    del first["source"]
+    assert first.items() <= single.json()["location"].items()
+
+
+@pytest.mark.asyncio
+async def test_locations_batch_timelines(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/locations/batch",
+        query_string={
+            "ids": "0,nyt:0",
+            "timelines": True,
+            "start": "2020-03-01",
+            "end": "2020-03-03",
+        },
+    )
+
+    jhu_location, nyt_location = response.json()["locations"]
+    assert list(jhu_location["timelines"]["confirmed"]["timeline"]) == [
+        "2020-03-01T00:00:00Z",
+        "2020-03-02T00:00:00Z",
+        "2020-03-03T00:00:00Z",
+    ]
+    assert jhu_location["timelines"]["recovered"]["timeline"]
+    assert all(
+        "2020-03-01T00:00:00Z" <= date <= "2020-03-03T00:00:00Z"
+        for date in nyt_location["timelines"]["confirmed"]["timeline"]
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ids", ["1,x", "who:1", "-1", ""])
+async def test_locations_batch_invalid_ids(async_api_client, ids, mock_client_session):
+    response = await async_api_client.get("/v2/locations/batch", query_string={"ids": ids})
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_locations_batch_too_many_ids(async_api_client, mock_client_session, monkeypatch):
+    monkeypatch.setattr(v2.SETTINGS, "batch_max_ids", 2)
+
+    accepted = await async_api_client.get("/v2/locations/batch", query_string={"ids": "0,1"})
+    response = await async_api_client.get("/v2/locations/batch", query_string={"ids": "0,1,2"})
+
+    assert accepted.status_code == 200
+    assert response.status_code == 422
+    assert "at most 2" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_locations_derived(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/locations", query_string={"derived": "daily,rolling_mean,per_capita", "window": 3}
+    )
+
+    assert response.status_code == 200
+    location = response.json()["locations"][0]
+    assert "timelines" not in location
+    assert set(location["derived"]) == {"confirmed", "deaths", "recovered"}
+    assert set(location["derived"]["confirmed"]) == {"daily", "rolling_mean", "per_capita"}
+    assert set(location["derived"]["confirmed"]["daily"]) == {"latest"}
+    assert isinstance(location["derived"]["confirmed"]["daily"]["latest"], int)
+    assert location["derived"]["confirmed"]["per_capita"]["latest"] == round(
+        location["latest"]["confirmed"] / location["country_population"] * 100000, 2
+    )
+
+
+@pytest.mark.asyncio
+async def test_location_derived_timelines(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/locations/0", query_string={"derived": "doubling_time"}
+    )
+
+    assert response.status_code == 200
+    location = response.json()["location"]
+    doubling_time = location["derived"]["confirmed"]["doubling_time"]
+    assert list(doubling_time["timeline"]) == list(location["timelines"]["confirmed"]["timeline"])
+
+
+@pytest.mark.asyncio
+async def test_location_derived_types(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/locations/0", query_string={"derived": "daily,rolling_mean", "window": 2}
+    )
+
+    derived = response.json()["location"]["derived"]["confirmed"]
+    # The daily changes are counts, the rolling means are not.
+    assert all(isinstance(value, int) for value in derived["daily"]["timeline"].values())
+    assert any(isinstance(value, float) for value in derived["rolling_mean"]["timeline"].values())
+
+
+@pytest.mark.asyncio
+async def test_location_fields(async_api_client, mock_client_session):
+    response = await async_api_client.get("/v2/locations/0", query_string={"timelines": False})
+
+    location = response.json()["location"]
+    assert "derived" not in location
+    assert "distance" not in location
+    assert location["county"] == ""
+    assert location["timelines"] == {}
+
+
+@pytest.mark.asyncio
+async def test_locations_unknown_derived(async_api_client, mock_client_session):
+    response = await async_api_client.get("/v2/locations", query_string={"derived": "median"})
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort", ["confirmed", "deaths", "recovered"])
+async def test_locations_sorted(async_api_client, sort, mock_client_session):
+    everything = (await async_api_client.get("/v2/locations")).json()
+    response = await async_api_client.get("/v2/locations", query_string={"sort": sort, "limit": 3})
+
+    assert response.status_code == 200
+    top = response.json()
+    assert top["latest"] == everything["latest"]
+    expected = sorted(
+        everything["locations"], key=lambda location: (-location["latest"][sort], location["id"])
+    )
+    assert [location["id"] for location in top["locations"]] == [
+        location["id"] for location in expected[:3]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_locations_sorted_and_filtered(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/locations", query_string={"source": "nyt", "sort": "growth", "province": "Washington"}
+    )
+
+    assert response.status_code == 200
+    locations = response.json()["locations"]
+    assert {location["province"] for location in locations} == {"Washington"}
+    assert response.json()["latest"]["confirmed"] == sum(
+        location["latest"]["confirmed"] for location in locations
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query", [{"sort": "population"}, {"limit": 0}])
+async def test_locations_invalid_sort(async_api_client, query, mock_client_session):
+    response = await async_api_client.get("/v2/locations", query_string=query)
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_countries(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/countries", query_string={"sort": "deaths_per_100k", "limit": 3}
+    )
+
+    assert response.status_code == 200
+    countries = response.json()["countries"]
+    assert len(countries) == 3
+    deaths_per_100k = [country["deaths_per_100k"] for country in countries]
+    assert deaths_per_100k == sorted(deaths_per_100k, reverse=True)
+    assert all("timelines" not in country for country in countries)
+
+    locations = (await async_api_client.get("/v2/locations")).json()["locations"]
+    first = countries[0]
+    assert first["latest"]["deaths"] == sum(
+        location["latest"]["deaths"]
+        for location in locations
+        if location["country_code"] == first["country_code"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_countries_timelines(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/countries", query_string={"source": "nyt", "timelines": True}
+    )
+
+    assert response.status_code == 200
+    (country,) = response.json()["countries"]
+    assert country["country_code"] == "US"
+    confirmed = country["timelines"]["confirmed"]
+    assert list(confirmed["timeline"].values())[-1] == country["latest"]["confirmed"]
+    assert list(country["derived"]["confirmed"]["per_capita"]["timeline"]) == list(
+        confirmed["timeline"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_countries_unknown_sort(async_api_client, mock_client_session):
+    response = await async_api_client.get("/v2/countries", query_string={"sort": "population"})
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_locations_bbox(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/locations", query_string={"source": "csbs", "bbox": "40,-80,45,-70"}
+    )
+
+    assert response.status_code == 200
+    locations = response.json()["locations"]
+    assert locations
+    for location in locations:
+        assert 40 <= location["coordinates"]["latitude"] <= 45
+        assert -80 <= location["coordinates"]["longitude"] <= -70
+    assert response.json()["latest"]["confirmed"] == sum(
+        location["latest"]["confirmed"] for location in locations
+    )
+
+
+@pytest.mark.asyncio
+async def test_locations_near(async_api_client, mock_client_session):
+    response = await async_api_client.get(
+        "/v2/locations", query_string={"source": "csbs", "near": "40.7,-74.0", "limit": 3}
+    )
+
+    assert response.status_code == 200
+    locations = response.json()["locations"]
+    assert len(locations) == 3
+    distances = [location["distance"] for location in locations]
+    assert distances == sorted(distances)
+
+    within = await async_api_client.get(
+        "/v2/locations",
+        query_string={"source": "csbs", "near": "40.7,-74.0", "radius": distances[-1] + 0.001},
+    )
+    assert [location["id"] for location in within.json()["locations"]] == [
+        location["id"] for location in locations
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"bbox": "40,-80,45"},
+        {"bbox": "45,-80,40,-70"},
+        {"near": "91,0"},
+        {"near": "nan,0"},
+        {"radius": 10},
+        {"near": "0,0", "radius": 0},
+        {"near": "0,0", "sort": "confirmed"},
+    ],
+)
+async def test_locations_invalid_spatial_queries(async_api_client, query, mock_client_session):
+    response = await async_api_client.get("/v2/locations", query_string=query)
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/v2/latest", "/v2/locations", "/v2/locations/1", "/v2/changes"])
+async def test_unknown_source(async_api_client, path):
+    response = await async_api_client.get(path, query_string={"source": "who"})
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "The provided data-source was not found."}
+
+
+@pytest.mark.asyncio
+async def test_unknown_source_outside_data_routes(async_api_client):
+    # Only the routes of the data-sources resolve the source.
+    response = await async_api_client.get("/metrics", query_string={"source": "who"})
+
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/all", "/confirmed", "/deaths", "/recovered"])
+async def test_v1_encoding(async_api_client, path, mock_client_session, monkeypatch):
+    # The bodies assembled from the encoded categories are the encodings of their contents.
+    monkeypatch.setattr(compression, "RESPONSES", {})
+
+    response = await async_api_client.get(path, headers={"Accept-Encoding": "identity"})
+    confirmed, deaths, recovered = await jhu.get_categories()
+
+    if path == "/all":
+        content = {
+            "confirmed": confirmed,
+            "deaths": deaths,
+            "recovered": recovered,
+            "latest": {
+                "confirmed": confirmed["latest"],
+                "deaths": deaths["latest"],
+                "recovered": recovered["latest"],
+            },
+        }
+    else:
+        content = await jhu.get_category(path[1:])
+    assert response.status_code == 200
+    assert response.content == JSONResponse(content).body
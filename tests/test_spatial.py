@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from app.coordinates import Coordinates
+from app.location.csbs import CSBSLocation
+from app.spatial import GridIndex, distance
+
+
+def located(id, latitude, longitude):
+    return CSBSLocation(id, "State", "County", Coordinates(latitude, longitude), "", 0, 0)
+
+
+@pytest.fixture(scope="module")
+def points():
+    randomized = random.Random(4)
+    return [
+        located(id, randomized.uniform(-90, 90), randomized.uniform(-180, 180))
+        for id in range(2000)
+    ] + [located(2000, None, None)]
+
+
+def brute_force(points, latitude, longitude):
+    return sorted(
+        (distance(latitude, longitude, *point.coordinates.serialize().values()), point.id)
+        for point in points
+        if point.coordinates.latitude is not None
+    )
+
+
+def test_distance():
+    # New York to London.
+    assert distance(40.7128, -74.006, 51.5074, -0.1278) == pytest.approx(5570, rel=1e-3)
+    assert distance(0, 179.5, 0, -179.5) == pytest.approx(111.2, rel=1e-3)
+    assert distance(0, 0, 0, 180) == pytest.approx(20015.1, rel=1e-3)
+
+
+@pytest.mark.parametrize(
+    "south, west, north, east",
+    [(10, 20, 40, 60), (-90, -180, 90, 180), (-20, 170, 20, -170), (0, 0, 0.5, 0.5)],
+)
+def test_bbox(points, south, west, north, east):
+    index = GridIndex(points, cell=5)
+
+    expected = [
+        point.id
+        for point in points
+        if point.coordinates.latitude is not None
+        and south <= point.coordinates.latitude <= north
+        and (
+            west <= point.coordinates.longitude <= east
+            if west <= east
+            else not east < point.coordinates.longitude < west
+        )
+    ]
+    assert [point.id for point in index.bbox(south, west, north, east)] == expected
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude, kilometers",
+    [(45, 10, 1500), (0, 179.9, 800), (89, 0, 1000), (-30, -60, 30000)],
+)
+def test_radius(points, latitude, longitude, kilometers):
+    index = GridIndex(points, cell=2)
+
+    expected = [
+        (point_distance, id)
+        for point_distance, id in brute_force(points, latitude, longitude)
+        if point_distance <= kilometers
+    ]
+    found = index.radius(latitude, longitude, kilometers)
+    assert [(point_distance, point.id) for point_distance, point in found] == expected
+
+
+@pytest.mark.parametrize("count", [1, 10, 2000, 3000])
+@pytest.mark.parametrize("latitude, longitude", [(45, 10), (-89.9, 179.9)])
+def test_nearest(points, latitude, longitude, count):
+    index = GridIndex(points)
+
+    found = index.nearest(latitude, longitude, count)
+    assert [point.id for _, point in found] == [
+        id for _, id in brute_force(points, latitude, longitude)[:count]
+    ]
+
+
+def test_empty_index():
+    index = GridIndex([located(0, None, 2)])
+
+    assert index.size == 0
+    assert index.nearest(0, 0, 5) == []
+    assert index.bbox(-90, -180, 90, 180) == []
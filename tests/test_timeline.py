@@ -1,9 +1,10 @@
 from collections import OrderedDict
+from datetime import date
 from unittest import mock
 
 import pytest
 
-from app import models
+from app import models, timeline
 
 
 def test_timeline_class():
@@ -35,3 +36,174 @@ def test_timeline_class():
     }
 
     assert dict(history_data.serialize()) == check_serialize
+
+
+def test_internal_timeline_from_dict():
+    # Unordered timeseries.
+    timeseries = {
+        "2020-01-24T00:00:00Z": 5,
+        "2020-01-22T00:00:00Z": 2,
+        "2020-01-25T00:00:00Z": 7,
+        "2020-01-23T00:00:00Z": 3,
+    }
+
+    history_data = timeline.Timeline.from_dict(timeseries)
+
+    assert history_data.latest == 7
+    assert len(history_data) == 4
+    assert list(history_data.timeline) == sorted(timeseries)
+    assert history_data.serialize() == {
+        "latest": 7,
+        "timeline": {
+            "2020-01-22T00:00:00Z": 2,
+            "2020-01-23T00:00:00Z": 3,
+            "2020-01-24T00:00:00Z": 5,
+            "2020-01-25T00:00:00Z": 7,
+        },
+    }
+
+    # Matches the API schema.
+    assert models.Timeline(**history_data.serialize()).serialize() == history_data.serialize()
+
+
+def test_internal_timeline_empty():
+    history_data = timeline.Timeline()
+
+    assert history_data.latest == 0
+    assert history_data.serialize() == {"latest": 0, "timeline": {}}
+    assert history_data.deltas().serialize() == {"latest": 0, "timeline": {}}
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        (None, None, [2, 3, 5, 7]),
+        (date(2020, 1, 23), None, [3, 5, 7]),
+        (None, date(2020, 1, 24), [2, 3, 5]),
+        (date(2020, 1, 23), date(2020, 1, 23), [3]),
+        (date(2020, 1, 26), None, []),
+        (date(2019, 12, 1), date(2020, 1, 21), []),
+    ],
+)
+def test_internal_timeline_slice(start, end, expected):
+    history_data = timeline.Timeline(
+        (
+            "2020-01-22T00:00:00Z",
+            "2020-01-23T00:00:00Z",
+            "2020-01-24T00:00:00Z",
+            "2020-01-25T00:00:00Z",
+        ),
+        [2, 3, 5, 7],
+    )
+
+    assert list(history_data.slice(start, end).values) == expected
+
+
+def test_internal_timeline_deltas():
+    history_data = timeline.Timeline(
+        ("2020-01-22T00:00:00Z", "2020-01-23T00:00:00Z", "2020-01-24T00:00:00Z"), [2, 3, 7],
+    )
+
+    deltas = history_data.deltas()
+
+    assert deltas.dates == history_data.dates
+    assert list(deltas.values) == [2, 1, 4]
+    assert deltas.latest == 4
+
+
+def test_date_axis():
+    axis, positions = timeline.date_axis(["1/23/20", "1/22/20", "1/23/20", "2/1/20"], "%m/%d/%y")
+
+    assert axis == ("2020-01-22T00:00:00Z", "2020-01-23T00:00:00Z", "2020-02-01T00:00:00Z")
+    assert positions == {"1/22/20": 0, "1/23/20": 1, "2/1/20": 2}
+
+
+def test_internal_timeline_from_history():
+    axis, positions = timeline.date_axis(["2020-01-22", "2020-01-23", "2020-01-24"], "%Y-%m-%d")
+
+    full = timeline.Timeline.from_history(
+        axis, positions, {"2020-01-22": 1, "2020-01-23": 2, "2020-01-24": 3}
+    )
+    tail = timeline.Timeline.from_history(axis, positions, {"2020-01-23": 5, "2020-01-24": 8})
+    gaps = timeline.Timeline.from_history(axis, positions, {"2020-01-24": 4, "2020-01-22": 3})
+
+    # Consecutive histories reference the shared axis by position.
+    assert full.axis is axis and full.start == 0
+    assert tail.axis is axis and tail.start == 1
+    assert tail.timeline == {"2020-01-23T00:00:00Z": 5, "2020-01-24T00:00:00Z": 8}
+
+    # Histories with gaps reuse the same date strings.
+    assert gaps.timeline == {"2020-01-22T00:00:00Z": 3, "2020-01-24T00:00:00Z": 4}
+    assert gaps.dates[1] is axis[2]
+
+    # Slicing and deltas keep referencing the axis.
+    sliced = tail.slice(date(2020, 1, 24))
+    assert sliced.axis is axis
+    assert sliced.timeline == {"2020-01-24T00:00:00Z": 8}
+    assert tail.deltas().timeline == {"2020-01-23T00:00:00Z": 5, "2020-01-24T00:00:00Z": 3}
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_internal_timeline_derived_series(use_numpy, monkeypatch):
+    if not use_numpy:
+        monkeypatch.setattr(timeline, "numpy", None)
+    axis = tuple(f"2020-01-{day:02}T00:00:00Z" for day in range(22, 28))
+    history_data = timeline.Timeline(axis, [1, 2, 4, 8, 8, 20])
+
+    assert list(history_data.lagged(2)) == [1, 2, 3, 6, 4, 12]
+    assert history_data.rolling_mean(2).timeline == dict(zip(axis, [1.0, 1.0, 1.5, 3.0, 2.0, 6.0]))
+    assert history_data.doubling_time(1).timeline == dict(
+        zip(axis, [None, 1.0, 1.0, 1.0, None, 0.76])
+    )
+    assert history_data.per_capita(200).timeline == dict(
+        zip(axis, [500.0, 1000.0, 2000.0, 4000.0, 4000.0, 10000.0])
+    )
+    assert history_data.per_capita(None).serialize(timeline=False) == {"latest": None}
+    assert timeline.Timeline().rolling_mean().serialize() == {"latest": 0, "timeline": {}}
+    assert history_data.rolling_mean(3).slice(date(2020, 1, 26)).serialize() == {
+        "latest": 5.33,
+        "timeline": {"2020-01-26T00:00:00Z": 2.0, "2020-01-27T00:00:00Z": 5.33},
+    }
+
+
+def test_internal_timeline_derive_once():
+    history_data = timeline.Timeline(("2020-01-22T00:00:00Z",), [1])
+
+    for metric in timeline.METRICS:
+        derived = history_data.derive(metric, 7, 100)
+        assert history_data.derive(metric, 7, 100) is derived
+    assert history_data.derive("rolling_mean", 3) is not history_data.derive("rolling_mean", 7)
+    assert history_data.derive("daily").values == history_data.deltas().values
+    # Only the default window is kept, the window does not change the other series.
+    assert history_data.derive("rolling_mean", 3) is not history_data.derive("rolling_mean", 3)
+    assert history_data.derive("daily", 3) is history_data.derive("daily", 7)
+    assert history_data.derive("per_capita", 3, 100) is history_data.derive("per_capita", 7, 100)
+    assert set(history_data.derived) == {
+        "daily",
+        "rolling_mean",
+        "doubling_time",
+        ("per_capita", 100),
+    }
+    with pytest.raises(ValueError):
+        history_data.derive("median")
+
+
+def test_sum_timelines():
+    axis = tuple(f"2020-01-{day:02}T00:00:00Z" for day in range(22, 27))
+    timelines = [
+        timeline.Timeline(axis, [1, 2, 3], 0),
+        # Later and longer, the first keeps counting with its latest amount.
+        timeline.Timeline(axis, [10, 20, 30], 2),
+        timeline.Timeline(),
+    ]
+
+    total = timeline.sum_timelines(timelines)
+    assert total.axis is axis
+    assert total.timeline == dict(zip(axis, [1, 2, 13, 23, 33]))
+
+    # Gaps keep the previous amount.
+    gaps = timeline.Timeline((axis[0], axis[3]), [5, 7])
+    assert timeline.sum_timelines(timelines + [gaps]).timeline == dict(
+        zip(axis, [6, 7, 18, 30, 40])
+    )
+    assert timeline.sum_timelines([]).serialize() == {"latest": 0, "timeline": {}}
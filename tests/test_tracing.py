@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+from app.services.location import csbs
+from app.utils import executors, tracing
+
+from .conftest import AsyncMock
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(tracing, "ENABLED", True)
+    monkeypatch.setattr(tracing, "TRACES", {})
+
+
+def test_disabled_spans(monkeypatch):
+    monkeypatch.setattr(tracing, "ENABLED", False)
+    monkeypatch.setattr(tracing, "TRACES", {})
+
+    with tracing.span("refresh", source="jhu") as current:
+        current.set(rows=10)
+
+    assert current is tracing.NULL_SPAN
+    assert tracing.TRACES == {}
+
+
+@pytest.mark.asyncio
+async def test_spans_breakdown(enabled, monkeypatch):
+    monkeypatch.setattr(executors, "EXECUTOR", None)
+    monkeypatch.setattr(executors.SETTINGS, "parse_executor", "thread")
+
+    @tracing.traced("parse")
+    def parse():
+        with tracing.span("rows") as current:
+            current.set(rows=2)
+
+    @tracing.traced("fetch")
+    async def fetch():
+        await asyncio.sleep(0)
+
+    with tracing.span("refresh", source="jhu"):
+        await asyncio.gather(fetch(), fetch())
+        await executors.run_in_executor(parse)
+    await executors.teardown_executor()
+
+    refresh = tracing.TRACES["refresh"]
+    assert refresh["attributes"] == {"source": "jhu"}
+    assert [child["name"] for child in refresh["children"]] == ["fetch", "fetch", "parse"]
+    (rows,) = refresh["children"][2]["children"]
+    assert rows["attributes"] == {"rows": 2}
+    assert refresh["duration_ms"] >= rows["duration_ms"]
+    # Only the roots are kept.
+    assert list(tracing.TRACES) == ["refresh"]
+
+
+def test_span_errors(enabled):
+    with pytest.raises(ValueError):
+        with tracing.span("parse"):
+            raise ValueError("not a CSV")
+
+    assert tracing.TRACES["parse"]["attributes"] == {"error": "ValueError"}
+
+
+def test_spans_logged(enabled, monkeypatch, caplog):
+    monkeypatch.setattr(tracing.SETTINGS, "tracing_log", True)
+
+    with caplog.at_level(logging.INFO, logger=tracing.LOGGER.name):
+        with tracing.span("refresh"):
+            with tracing.span("fetch", url="https://example.com"):
+                pass
+
+    fetch, refresh = (json.loads(record.getMessage()) for record in caplog.records)
+    assert fetch["name"] == "fetch"
+    assert fetch["attributes"] == {"url": "https://example.com"}
+    assert fetch["context"]["trace_id"] == refresh["context"]["trace_id"]
+    assert fetch["parent_id"] == refresh["context"]["span_id"]
+    assert refresh["parent_id"] is None
+    assert fetch["start_time"] <= fetch["end_time"]
+
+
+@pytest.mark.asyncio
+async def test_traces_endpoint(enabled, async_api_client, mock_client_session, monkeypatch):
+    monkeypatch.setattr(csbs, "check_cache", AsyncMock(return_value=None))
+    monkeypatch.setattr(csbs, "load_cache", AsyncMock())
+    # Bypass the TTL cache to force a refresh.
+    await csbs.get_locations.__wrapped__()
+
+    response = await async_api_client.get("/debug/traces")
+
+    assert response.status_code == 200
+    refresh = response.json()["traces"]["csbs.locations"]
+    assert [child["name"] for child in refresh["children"]] == [
+        "http.get",
+        "csbs.parse_locations",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_traces_endpoint_disabled(async_api_client, monkeypatch):
+    monkeypatch.setattr(tracing, "ENABLED", False)
+
+    response = await async_api_client.get("/debug/traces")
+
+    assert response.status_code == 404